@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Adaptive Quiz Generator
+Records every quiz answer as an event, keeps per-letter and per-user error
+aggregates up to date incrementally, and builds quizzes weighted toward the
+letters a learner gets wrong
+"""
+
+import random
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from letter_model import LETTER_MODEL
+
+QUIZ_LENGTH = 10
+
+# Pseudo-attempts used to blend a learner's error rate with the global one
+PRIOR_ATTEMPTS = 3.0
+# Error rate assumed for letters nobody has answered yet
+DEFAULT_ERROR_RATE = 0.3
+# Extra weight for letters the spaced-repetition scheduler says are due
+DUE_BONUS = 0.5
+# Keeps well-known letters in rotation occasionally
+MIN_WEIGHT = 0.05
+
+
+class AdaptiveQuiz:
+    def __init__(self, db_path="gurmukhi_progress.db"):
+        self.db_path = db_path
+        self.init_database()
+
+    def init_database(self):
+        """Create the answer log and its aggregate tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                quiz_id TEXT,
+                user_id TEXT NOT NULL,
+                letter TEXT NOT NULL,
+                chosen TEXT,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS letter_error_stats (
+                letter TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_letter_error_stats (
+                user_id TEXT NOT NULL,
+                letter TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, letter)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_letter_confusions (
+                user_id TEXT NOT NULL,
+                letter TEXT NOT NULL,
+                chosen TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, letter, chosen)
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def record_answer(self, user_id: str, letter: str, chosen: str, correct: bool,
+                      quiz_id: Optional[str] = None):
+        """Append the answer event and bump the aggregates in the same transaction"""
+        error = 0 if correct else 1
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT INTO quiz_answers (quiz_id, user_id, letter, chosen, correct, answered_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (quiz_id, user_id, letter, chosen, int(correct), time.time()))
+        cursor.execute('''
+            INSERT INTO letter_error_stats (letter, attempts, errors) VALUES (?, 1, ?)
+            ON CONFLICT (letter) DO UPDATE SET
+                attempts = attempts + 1,
+                errors = errors + excluded.errors
+        ''', (letter, error))
+        cursor.execute('''
+            INSERT INTO user_letter_error_stats (user_id, letter, attempts, errors) VALUES (?, ?, 1, ?)
+            ON CONFLICT (user_id, letter) DO UPDATE SET
+                attempts = attempts + 1,
+                errors = errors + excluded.errors
+        ''', (user_id, letter, error))
+        if not correct and chosen:
+            cursor.execute('''
+                INSERT INTO user_letter_confusions (user_id, letter, chosen, count) VALUES (?, ?, ?, 1)
+                ON CONFLICT (user_id, letter, chosen) DO UPDATE SET count = count + 1
+            ''', (user_id, letter, chosen))
+
+        conn.commit()
+        conn.close()
+
+    def letter_weights(self, user_id: str) -> Dict[str, float]:
+        """Smoothed per-letter error rate for a learner, read from the aggregates only"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT letter, attempts, errors FROM letter_error_stats')
+        global_rates = {
+            letter: errors / attempts
+            for letter, attempts, errors in cursor.fetchall() if attempts
+        }
+        cursor.execute('''
+            SELECT letter, attempts, errors FROM user_letter_error_stats WHERE user_id = ?
+        ''', (user_id,))
+        user_stats = {letter: (attempts, errors) for letter, attempts, errors in cursor.fetchall()}
+        conn.close()
+
+        weights = {}
+        for letter in LETTER_MODEL.letters:
+            prior = global_rates.get(letter, DEFAULT_ERROR_RATE)
+            attempts, errors = user_stats.get(letter, (0, 0))
+            weights[letter] = (errors + PRIOR_ATTEMPTS * prior) / (attempts + PRIOR_ATTEMPTS)
+        return weights
+
+    def user_confusions(self, user_id: str) -> Dict[str, Dict[str, int]]:
+        """Wrong answers a learner has picked for each letter"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT letter, chosen, count FROM user_letter_confusions WHERE user_id = ?
+        ''', (user_id,))
+        confusions: Dict[str, Dict[str, int]] = {}
+        for letter, chosen, count in cursor.fetchall():
+            confusions.setdefault(letter, {})[chosen] = count
+        conn.close()
+        return confusions
+
+    def generate(self, user_id: str, n: int = QUIZ_LENGTH, due_letters: Sequence[str] = (),
+                 rng=random) -> Dict:
+        """Build a whole quiz (letters and options) in one call"""
+        weights = self.letter_weights(user_id)
+        due = set(due_letters)
+        for letter in weights:
+            weights[letter] = max(MIN_WEIGHT, weights[letter] + (DUE_BONUS if letter in due else 0.0))
+
+        # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+        keyed = sorted(weights, key=lambda letter: rng.random() ** (1.0 / weights[letter]), reverse=True)
+        letters = keyed[:n]
+        rng.shuffle(letters)
+
+        confusions = self.user_confusions(user_id)
+        options = [
+            LETTER_MODEL.options(letter, rng=rng, learner_confusions=confusions.get(letter))
+            for letter in letters
+        ]
+        return {
+            "quiz_id": uuid.uuid4().hex,
+            "letters": letters,
+            "options": options,
+        }
+
+    def error_rates(self, user_id: str) -> List[Dict]:
+        """Per-letter attempts and error rate for a learner, weakest first"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT letter, attempts, errors FROM user_letter_error_stats
+            WHERE user_id = ? AND attempts > 0
+            ORDER BY CAST(errors AS REAL) / attempts DESC
+        ''', (user_id,))
+        rows = [
+            {"letter": letter, "attempts": attempts, "errors": errors, "error_rate": errors / attempts}
+            for letter, attempts, errors in cursor.fetchall()
+        ]
+        conn.close()
+        return rows
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+AI Tutor Backends
+Prompt building, pluggable model backends (Gemini, local stub, mock) and a
+client that caches answers, coalesces identical in-flight requests and
+streams tokens as they arrive
+
+Usage:
+    python ai_backend.py --benchmark    # latency, cache hit rate and scheduler wait times against the stub
+"""
+
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional
+
+from ai_scheduler import AIScheduler, get_ai_scheduler
+
+CACHE_TTL_SECONDS = 60 * 60
+CACHE_MAX_ENTRIES = 512
+LATENCY_SAMPLES = 1000
+
+
+def build_prompt(question: str, context: str = "", is_followup: bool = False) -> str:
+    """Tutor prompt for a homework question or a follow-up"""
+    if is_followup:
+        return f"""
+        You are a friendly AI tutor helping a student with their homework.
+        The student has a follow-up question: {question}
+
+        Previous context: {context}
+
+        Please provide a clear, kid-friendly explanation with examples.
+        """
+    return f"""
+        You are a friendly AI tutor helping a student with their homework.
+
+        Question from image: {question}
+
+        Please:
+        1. Solve the problem step by step
+        2. Explain each step clearly for a student
+        3. Provide examples if helpful
+        4. Use simple language appropriate for kids
+        5. Include visual descriptions when helpful
+
+        Format your response in a clear, structured way.
+        """
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys"""
+    return re.sub(r"\s+", " ", (text or "").strip().lower()).strip(" ?!.")
+
+
+def _remaining(request: Dict, limit: float) -> float:
+    """Seconds left before the request's deadline, capped at limit"""
+    deadline = request.get("deadline")
+    return limit if deadline is None else max(0.1, min(limit, deadline - time.monotonic()))
+
+
+def _split_tokens(text: str) -> Iterator[str]:
+    for match in re.finditer(r"\S+\s*|\s+", text):
+        yield match.group(0)
+
+
+class AIBackend:
+    """A model that streams text chunks for a request"""
+
+    name = "base"
+
+    def stream(self, request: Dict) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class MockBackend(AIBackend):
+    """Canned answers used when no model is configured"""
+
+    name = "mock"
+
+    def stream(self, request: Dict) -> Iterator[str]:
+        question = request["question"]
+        if "rotation" in question.lower() or "coordinate" in question.lower():
+            text = """
+            🎯 **Coordinate Geometry Solution**
+
+            I can see this is about transformations! Let me solve this step by step:
+
+            **Step 1: Translation**
+            - Move each point left 2 and up 1
+            - A(3,4) → A'(1,5)
+            - B(-1,-2) → B'(-3,-1)
+
+            **Step 2: Rotation 90° clockwise about C(1,3)**
+            - Use formula: (x,y) → (h+(y-k), k-(x-h))
+            - A'(1,5) → A''(3,3)
+            - B'(-3,-1) → B''(-3,7)
+
+            **Why this works:**
+            - Rotation swaps and flips coordinates
+            - Think of turning a clock hand 90° clockwise
+
+            **Final Answer:** A''(3,3), B''(-3,7)
+
+            💡 **Need help understanding any step? Just ask!**
+            """
+        else:
+            text = f"""
+            📚 **AI Homework Helper**
+
+            I can see your question: "{question}"
+
+            Let me help you solve this step by step:
+
+            1. **Understanding the problem:** [Analysis of what's being asked]
+            2. **Solution approach:** [Method to solve]
+            3. **Step-by-step solution:** [Detailed steps]
+            4. **Final answer:** [Clear result]
+
+            💡 **Want me to explain any part differently? Just ask a follow-up question!**
+            """
+        yield from _split_tokens(text)
+
+
+class GeminiBackend(AIBackend):
+    """Google Gemini with streamed generation"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = "gemini-1.5-flash", timeout: float = 60.0):
+        import google.generativeai as genai
+
+        self.timeout = timeout
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model)
+
+    def stream(self, request: Dict) -> Iterator[str]:
+        response = self.model.generate_content(
+            request["prompt"], stream=True, request_options={"timeout": _remaining(request, self.timeout)}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubServerBackend(AIBackend):
+    """Client for the deterministic local stub server (ai_stub_server.py)"""
+
+    name = "stub"
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def stream(self, request: Dict) -> Iterator[str]:
+        body = json.dumps({"prompt": request["prompt"]}).encode("utf-8")
+        http_request = urllib.request.Request(
+            f"{self.base_url}/generate", data=body, headers={"Content-Type": "application/json"}
+        )
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with urllib.request.urlopen(http_request, timeout=_remaining(request, self.timeout)) as response:
+            while True:
+                data = response.read1(4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+class _InFlight:
+    """Shared state of one request that several callers may be waiting on"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+
+
+class CachedAIClient:
+    def __init__(self, backend: AIBackend, ttl: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES,
+                 scheduler: Optional[AIScheduler] = None):
+        self.backend = backend
+        # Only cache misses reach the provider, so only they go through the rate limiter
+        self.scheduler = scheduler
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, text)
+        self._in_flight: Dict[str, _InFlight] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.first_token_latency = deque(maxlen=LATENCY_SAMPLES)
+        self.total_latency = deque(maxlen=LATENCY_SAMPLES)
+
+    @staticmethod
+    def cache_key(question: str, context: str = "", is_followup: bool = False) -> str:
+        raw = "\x00".join([normalize_text(question), normalize_text(context), "1" if is_followup else "0"])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    def stream(self, question: str, context: str = "", is_followup: bool = False,
+               user_id: str = "anonymous") -> Iterator[str]:
+        """Answer chunks: from cache, from an identical in-flight request, or from the backend"""
+        start = time.perf_counter()
+        key = self.cache_key(question, context, is_followup)
+
+        with self._lock:
+            text = self._cached(key)
+            if text is not None:
+                self.hits += 1
+                leader = False
+                flight = None
+            else:
+                flight = self._in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    self.misses += 1
+                    flight = _InFlight()
+                    self._in_flight[key] = flight
+                else:
+                    self.coalesced += 1
+
+        if flight is None:
+            self._record_latency(start, start)
+            yield text
+            return
+
+        if leader:
+            threading.Thread(
+                target=self._run, args=(key, flight, question, context, is_followup, user_id),
+                name="ai-request", daemon=True
+            ).start()
+
+        # Leader and followers all read the same growing chunk list
+        first_token_at = None
+        position = 0
+        while True:
+            with flight.condition:
+                while position >= len(flight.chunks) and not flight.done:
+                    flight.condition.wait()
+                new_chunks = flight.chunks[position:]
+                position += len(new_chunks)
+                finished = flight.done and position >= len(flight.chunks)
+                error = flight.error
+            if new_chunks and first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield from new_chunks
+            if finished:
+                break
+        if error is not None:
+            raise error
+        self._record_latency(start, first_token_at or time.perf_counter())
+
+    def _run(self, key: str, flight: _InFlight, question: str, context: str, is_followup: bool, user_id: str):
+        request = {
+            "question": question,
+            "context": context,
+            "is_followup": is_followup,
+            "prompt": build_prompt(question, context, is_followup),
+        }
+        if self.scheduler is None:
+            chunks = self.backend.stream(request)
+        else:
+            chunks = self.scheduler.stream(
+                user_id, lambda deadline: self.backend.stream(dict(request, deadline=deadline))
+            )
+        try:
+            for chunk in chunks:
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._cache[key] = (time.time() + self.ttl, "".join(flight.chunks))
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+                self._in_flight.pop(key, None)
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def ask(self, question: str, context: str = "", is_followup: bool = False, user_id: str = "anonymous") -> str:
+        return "".join(self.stream(question, context, is_followup, user_id))
+
+    def partial(self, question: str, context: str = "", is_followup: bool = False) -> Optional[str]:
+        """Text received so far for an in-flight request (for streaming into the UI)"""
+        key = self.cache_key(question, context, is_followup)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is None:
+                return self._cached(key)
+        with flight.condition:
+            return "".join(flight.chunks)
+
+    def _record_latency(self, start: float, first_token_at: float):
+        with self._lock:
+            self.first_token_latency.append(first_token_at - start)
+            self.total_latency.append(time.perf_counter() - start)
+
+    def stats(self) -> Dict:
+        """Cache hit rate and p50/p95 latencies in milliseconds"""
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            ttft = sorted(self.first_token_latency)
+            total = sorted(self.total_latency)
+            return {
+                "backend": self.backend.name,
+                "requests": requests,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "coalesced": self.coalesced,
+                "cached_entries": len(self._cache),
+                "ttft_p50_ms": _percentile(ttft, 50) * 1000,
+                "ttft_p95_ms": _percentile(ttft, 95) * 1000,
+                "total_p50_ms": _percentile(total, 50) * 1000,
+                "total_p95_ms": _percentile(total, 95) * 1000,
+            }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def create_backend() -> AIBackend:
+    """The stub when AI_STUB_URL is set, Gemini when GEMINI_API_KEY is set, else canned answers"""
+    if os.environ.get("AI_STUB_URL"):
+        return StubServerBackend(os.environ["AI_STUB_URL"])
+    if os.environ.get("GEMINI_API_KEY"):
+        return GeminiBackend(os.environ["GEMINI_API_KEY"], os.environ.get("GEMINI_MODEL", "gemini-1.5-flash"))
+    return MockBackend()
+
+
+_ai_client: Optional[CachedAIClient] = None
+_ai_client_lock = threading.Lock()
+
+
+def get_ai_client() -> CachedAIClient:
+    """Process-wide AI client shared by every session"""
+    global _ai_client
+    with _ai_client_lock:
+        if _ai_client is None:
+            _ai_client = CachedAIClient(create_backend(), scheduler=get_ai_scheduler())
+        return _ai_client
+
+
+def run_benchmark(requests_count: int = 200, distinct: int = 40, concurrency: int = 8):
+    """Replay a skewed question mix against the stub and report latency and hit rate"""
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ai_stub_server import start_stub_server
+
+    server, url = start_stub_server(first_token_ms=200, token_ms=5)
+    scheduler = AIScheduler(requests_per_minute=600, burst=5, max_in_flight=4)
+    client = CachedAIClient(StubServerBackend(url), scheduler=scheduler)
+    rng = random.Random(0)
+    # Popular homework questions repeat far more often than rare ones
+    questions = [f"What is {rng.randint(2, 12)} x {rng.randint(2, 12)}? (q{i})" for i in range(distinct)]
+    # One busy student sends half the traffic; the scheduler must not let them starve the rest
+    workload = [
+        (questions[min(int(rng.paretovariate(1.2)) - 1, distinct - 1)],
+         "busy" if rng.random() < 0.5 else f"student{rng.randint(1, 5)}")
+        for _ in range(requests_count)
+    ]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda item: client.ask(item[0], user_id=item[1]), workload))
+    server.shutdown()
+
+    for name, value in {**client.stats(), **scheduler.stats()}.items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI tutor backend tools")
+    parser.add_argument("--benchmark", action="store_true", help="measure latency and cache hit rate")
+    args = parser.parse_args()
+    if args.benchmark:
+        run_benchmark()
+    else:
+        print(get_ai_client().ask("What is 7 x 8?"))
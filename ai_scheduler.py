@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+AI Request Scheduler
+Process-wide gate in front of the model provider: a token-bucket rate limit,
+a cap on concurrent calls, round-robin fairness between users, deadlines and
+retry with exponential backoff
+"""
+
+import os
+import random
+import threading
+import time
+import urllib.error
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+# Provider limits; override per deployment with environment variables
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_BURST = 5
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_DEADLINE_SECONDS = 60.0
+
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+# Provider SDK errors that mean "try again later" (google.api_core and friends)
+RETRYABLE_ERROR_NAMES = frozenset([
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "TooManyRequests",
+])
+
+WAIT_SAMPLES = 1000
+
+
+class AIDeadlineExceeded(TimeoutError):
+    """The request could not be started or finished before its deadline"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying"""
+    if isinstance(error, AIDeadlineExceeded):
+        return False
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRYABLE_STATUS
+    if isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it said so"""
+    headers = getattr(error, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Refills at rate tokens per second up to capacity (not thread-safe; callers lock)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Ticket:
+    __slots__ = ("user_id", "enqueued_at", "granted")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class AIScheduler:
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 burst: int = DEFAULT_BURST, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 deadline_seconds: float = DEFAULT_DEADLINE_SECONDS, max_retries: int = MAX_RETRIES):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_in_flight = max_in_flight
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+
+        self._condition = threading.Condition()
+        # user_id -> deque of waiting tickets; key order is the round-robin order
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._in_flight = 0
+
+        self.started = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.wait_times = deque(maxlen=WAIT_SAMPLES)
+        self.created_at = time.monotonic()
+
+    def deadline(self, timeout: Optional[float] = None) -> float:
+        """Absolute monotonic deadline for a request starting now"""
+        return time.monotonic() + (self.deadline_seconds if timeout is None else timeout)
+
+    def _grant(self):
+        """Hand out slots round-robin while the bucket and in-flight cap allow (lock held)"""
+        granted = False
+        while self._waiting and self._in_flight < self.max_in_flight:
+            if not self.bucket.try_take(time.monotonic()):
+                break
+            user_id, tickets = next(iter(self._waiting.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                # Move this user to the back so others get the next slot
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            ticket.granted = True
+            self._in_flight += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def acquire(self, user_id: str, deadline: float):
+        """Block until this user's turn comes up, or raise AIDeadlineExceeded"""
+        ticket = _Ticket(user_id)
+        with self._condition:
+            self._waiting.setdefault(user_id, deque()).append(ticket)
+            while True:
+                self._grant()
+                now = time.monotonic()
+                if ticket.granted:
+                    self.started += 1
+                    self.wait_times.append(now - ticket.enqueued_at)
+                    return
+                if now >= deadline:
+                    tickets = self._waiting.get(user_id)
+                    if tickets is not None:
+                        tickets.remove(ticket)
+                        if not tickets:
+                            del self._waiting[user_id]
+                    self.timeouts += 1
+                    raise AIDeadlineExceeded("Timed out waiting for an AI request slot")
+                timeout = deadline - now
+                if self._in_flight < self.max_in_flight:
+                    # Only the rate limit is holding us back: wake when a token is due
+                    timeout = min(timeout, self.bucket.time_until_token(now))
+                self._condition.wait(max(timeout, 0.001))
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._grant()
+            # Waiters blocked on the in-flight cap now need to watch the bucket instead
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int, error: BaseException, deadline: float):
+        delay = retry_after(error)
+        if delay is None:
+            # Full jitter keeps retries from a whole class from arriving together
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            raise error
+        with self._condition:
+            self.retries += 1
+        time.sleep(delay)
+
+    def stream(self, user_id: str, make_stream: Callable[[float], Iterable[str]],
+               deadline: Optional[float] = None) -> Iterator[str]:
+        """Run a streaming provider call under the scheduler
+
+        make_stream receives the absolute deadline. A failed attempt is retried
+        only if it failed before producing output, so no text is duplicated.
+        """
+        deadline = self.deadline() if deadline is None else deadline
+        attempt = 0
+        while True:
+            self.acquire(user_id, deadline)
+            produced = False
+            try:
+                for chunk in make_stream(deadline):
+                    if produced and time.monotonic() > deadline:
+                        raise AIDeadlineExceeded("AI response did not finish before its deadline")
+                    produced = True
+                    yield chunk
+                return
+            except Exception as e:
+                if produced or attempt >= self.max_retries or not is_retryable(e):
+                    with self._condition:
+                        self.failures += 1
+                        if isinstance(e, AIDeadlineExceeded):
+                            self.timeouts += 1
+                    raise
+                error = e
+            finally:
+                self.release()
+            self._backoff(attempt, error, deadline)
+            attempt += 1
+
+    def call(self, user_id: str, fn: Callable[[float], str], deadline: Optional[float] = None) -> str:
+        """Run a non-streaming provider call under the scheduler"""
+        return "".join(self.stream(user_id, lambda d: [fn(d)], deadline))
+
+    def stats(self) -> Dict:
+        """Queue depth, in-flight count and wait-time percentiles (ms) for monitoring"""
+        with self._condition:
+            waits = sorted(self.wait_times)
+            elapsed = max(time.monotonic() - self.created_at, 1e-9)
+            return {
+                "queued": sum(len(t) for t in self._waiting.values()),
+                "users_waiting": len(self._waiting),
+                "in_flight": self._in_flight,
+                "tokens_available": round(self.bucket.tokens, 2),
+                "started": self.started,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "requests_per_minute": self.started / elapsed * 60,
+                "wait_p50_ms": _percentile(waits, 50) * 1000,
+                "wait_p95_ms": _percentile(waits, 95) * 1000,
+            }
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+_ai_scheduler: Optional[AIScheduler] = None
+_ai_scheduler_lock = threading.Lock()
+
+
+def get_ai_scheduler() -> AIScheduler:
+    """Process-wide scheduler configured from AI_REQUESTS_PER_MINUTE, AI_BURST,
+    AI_MAX_IN_FLIGHT and AI_DEADLINE_SECONDS"""
+    global _ai_scheduler
+    with _ai_scheduler_lock:
+        if _ai_scheduler is None:
+            _ai_scheduler = AIScheduler(
+                requests_per_minute=float(os.environ.get("AI_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)),
+                burst=int(os.environ.get("AI_BURST", DEFAULT_BURST)),
+                max_in_flight=int(os.environ.get("AI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+                deadline_seconds=float(os.environ.get("AI_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS)),
+            )
+        return _ai_scheduler
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Deterministic Local AI Stub Server
+Streams canned, prompt-dependent answers over HTTP so the homework helper
+can be exercised offline and benchmarked with realistic latency
+
+Usage:
+    python ai_stub_server.py --port 8765 --first-token-ms 300 --token-ms 20
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+
+def stub_answer(prompt: str) -> List[str]:
+    """Same prompt, same tokens: the answer is derived from the prompt hash"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    words = (
+        f"📚 **Stub Tutor** (answer {digest[:8]})\n\n"
+        "1. **Understanding the problem:** read the question carefully.\n"
+        "2. **Solution approach:** break it into small steps.\n"
+        "3. **Step-by-step solution:** work through each step slowly.\n"
+        "4. **Final answer:** check the result makes sense.\n"
+    ).split(" ")
+    return [word + " " for word in words]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    first_token_delay = 0.3
+    token_delay = 0.02
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(404)
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            prompt = json.loads(self.rfile.read(length) or b"{}").get("prompt", "")
+        except ValueError:
+            self.send_error(400, "Invalid JSON")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(stub_answer(prompt)):
+            if i:
+                time.sleep(self.token_delay)
+            data = token.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stub_server(port: int = 0, first_token_ms: float = 300, token_ms: float = 20) -> Tuple[ThreadingHTTPServer, str]:
+    """Run the stub in a background thread; returns (server, base URL)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "first_token_delay": first_token_ms / 1000.0,
+        "token_delay": token_ms / 1000.0,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="ai-stub-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic AI stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.first_token_ms, args.token_ms)
+    print(f"AI stub server listening on {url} (set AI_STUB_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
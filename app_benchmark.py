@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Headless Load Test for the Streamlit App
+Drives streamlit_app.py through Streamlit's AppTest with scripted learner
+flows (onboarding, letters, games, quiz, stories, homework helper) for N
+concurrent sessions, then reports rerun latency percentiles per flow, memory
+per session and throughput. OCR and the AI tutor are replaced by OCR_STUB_TEXT
+and the local stub server, so runs are repeatable and offline.
+
+Sessions run as threads in one process, as they do under `streamlit run`, so
+they share the job queue, AI scheduler and caches. AppTest swaps process-wide
+state (the Streamlit runtime and config) for the length of a run, so reruns
+are serialized with a lock: sessions interleave, and background jobs still
+overlap. A flow that raises or renders an exception fails the whole run; no
+latencies are reported for it.
+
+Usage:
+    python app_benchmark.py --sessions 8
+    python app_benchmark.py --sessions 8 --save-baseline bench_baseline.json
+    python app_benchmark.py --sessions 8 --baseline bench_baseline.json   # exit 1 on regression
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+
+RERUN_TIMEOUT_SECONDS = 60
+JOB_TIMEOUT_SECONDS = 60
+# A flow regresses when its p95 grows by more than this fraction of the baseline
+REGRESSION_TOLERANCE = 0.2
+
+STUB_OCR_TEXT = "What is 12 + 30? Show the steps."
+
+# AppTest is not safe to run concurrently (see the module docstring)
+_rerun_lock = threading.Lock()
+
+MODES = {
+    "learn": "📖 Learn Letters",
+    "practice": "🎯 Practice Game",
+    "stories": "📚 Read Stories",
+    "quiz": "🏆 Quiz Challenge",
+    "ai_helper": "🤖 AI Homework Helper",
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class FlowError(RuntimeError):
+    """The app raised while a scripted flow was running"""
+
+
+class Session:
+    """One simulated learner; every rerun it triggers is timed under the current flow"""
+
+    def __init__(self, name: str):
+        from streamlit.testing.v1 import AppTest
+
+        self.name = name
+        self.at = AppTest.from_file(APP_PATH, default_timeout=RERUN_TIMEOUT_SECONDS)
+        self.flow = "onboarding"
+        self.reruns: Dict[str, List[float]] = {}
+        self.durations: Dict[str, float] = {}
+        self.errors: List[str] = []
+
+    def run(self, element=None):
+        with _rerun_lock:
+            start = time.perf_counter()
+            (element or self.at).run()
+            elapsed = (time.perf_counter() - start) * 1000
+        if self.at.exception:
+            raise FlowError("; ".join(exception.message for exception in self.at.exception))
+        self.reruns.setdefault(self.flow, []).append(elapsed)
+
+    def button(self, label: str):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"No button labelled {label!r} in flow {self.flow}")
+
+    def click(self, label: str):
+        self.run(self.button(label).click())
+
+    def select_mode(self, mode: str):
+        self.run(self.at.sidebar.selectbox[0].select(MODES[mode]))
+
+    def play(self, flow: str, steps: Callable[["Session"], None]) -> bool:
+        """Run one flow; False (and no timings kept for it) if it failed"""
+        self.flow = flow
+        start = time.perf_counter()
+        try:
+            steps(self)
+        except Exception as e:
+            self.errors.append(f"{flow}: {type(e).__name__}: {e}")
+            self.reruns.pop(flow, None)
+            return False
+        self.durations[flow] = time.perf_counter() - start
+        return True
+
+
+# Scripted flows -----------------------------------------------------------
+
+def flow_onboarding(s: Session):
+    s.run()
+    s.at.text_input[0].input(f"Learner {s.name}")
+    s.click("Start Learning! 🚀")
+
+
+def flow_learn_letters(s: Session):
+    s.select_mode("learn")
+    for _ in range(10):
+        s.click("Next ➡️")
+    for _ in range(2):
+        s.click("⬅️ Previous")
+    s.click("✅ Mark as Learned")
+
+
+def flow_recognition_game(s: Session):
+    s.select_mode("practice")
+    s.run(s.at.main.selectbox[0].select("🎯 Letter Recognition"))
+    for _ in range(5):
+        radio = next(r for r in s.at.radio if (r.key or "").startswith("practice:recognition_"))
+        s.run(radio.set_value(radio.options[0]))
+        s.click("Check Answer")
+
+
+def flow_puzzle_game(s: Session):
+    s.select_mode("practice")
+    s.run(s.at.main.selectbox[0].select("🧩 Letter Puzzle"))
+    for _ in range(5):
+        radios = [r for r in s.at.radio if (r.key or "").startswith("practice:puzzle_")]
+        if not radios:
+            return
+        s.run(radios[0].set_value(radios[0].options[0]))
+        s.click("Complete Word")
+
+
+def flow_quiz(s: Session):
+    s.select_mode("quiz")
+    s.click("🚀 Start Quiz")
+    for question in range(10):
+        radio = s.at.radio(key=f"quiz:radio_{question}")
+        s.run(radio.set_value(radio.options[0]))
+        s.run(s.at.button(key=f"quiz:submit_{question}").click())
+        if question < 9:
+            s.run()
+
+
+def flow_stories(s: Session):
+    from story_library import get_story_library
+
+    s.select_mode("stories")
+    # The selectbox holds story ids shown through format_func, so it is driven
+    # by id; these are the stories on the first page with the default filters
+    stories, _ = get_story_library().list_stories(None, None, page=1)
+    for story in stories[:5]:
+        s.run(s.at.selectbox(key="story_id").set_value(story["id"]))
+    roman = next(c for c in s.at.checkbox if c.label.startswith("Show pronunciation"))
+    s.run(roman.check())
+
+
+def flow_homework(s: Session):
+    """file_uploader and camera_input cannot be driven by AppTest, so the upload is
+    submitted to the job queue exactly as process_homework_image does, and the
+    follow-up question goes through the chat UI"""
+    from PIL import Image
+
+    from ai_backend import get_ai_client
+    from chat_store import ChatStore
+    from job_queue import AI, OCR, get_job_queue
+    from ocr import extract_text_from_bytes
+
+    s.select_mode("ai_helper")
+    image = io.BytesIO()
+    Image.new("RGB", (640, 480), "white").save(image, format="PNG")
+    user_id = s.at.session_state["session_id"]
+    queue = get_job_queue()
+
+    text = _wait_for_job(queue, queue.submit(user_id, OCR, extract_text_from_bytes, image.getvalue()))
+    answer = _wait_for_job(queue, queue.submit(user_id, AI, get_ai_client().ask, text, "", False, user_id))
+    chat = ChatStore()
+    chat.add(text, answer)
+    s.at.session_state["chat_history"] = chat
+    s.at.session_state["current_question_context"] = text
+    s.run()
+
+    s.at.text_input(key="followup_input").input("Can you explain step 2 again?")
+    s.click("Ask 🚀")
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while s.at.session_state["pending_followup"] is not None:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Follow-up answer did not arrive")
+        time.sleep(0.05)
+        s.run()
+
+
+def _wait_for_job(queue, job_id):
+    from job_queue import FAILED
+
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while True:
+        job = queue.get(job_id)
+        if job is not None and job.finished:
+            if job.status == FAILED:
+                raise RuntimeError(job.error)
+            return job.result
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Job {job_id} did not finish")
+        time.sleep(0.02)
+
+
+FLOWS = [
+    ("onboarding", flow_onboarding),
+    ("learn_letters", flow_learn_letters),
+    ("recognition_game", flow_recognition_game),
+    ("puzzle_game", flow_puzzle_game),
+    ("quiz", flow_quiz),
+    ("stories", flow_stories),
+    ("homework", flow_homework),
+]
+
+
+def run_session(name: str, flows: List[str]) -> Session:
+    session = Session(name)
+    for flow, steps in FLOWS:
+        # Later flows build on the state earlier ones leave behind
+        if flow in flows and not session.play(flow, steps):
+            break
+    return session
+
+
+def run_load_test(sessions: int, flows: Optional[List[str]] = None) -> Dict:
+    flows = flows or [name for name, _ in FLOWS]
+    if "onboarding" not in flows:
+        flows = ["onboarding"] + flows
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        finished = list(pool.map(lambda i: run_session(str(i), flows), range(sessions)))
+    wall = time.perf_counter() - start
+    # Sessions are still referenced, so their state counts toward memory in use
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    report = {"sessions": sessions, "wall_seconds": round(wall, 2), "flows": {}, "errors": []}
+    total_reruns = 0
+    for flow in flows:
+        latencies = [ms for s in finished for ms in s.reruns.get(flow, [])]
+        durations = [s.durations[flow] for s in finished if flow in s.durations]
+        if not latencies:
+            continue
+        total_reruns += len(latencies)
+        report["flows"][flow] = {
+            "reruns": len(latencies),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_flow_seconds": round(statistics.mean(durations), 3) if durations else None,
+        }
+    report["reruns_per_second"] = round(total_reruns / wall, 2) if wall else None
+    report["memory_per_session_kb"] = round((memory_after - memory_before) / sessions / 1024, 1)
+    report["errors"] = [f"session {s.name}: {e}" for s in finished for e in s.errors]
+    del finished
+    return report
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Flows whose p95 rerun latency grew beyond the tolerance"""
+    regressions = []
+    for flow, stats in report["flows"].items():
+        before = baseline.get("flows", {}).get(flow)
+        if not before or not before.get("p95_ms"):
+            continue
+        change = stats["p95_ms"] / before["p95_ms"] - 1
+        if change > tolerance:
+            regressions.append(f"{flow}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms ({change:+.0%})")
+    return regressions
+
+
+def print_report(report: Dict):
+    print(f"{report['sessions']} sessions in {report['wall_seconds']} s, "
+          f"{report['reruns_per_second']} reruns/s, {report['memory_per_session_kb']} KB per session")
+    print(f"{'flow':18s} {'reruns':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'flow s':>8s}")
+    for flow, stats in report["flows"].items():
+        print(f"{flow:18s} {stats['reruns']:7d} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} "
+              f"{stats['p99_ms']:8.1f} {stats['mean_flow_seconds'] or 0:8.2f}")
+
+
+def _prepare_environment(workdir: str):
+    """Stub OCR and AI, keep the benchmark's databases out of the project directory and
+    publish the sample stories there, as a deploy would"""
+    from ai_stub_server import start_stub_server
+    from story_library import prepare_stories
+
+    os.environ["OCR_STUB_TEXT"] = STUB_OCR_TEXT
+    os.environ.pop("GEMINI_API_KEY", None)
+    _, url = start_stub_server(first_token_ms=50, token_ms=5)
+    os.environ["AI_STUB_URL"] = url
+    os.environ.setdefault("RERUN_PROFILE_DIR", "")
+    os.chdir(workdir)
+    prepare_stories()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless load test for the Streamlit app")
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated learners")
+    parser.add_argument("--flows", nargs="*", choices=[name for name, _ in FLOWS], help="flows to run (default: all)")
+    parser.add_argument("--workdir", help="directory for the app's databases (default: a temporary one)")
+    parser.add_argument("--baseline", help="compare against this saved report; exit 1 on regression")
+    parser.add_argument("--save-baseline", help="write this run's report here")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    _prepare_environment(args.workdir or tempfile.mkdtemp(prefix="gurmukhi_bench_"))
+
+    report = run_load_test(args.sessions, args.flows)
+    if report["errors"]:
+        for error in report["errors"]:
+            print(f"ERROR {error}", file=sys.stderr)
+        sys.exit(f"{len(report['errors'])} session(s) failed; no latencies reported")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {save_path}")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Pronunciation Audio Assets
+Normalizes recorded letter audio (decode, trim silence, loudness-normalize,
+re-encode to Opus) and serves it from an in-process cache
+
+Usage:
+    python audio_assets.py            # process every letter with a recording
+    python audio_assets.py --force    # re-encode letters that are already processed
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+
+AUDIO_DIR = "audio"
+ORIGINALS_DIR = os.path.join(AUDIO_DIR, "originals")
+# letter -> mtime_ns of the playable file ffmpeg produced; anything else is re-encoded
+NORMALIZED_MANIFEST = os.path.join(AUDIO_DIR, "normalized.json")
+
+# Normalized assets: mono 24 kHz Opus, plenty for a single spoken letter
+ENCODED_EXT = ".ogg"
+ENCODED_MIME = "audio/ogg"
+SOURCE_EXTENSIONS = (".wav", ".mp3", ".ogg", ".webm", ".m4a")
+MIME_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".webm": "audio/webm",
+    ".m4a": "audio/mp4",
+}
+
+# Trim leading/trailing silence, then EBU R128 loudness normalization
+FFMPEG_FILTERS = (
+    "silenceremove=start_periods=1:start_threshold=-45dB:start_silence=0.05,"
+    "areverse,"
+    "silenceremove=start_periods=1:start_threshold=-45dB:start_silence=0.05,"
+    "areverse,"
+    "loudnorm=I=-16:TP=-1.5:LRA=11"
+)
+FFMPEG_TIMEOUT_SECONDS = 30
+
+# How long a cached lookup is trusted before the file is stat()ed again
+REVALIDATE_SECONDS = 30.0
+
+# letter -> (checked_at, (path, mtime_ns, bytes, mime) or None)
+_audio_cache: Dict[str, Tuple[float, Optional[Tuple[str, int, bytes, str]]]] = {}
+_audio_cache_lock = threading.Lock()
+_manifest_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def normalize_audio(data: bytes) -> bytes:
+    """Decode any container ffmpeg understands and re-encode it as trimmed, normalized Opus"""
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-af", FFMPEG_FILTERS,
+        "-ac", "1", "-ar", "24000",
+        "-c:a", "libopus", "-b:a", "24k", "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+    result = subprocess.run(command, input=data, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def _candidate_paths(letter: str):
+    yield os.path.join(AUDIO_DIR, letter + ENCODED_EXT)
+    for ext in SOURCE_EXTENSIONS:
+        if ext != ENCODED_EXT:
+            yield os.path.join(AUDIO_DIR, letter + ext)
+
+
+def find_letter_audio_file(letter: str) -> Optional[str]:
+    """Path of the audio for a letter, preferring the normalized asset"""
+    for path in _candidate_paths(letter):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_manifest() -> Dict[str, int]:
+    try:
+        with open(NORMALIZED_MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _mark_normalized(letter: str, path: Optional[str]):
+    """Record (or, with path None, forget) that a letter's playable file was normalized"""
+    with _manifest_lock:
+        manifest = _load_manifest()
+        if path is None:
+            if manifest.pop(letter, None) is None:
+                return
+        else:
+            manifest[letter] = os.stat(path).st_mtime_ns
+        _write_atomic(NORMALIZED_MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def is_normalized(letter: str, path: str) -> bool:
+    """Whether the file at path is the output of normalize_audio (not a raw copy)"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    with _manifest_lock:
+        return _load_manifest().get(letter) == mtime_ns
+
+
+def _remove_variants(letter: str, keep: Optional[str] = None):
+    for path in _candidate_paths(letter):
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+def _original_paths(letter: str):
+    """Kept uploads of a letter, one per extension it was ever uploaded with"""
+    if not os.path.isdir(ORIGINALS_DIR):
+        return []
+    return [os.path.join(ORIGINALS_DIR, name) for name in os.listdir(ORIGINALS_DIR)
+            if os.path.splitext(name)[0] == letter and not name.endswith(".tmp")]
+
+
+def find_original(letter: str) -> Optional[str]:
+    """The letter's most recent original upload"""
+    paths = _original_paths(letter)
+    return max(paths, key=lambda path: os.stat(path).st_mtime_ns) if paths else None
+
+
+def save_letter_audio(letter: str, data: bytes, original_name: str = "") -> str:
+    """Keep the original upload and store a normalized copy for playback"""
+    ext = os.path.splitext(original_name)[1].lower() or ".wav"
+    original_path = os.path.join(ORIGINALS_DIR, letter + ext)
+    _write_atomic(original_path, data)
+    # Only the newest upload is kept, whatever its extension
+    for path in _original_paths(letter):
+        if path != original_path:
+            os.remove(path)
+
+    if ffmpeg_available():
+        path = os.path.join(AUDIO_DIR, letter + ENCODED_EXT)
+        _write_atomic(path, normalize_audio(data))
+        _mark_normalized(letter, path)
+    else:
+        # Without ffmpeg the upload is served unchanged and re-encoded by a later run
+        path = os.path.join(AUDIO_DIR, letter + (ext if ext in SOURCE_EXTENSIONS else ".wav"))
+        _write_atomic(path, data)
+        _mark_normalized(letter, None)
+
+    _remove_variants(letter, keep=path)
+    invalidate_letter_audio(letter)
+    return path
+
+
+def delete_letter_audio(letter: str):
+    """Remove the playable audio for a letter (originals are kept)"""
+    _remove_variants(letter)
+    _mark_normalized(letter, None)
+    invalidate_letter_audio(letter)
+
+
+def invalidate_letter_audio(letter: str):
+    with _audio_cache_lock:
+        _audio_cache.pop(letter, None)
+
+
+def get_letter_audio(letter: str) -> Optional[Tuple[bytes, str]]:
+    """(audio bytes, mime type) for a letter, served from memory after warm-up"""
+    now = time.monotonic()
+    with _audio_cache_lock:
+        cached = _audio_cache.get(letter)
+    if cached is not None and now - cached[0] < REVALIDATE_SECONDS:
+        entry = cached[1]
+        return (entry[2], entry[3]) if entry else None
+
+    path = find_letter_audio_file(letter)
+    entry = None
+    if path is not None:
+        mtime_ns = os.stat(path).st_mtime_ns
+        previous = cached[1] if cached else None
+        if previous and previous[0] == path and previous[1] == mtime_ns:
+            entry = previous
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            entry = (path, mtime_ns, data, MIME_TYPES.get(os.path.splitext(path)[1], "audio/wav"))
+
+    with _audio_cache_lock:
+        _audio_cache[letter] = (now, entry)
+    return (entry[2], entry[3]) if entry else None
+
+
+def preprocess_all_letters(force: bool = False) -> Dict[str, int]:
+    """Normalize the recordings of all 35 letters in one go
+
+    Letters whose playable file is not recorded as normalized (for example an
+    upload stored while ffmpeg was missing) are re-encoded; without ffmpeg
+    they are counted as unnormalized and left alone.
+    """
+    summary = {"processed": 0, "skipped": 0, "missing": 0, "unnormalized": 0, "failed": 0,
+               "bytes_before": 0, "bytes_after": 0}
+    can_normalize = ffmpeg_available()
+
+    for letter, info in GURMUKHI_AKHARI.items():
+        path = find_letter_audio_file(letter)
+        if path is None:
+            summary["missing"] += 1
+            continue
+        if is_normalized(letter, path) and not force:
+            summary["skipped"] += 1
+            continue
+        if not can_normalize:
+            summary["unnormalized"] += 1
+            continue
+
+        # Re-encode from the original upload when we still have it
+        source = find_original(letter) or path
+
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+            new_path = save_letter_audio(letter, data, os.path.basename(source))
+            summary["processed"] += 1
+            summary["bytes_before"] += len(data)
+            summary["bytes_after"] += os.path.getsize(new_path)
+            print(f"{letter} ({info['roman']}): {len(data)} -> {os.path.getsize(new_path)} bytes")
+        except (OSError, RuntimeError, subprocess.SubprocessError):
+            summary["failed"] += 1
+            logger.exception("Could not process audio for %s (%s)", letter, info['roman'])
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize pronunciation audio for all letters")
+    parser.add_argument("--force", action="store_true", help="re-encode letters that are already processed")
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        print("Warning: ffmpeg not found, recordings cannot be normalized")
+    print(preprocess_all_letters(force=args.force))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Letter Audio Sprite
+Packs every recorded letter clip into one Opus file with an offset index in
+GURMUKHI_AKHARI order, so the browser downloads a single cacheable asset
+
+Usage:
+    python audio_sprite.py
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+from audio_assets import FFMPEG_TIMEOUT_SECONDS, REVALIDATE_SECONDS, ffmpeg_available, find_letter_audio_file
+
+# Served by Streamlit static file serving (see .streamlit/config.toml)
+SPRITE_DIR = os.path.join("static", "audio")
+SPRITE_INDEX_PATH = os.path.join(SPRITE_DIR, "letters.json")
+SPRITE_URL_PREFIX = "app/static/audio/"
+
+SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2  # s16le mono
+GAP_SECONDS = 0.25
+
+_index_cache = {"checked_at": 0.0, "mtime_ns": None, "index": None}
+_index_lock = threading.Lock()
+# A change made while a rebuild runs marks the sprite dirty; the running
+# rebuild then goes round again instead of the change being dropped
+_rebuild_lock = threading.Lock()
+_rebuild_state = {"running": False, "dirty": False}
+
+logger = logging.getLogger(__name__)
+
+
+def _decode_to_pcm(path: str) -> bytes:
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", path,
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {path}: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def _encode_pcm(pcm: bytes) -> bytes:
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", "24k", "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+    result = subprocess.run(command, input=pcm, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS * 4)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"ffmpeg failed to encode sprite: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def build_sprite() -> Optional[Dict]:
+    """Concatenate all letter recordings into one sprite and write its index"""
+    if not ffmpeg_available():
+        raise RuntimeError("ffmpeg is required to build the audio sprite")
+
+    gap = b"\x00" * int(SAMPLE_RATE * GAP_SECONDS) * BYTES_PER_SAMPLE
+    chunks = []
+    clips = {}
+    offset = 0
+
+    for position, letter in enumerate(GURMUKHI_AKHARI):
+        path = find_letter_audio_file(letter)
+        if path is None:
+            continue
+        try:
+            pcm = _decode_to_pcm(path)
+        except (OSError, subprocess.SubprocessError, RuntimeError):
+            logger.warning("Skipping %s in the audio sprite", letter, exc_info=True)
+            continue
+        if not pcm:
+            continue
+
+        clips[letter] = {
+            "index": position,
+            "start": offset / (SAMPLE_RATE * BYTES_PER_SAMPLE),
+            "duration": len(pcm) / (SAMPLE_RATE * BYTES_PER_SAMPLE),
+        }
+        chunks.append(pcm)
+        chunks.append(gap)
+        offset += len(pcm) + len(gap)
+
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+    if not clips:
+        _remove_old_sprites(keep=None)
+        if os.path.exists(SPRITE_INDEX_PATH):
+            os.remove(SPRITE_INDEX_PATH)
+        return None
+
+    data = _encode_pcm(b"".join(chunks))
+    # Content hash in the name lets browsers cache the sprite indefinitely
+    filename = f"letters.{hashlib.sha256(data).hexdigest()[:12]}.ogg"
+    sprite_path = os.path.join(SPRITE_DIR, filename)
+    with open(sprite_path, "wb") as f:
+        f.write(data)
+
+    index = {
+        "file": filename,
+        "url": SPRITE_URL_PREFIX + filename,
+        "bytes": len(data),
+        "created_date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "clips": clips,
+    }
+    tmp_path = SPRITE_INDEX_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, SPRITE_INDEX_PATH)
+
+    _remove_old_sprites(keep=filename)
+    return index
+
+
+def _remove_old_sprites(keep: Optional[str]):
+    if not os.path.isdir(SPRITE_DIR):
+        return
+    for name in os.listdir(SPRITE_DIR):
+        if name.startswith("letters.") and name.endswith(".ogg") and name != keep:
+            os.remove(os.path.join(SPRITE_DIR, name))
+
+
+def rebuild_sprite_async():
+    """Rebuild the sprite in a background thread after recordings change"""
+    if not ffmpeg_available():
+        return
+    with _rebuild_lock:
+        _rebuild_state["dirty"] = True
+        if _rebuild_state["running"]:
+            return
+        _rebuild_state["running"] = True
+    threading.Thread(target=_rebuild_until_clean, name="sprite-rebuild", daemon=True).start()
+
+
+def _rebuild_until_clean():
+    while True:
+        with _rebuild_lock:
+            if not _rebuild_state["dirty"]:
+                _rebuild_state["running"] = False
+                return
+            _rebuild_state["dirty"] = False
+        try:
+            build_sprite()
+            invalidate_sprite_index()
+        except Exception:
+            logger.exception("Could not rebuild the audio sprite")
+
+
+def load_sprite_index() -> Optional[Dict]:
+    """Sprite index, re-read only when the file changes"""
+    now = time.monotonic()
+    with _index_lock:
+        if now - _index_cache["checked_at"] < REVALIDATE_SECONDS:
+            return _index_cache["index"]
+
+        try:
+            mtime_ns = os.stat(SPRITE_INDEX_PATH).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if mtime_ns != _index_cache["mtime_ns"]:
+            index = None
+            if mtime_ns is not None:
+                with open(SPRITE_INDEX_PATH, encoding="utf-8") as f:
+                    index = json.load(f)
+            _index_cache["index"] = index
+            _index_cache["mtime_ns"] = mtime_ns
+
+        _index_cache["checked_at"] = now
+        return _index_cache["index"]
+
+
+def get_sprite_clip(letter: str) -> Optional[Dict]:
+    """URL, start and duration of a letter's clip, or None if it is not in the sprite"""
+    index = load_sprite_index()
+    if not index or letter not in index["clips"]:
+        return None
+    clip = index["clips"][letter]
+    return {"url": index["url"], "start": clip["start"], "duration": clip["duration"]}
+
+
+def invalidate_sprite_index():
+    with _index_lock:
+        _index_cache["checked_at"] = 0.0
+
+
+if __name__ == "__main__":
+    result = build_sprite()
+    if result is None:
+        print("No letter recordings found; sprite removed")
+    else:
+        print(f"Built {result['file']} ({result['bytes']} bytes) with {len(result['clips'])} clips")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bounded Chat History for the Homework Helper
+Keeps recent question/answer turns in full, folds older ones into one-line
+summaries under a per-session byte budget, and builds token-budgeted context
+for follow-up prompts
+"""
+
+import re
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RENDER_TURNS = 5
+MAX_BYTES = 64 * 1024
+MAX_SUMMARIES = 30
+SUMMARY_CHARS = 160
+# Rough size of a model token; good enough to keep prompts under budget
+CHARS_PER_TOKEN = 4
+CONTEXT_TOKENS = 1500
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _plain(text: str) -> str:
+    """Markdown/HTML-free single line"""
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    text = re.sub(r"[*_#`>]+", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """One line per turn: the question and the start of the answer"""
+    question = _plain(question)
+    answer_lines = [line for line in (_plain(l) for l in (answer or "").splitlines()) if line]
+    answer = answer_lines[0] if answer_lines else ""
+    return _clip(f"Q: {_clip(question, SUMMARY_CHARS // 2)} A: {answer}", SUMMARY_CHARS)
+
+
+class ChatStore:
+    def __init__(self, max_bytes: int = MAX_BYTES, max_summaries: int = MAX_SUMMARIES):
+        self.max_bytes = max_bytes
+        self.turns: deque = deque()
+        self.summaries: deque = deque(maxlen=max_summaries)
+        self.total_turns = 0
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return self.total_turns
+
+    def __bool__(self) -> bool:
+        return self.total_turns > 0
+
+    def add(self, question: str, answer: str, timestamp: Optional[str] = None):
+        """Append a turn, folding the oldest full turns into summaries to stay under budget"""
+        turn = {
+            'question': question,
+            'answer': answer,
+            'timestamp': timestamp or datetime.now().strftime("%H:%M"),
+            'nbytes': len(question.encode("utf-8")) + len(answer.encode("utf-8")),
+        }
+        self.turns.append(turn)
+        self.nbytes += turn['nbytes']
+        self.total_turns += 1
+        # Always keep the newest turn, even if it alone exceeds the budget
+        while self.nbytes > self.max_bytes and len(self.turns) > 1:
+            self._fold_oldest()
+
+    def _fold_oldest(self):
+        turn = self.turns.popleft()
+        self.nbytes -= turn['nbytes']
+        self.summaries.append(summarize_turn(turn['question'], turn['answer']))
+
+    def recent(self, n: int = RENDER_TURNS) -> List[Dict]:
+        """The last n turns in full"""
+        return list(self.turns)[-n:]
+
+    def older(self, n: int = RENDER_TURNS) -> List[str]:
+        """One-line summaries of everything before the last n turns, oldest first"""
+        hidden = list(self.turns)[:-n] if n else list(self.turns)
+        return list(self.summaries) + [summarize_turn(t['question'], t['answer']) for t in hidden]
+
+    def build_context(self, topic: str = "", token_budget: int = CONTEXT_TOKENS) -> str:
+        """Follow-up context: the original question, newest turns first until the
+        budget runs out, then summaries of older turns if they still fit"""
+        parts = []
+        used = 0
+        if topic:
+            topic_part = "Original question: " + _clip(_plain(topic), token_budget * CHARS_PER_TOKEN // 3)
+            parts.append(topic_part)
+            used += estimate_tokens(topic_part)
+
+        recent_parts = []
+        turns = list(self.turns)
+        folded = 0
+        for turn in reversed(turns):
+            part = f"Student: {_plain(turn['question'])}\nTutor: {_plain(turn['answer'])}"
+            cost = estimate_tokens(part)
+            if used + cost > token_budget:
+                break
+            recent_parts.append(part)
+            used += cost
+            folded += 1
+
+        summary_lines = []
+        older = list(self.summaries) + [
+            summarize_turn(t['question'], t['answer']) for t in turns[:len(turns) - folded]
+        ]
+        for line in reversed(older):
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                break
+            summary_lines.append(line)
+            used += cost
+
+        if summary_lines:
+            parts.append("Earlier in this session:\n" + "\n".join(reversed(summary_lines)))
+        parts.extend(reversed(recent_parts))
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self.turns.clear()
+        self.summaries.clear()
+        self.total_turns = 0
+        self.nbytes = 0
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Compressed Content Storage
+Article bodies are stored as compressed BLOBs (zstd with a trained dictionary
+when the zstandard package is installed, zlib otherwise) and letter sets as a
+packed integer. Rows written before compression still hold plain TEXT and are
+read transparently until they are migrated.
+
+Usage:
+    python content_codec.py --migrate           # compress existing rows
+    python content_codec.py --migrate --train   # train a zstd dictionary first
+    python content_codec.py --report            # size and latency comparison
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from gurmukhi_letters import GURMUKHI_AKHARI, INDEPENDENT_VOWELS, NUKTA_LETTERS
+
+try:
+    import zstandard as zstd
+except ImportError:  # zlib is always available
+    zstd = None
+
+# One-byte format tags at the start of every compressed value
+ZLIB_TAG = b"z"
+ZSTD_TAG = b"s"   # followed by a 2-byte dictionary id (0 = no dictionary)
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+DICTIONARY_SIZE = 16 * 1024
+MIN_TRAINING_SAMPLES = 50
+MIGRATION_BATCH = 200
+
+# Bit i of a letter mask is the i-th letter of GURMUKHI_AKHARI. Masks are
+# persisted, so new letters must only ever be appended to that table.
+LETTER_BITS = {letter: i for i, letter in enumerate(GURMUKHI_AKHARI)}
+BIT_LETTERS = list(GURMUKHI_AKHARI)
+
+def letters_to_mask(chars: Iterable[str]) -> int:
+    """Pack the base letters used by these characters into an integer"""
+    mask = 0
+    for char in chars:
+        if char in INDEPENDENT_VOWELS:
+            char = INDEPENDENT_VOWELS[char][0]
+        elif char in NUKTA_LETTERS:
+            char = NUKTA_LETTERS[char][0]
+        bit = LETTER_BITS.get(char)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_letters(mask: Optional[int]) -> List[str]:
+    if not mask:
+        return []
+    return [letter for i, letter in enumerate(BIT_LETTERS) if mask >> i & 1]
+
+
+class ContentCodec:
+    """Compresses with the newest dictionary; decompresses with whichever one a value names"""
+
+    def __init__(self, dictionaries: Optional[Dict[int, bytes]] = None):
+        self.dictionaries = dictionaries or {}
+        self.dict_id = max(self.dictionaries) if self.dictionaries and zstd else 0
+        self._compressor = None
+        self._decompressors = {}
+        if zstd is not None:
+            dictionary = zstd.ZstdCompressionDict(self.dictionaries[self.dict_id]) if self.dict_id else None
+            self._compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+
+    def compress(self, text: Optional[str]) -> Optional[bytes]:
+        if text is None:
+            return None
+        data = text.encode("utf-8")
+        if self._compressor is not None:
+            return ZSTD_TAG + self.dict_id.to_bytes(2, "big") + self._compressor.compress(data)
+        return ZLIB_TAG + zlib.compress(data, ZLIB_LEVEL)
+
+    def decompress(self, value: Union[None, str, bytes]) -> Optional[str]:
+        """Plain TEXT (not yet migrated) is returned unchanged"""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        tag = value[:1]
+        if tag == ZLIB_TAG:
+            return zlib.decompress(value[1:]).decode("utf-8")
+        if tag == ZSTD_TAG:
+            if zstd is None:
+                raise RuntimeError("Content was compressed with zstd; install the zstandard package")
+            return self._zstd_decompressor(int.from_bytes(value[1:3], "big")).decompress(value[3:]).decode("utf-8")
+        raise ValueError(f"Unknown content encoding tag {tag!r}")
+
+    def _zstd_decompressor(self, dict_id: int):
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = zstd.ZstdCompressionDict(self.dictionaries[dict_id]) if dict_id else None
+            decompressor = zstd.ZstdDecompressor(dict_data=dictionary)
+            self._decompressors[dict_id] = decompressor
+        return decompressor
+
+
+class LazyArticle(dict):
+    """Article row whose bodies are decompressed on first access (article['content_punjabi'])"""
+
+    def __init__(self, codec: ContentCodec, raw: Dict, **fields):
+        super().__init__(**fields)
+        self._codec = codec
+        self._raw = raw
+
+    def __missing__(self, key):
+        if key not in self._raw:
+            raise KeyError(key)
+        value = self._codec.decompress(self._raw.pop(key))
+        self[key] = value
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self._raw
+
+    # Whole-row access (iteration, dict(article), len) decodes everything
+    def _materialize(self):
+        for key in list(self._raw):
+            self[key]
+
+    def __iter__(self):
+        self._materialize()
+        return super().__iter__()
+
+    def __len__(self):
+        return super().__len__() + len(self._raw)
+
+    def keys(self):
+        self._materialize()
+        return super().keys()
+
+    def items(self):
+        self._materialize()
+        return super().items()
+
+    def values(self):
+        self._materialize()
+        return super().values()
+
+
+def init_codec_tables(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS compression_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            algorithm TEXT NOT NULL,
+            data BLOB NOT NULL,
+            created_at TEXT
+        )
+    ''')
+
+
+_codecs: Dict[str, tuple] = {}
+
+
+def get_codec(conn: sqlite3.Connection, db_path: Optional[str] = None) -> ContentCodec:
+    """Codec with every stored dictionary, cached per database until a new one is trained"""
+    try:
+        latest = conn.execute("SELECT MAX(id) FROM compression_dicts").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        # Database created before compression; it can only hold plain text
+        return ContentCodec()
+    cached = _codecs.get(db_path) if db_path else None
+    if cached is not None and cached[0] == latest:
+        return cached[1]
+    rows = conn.execute("SELECT id, data FROM compression_dicts WHERE algorithm = 'zstd'").fetchall()
+    codec = ContentCodec({row[0]: bytes(row[1]) for row in rows})
+    if db_path:
+        _codecs[db_path] = (latest, codec)
+    return codec
+
+
+def train_dictionary(conn: sqlite3.Connection, samples: Optional[Sequence[str]] = None) -> Optional[int]:
+    """Train and store a zstd dictionary from article bodies; None without zstandard or enough data"""
+    if zstd is None:
+        return None
+    if samples is None:
+        codec = get_codec(conn)
+        samples = []
+        for row in conn.execute('''
+            SELECT content_punjabi, content_english FROM punjabi_articles ORDER BY id DESC LIMIT 2000
+        '''):
+            samples.extend(text for text in (codec.decompress(v) for v in row) if text)
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        return None
+    dictionary = zstd.train_dictionary(DICTIONARY_SIZE, [s.encode("utf-8") for s in samples])
+    cursor = conn.execute(
+        "INSERT INTO compression_dicts (algorithm, data, created_at) VALUES ('zstd', ?, ?)",
+        (dictionary.as_bytes(), str(datetime.now()))
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def migrate_content(db_path: str, batch_size: int = MIGRATION_BATCH) -> int:
+    """Compress plain-TEXT bodies and pack JSON letter sets; returns rows migrated"""
+    conn = sqlite3.connect(db_path)
+    migrated = 0
+    try:
+        codec = get_codec(conn, db_path)
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, content_punjabi, content_english, gurmukhi_letters, letter_mask
+                FROM punjabi_articles
+                WHERE id > ? AND (typeof(content_punjabi) = 'text' OR typeof(content_english) = 'text'
+                                  OR letter_mask IS NULL)
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            updates = []
+            for article_id, content_punjabi, content_english, letters_json, mask in rows:
+                if mask is None:
+                    letters = json.loads(letters_json) if letters_json else []
+                    mask = letters_to_mask(letters or (codec.decompress(content_punjabi) or ""))
+                updates.append((
+                    codec.compress(content_punjabi) if isinstance(content_punjabi, str) else content_punjabi,
+                    codec.compress(content_english) if isinstance(content_english, str) else content_english,
+                    mask,
+                    article_id,
+                ))
+            conn.executemany('''
+                UPDATE punjabi_articles
+                SET content_punjabi = ?, content_english = ?, letter_mask = ?, gurmukhi_letters = NULL
+                WHERE id = ?
+            ''', updates)
+            conn.commit()
+            migrated += len(rows)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+    return migrated
+
+
+def _sample_corpus(articles: int = 300, article_chars: int = 2000) -> List[str]:
+    """Article-sized texts built from real vocabulary (RSS ingestion keeps 2000 chars each)"""
+    import random
+
+    from story_library import SAMPLE_STORIES
+    from word_index import starter_vocabulary
+
+    words = [w for w, _ in starter_vocabulary()] + [
+        w for story in SAMPLE_STORIES for w in story["content_punjabi"].split()
+    ]
+    rng = random.Random(0)
+    corpus = []
+    for _ in range(articles):
+        text = []
+        length = 0
+        while length < article_chars:
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(4, 10))) + "।"
+            text.append(sentence)
+            length += len(sentence) + 1
+        corpus.append(" ".join(text)[:article_chars])
+    return corpus
+
+
+def report(db_path: Optional[str] = None):
+    """Compare storage size and read/write latency of plain and compressed bodies"""
+    corpus = []
+    if db_path:
+        conn = sqlite3.connect(db_path)
+        codec = get_codec(conn)
+        corpus = [codec.decompress(v) for (v,) in conn.execute(
+            "SELECT content_punjabi FROM punjabi_articles WHERE content_punjabi IS NOT NULL"
+        )]
+        conn.close()
+    if len(corpus) < MIN_TRAINING_SAMPLES:
+        corpus = _sample_corpus()
+        print(f"Using a synthetic corpus of {len(corpus)} articles")
+    else:
+        print(f"Using {len(corpus)} articles from {db_path}")
+
+    variants = [("plain", None), ("zlib", ContentCodec())]
+    if zstd is not None:
+        dictionary = zstd.train_dictionary(DICTIONARY_SIZE, [t.encode("utf-8") for t in corpus])
+        variants.append(("zstd+dict", ContentCodec({1: dictionary.as_bytes()})))
+
+    plain_bytes = sum(len(t.encode("utf-8")) for t in corpus)
+    for name, codec in variants:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, body)")
+        start = time.perf_counter()
+        for text in corpus:
+            conn.execute("INSERT INTO t (body) VALUES (?)", (codec.compress(text) if codec else text,))
+        conn.commit()
+        write_ms = (time.perf_counter() - start) * 1000 / len(corpus)
+
+        stored = conn.execute("SELECT SUM(LENGTH(CAST(body AS BLOB))) FROM t").fetchone()[0]
+        start = time.perf_counter()
+        for i in range(1, len(corpus) + 1):
+            value = conn.execute("SELECT body FROM t WHERE id = ?", (i,)).fetchone()[0]
+            if codec:
+                codec.decompress(value)
+        read_ms = (time.perf_counter() - start) * 1000 / len(corpus)
+        conn.close()
+        print(f"{name:10s} {stored / 1024:8.1f} KB ({stored / plain_bytes:6.1%} of plain)  "
+              f"write {write_ms:.3f} ms/row  read {read_ms:.3f} ms/row")
+
+
+if __name__ == "__main__":
+    from content_db import CONTENT_DB_PATH, init_content_database
+
+    parser = argparse.ArgumentParser(description="Compressed content storage tools")
+    parser.add_argument("--db", default=CONTENT_DB_PATH)
+    parser.add_argument("--migrate", action="store_true", help="compress existing rows")
+    parser.add_argument("--train", action="store_true", help="train a zstd dictionary before migrating")
+    parser.add_argument("--report", action="store_true", help="size and latency comparison")
+    args = parser.parse_args()
+
+    if args.migrate:
+        init_content_database(args.db)
+        if args.train:
+            conn = sqlite3.connect(args.db)
+            dict_id = train_dictionary(conn)
+            conn.close()
+            print(f"Trained dictionary {dict_id}" if dict_id else "Dictionary not trained (needs zstandard and data)")
+        print(f"Migrated {migrate_content(args.db)} articles")
+    if args.report or not args.migrate:
+        report(args.db)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Content Database Schema
+Tables shared by the RAG ingestion pipeline and the app's read side, plus an
+ingestion generation counter readers use to invalidate their caches
+"""
+
+import sqlite3
+from typing import Dict
+
+from content_codec import init_codec_tables, migrate_content
+from transliteration import TRANSLITERATION_VERSION
+
+CONTENT_DB_PATH = "gurmukhi_content.db"
+INCREMENTAL_VACUUM = 2  # PRAGMA auto_vacuum value
+
+
+def init_content_database(db_path: str = CONTENT_DB_PATH):
+    """Create the content tables if they do not exist
+
+    content_punjabi/content_english of punjabi_articles hold compressed BLOBs
+    (see content_codec); older rows may still be plain TEXT until migrated.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Incremental auto-vacuum lets retention return freed pages in small steps.
+    # A database created without it is converted by one full VACUUM.
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL_VACUUM:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if cursor.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+            cursor.execute("VACUUM")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS punjabi_articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title_punjabi TEXT,
+            title_english TEXT,
+            content_punjabi TEXT,
+            content_english TEXT,
+            source TEXT,
+            url TEXT,
+            difficulty_level INTEGER,
+            gurmukhi_letters TEXT,
+            created_date TEXT,
+            category TEXT,
+            letter_mask INTEGER
+        )
+    ''')
+    add_missing_columns(cursor, 'punjabi_articles', {'letter_mask': 'INTEGER'})
+    init_codec_tables(cursor)
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word_punjabi TEXT,
+            word_english TEXT,
+            pronunciation TEXT,
+            difficulty INTEGER,
+            category TEXT
+        )
+    ''')
+    # Index from an earlier vocabulary.article_id keep rule; nothing ever filled the column
+    cursor.execute('DROP INDEX IF EXISTS idx_vocabulary_article')
+
+    # Bumped by every ingestion so readers know their cached queries are stale
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO content_meta (key, value) VALUES ('generation', 0)")
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_difficulty
+        ON punjabi_articles (difficulty_level, created_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_created
+        ON punjabi_articles (created_date)
+    ''')
+
+    # Kid-friendly stories materialized from articles, one per source article
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learning_stories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER NOT NULL UNIQUE,
+            title_punjabi TEXT,
+            title_english TEXT,
+            content_punjabi TEXT,
+            content_english TEXT,
+            title_roman TEXT,
+            content_roman TEXT,
+            difficulty_level INTEGER,
+            gurmukhi_letters TEXT,
+            letter_mask INTEGER,
+            source TEXT,
+            source_url TEXT,
+            source_created_date TEXT,
+            source_hash TEXT,
+            refreshed_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_learning_stories_difficulty
+        ON learning_stories (difficulty_level, source_created_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_learning_stories_created
+        ON learning_stories (source_created_date)
+    ''')
+
+    # Columns added after the table was first released; stories are rebuilt to fill them
+    if add_missing_columns(cursor, 'learning_stories', {
+        'title_roman': 'TEXT', 'content_roman': 'TEXT', 'letter_mask': 'INTEGER',
+    }):
+        cursor.execute("UPDATE learning_stories SET source_hash = NULL")
+
+    # Stories romanized by an older transliteration are rebuilt too
+    row = cursor.execute("SELECT value FROM content_meta WHERE key = 'transliteration_version'").fetchone()
+    if (row[0] if row else 1) < TRANSLITERATION_VERSION:
+        cursor.execute("UPDATE learning_stories SET source_hash = NULL")
+        cursor.execute("INSERT OR REPLACE INTO content_meta (key, value) VALUES ('transliteration_version', ?)",
+                       (TRANSLITERATION_VERSION,))
+
+    # Articles whose story needs (re)building; filled by triggers so refreshes are incremental
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learning_story_queue (
+            article_id INTEGER PRIMARY KEY
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_articles_insert_story
+        AFTER INSERT ON punjabi_articles
+        BEGIN
+            INSERT OR IGNORE INTO learning_story_queue (article_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_articles_update_story
+        AFTER UPDATE OF title_punjabi, title_english, content_punjabi, content_english,
+                        difficulty_level, source, url ON punjabi_articles
+        BEGIN
+            INSERT OR IGNORE INTO learning_story_queue (article_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_articles_delete_story
+        AFTER DELETE ON punjabi_articles
+        BEGIN
+            DELETE FROM learning_stories WHERE article_id = OLD.id;
+            DELETE FROM learning_story_queue WHERE article_id = OLD.id;
+        END
+    ''')
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO learning_story_queue (article_id)
+        SELECT article_id FROM learning_stories WHERE source_hash IS NULL
+    ''')
+
+    # Articles stored before the stories table existed are queued once
+    backfilled = cursor.execute(
+        "SELECT value FROM content_meta WHERE key = 'learning_stories_backfilled'"
+    ).fetchone()
+    if not backfilled:
+        cursor.execute('''
+            INSERT OR IGNORE INTO learning_story_queue (article_id)
+            SELECT id FROM punjabi_articles
+            WHERE id NOT IN (SELECT article_id FROM learning_stories)
+        ''')
+        cursor.execute("INSERT INTO content_meta (key, value) VALUES ('learning_stories_backfilled', 1)")
+
+    compressed = cursor.execute(
+        "SELECT value FROM content_meta WHERE key = 'content_compressed'"
+    ).fetchone()
+
+    conn.commit()
+    conn.close()
+
+    # Articles stored as plain text before compression are migrated once
+    if not compressed:
+        migrate_content(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT OR IGNORE INTO content_meta (key, value) VALUES ('content_compressed', 1)")
+        conn.commit()
+        conn.close()
+
+
+def add_missing_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> bool:
+    """ALTER TABLE ADD COLUMN for columns an older database lacks; True if any were added"""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    added = False
+    for name, column_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+            added = True
+    return added
+
+
+def get_generation(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM content_meta WHERE key = 'generation'").fetchone()
+    return row[0] if row else 0
+
+
+def bump_generation(conn: sqlite3.Connection) -> None:
+    """Mark content as changed; call inside the ingesting transaction"""
+    conn.execute('''
+        INSERT INTO content_meta (key, value) VALUES ('generation', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    ''')
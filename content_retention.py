@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Content Retention
+Expires old articles from the content database in small batches, by age with
+per-source and per-category overrides, and gives the freed pages back to the
+filesystem with bounded incremental vacuum steps so no step holds the write
+lock for long.
+
+Usage:
+    python content_retention.py                 # apply the retention policy
+    python content_retention.py --dry-run       # count what would expire
+    python content_retention.py --simulate 120  # size/latency over 120 days of ingestion
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from content_db import CONTENT_DB_PATH, bump_generation, init_content_database
+
+# Days an article is kept; override per deployment with CONTENT_RETENTION_DAYS
+DEFAULT_RETENTION_DAYS = 30
+# Per-source and per-category overrides; None keeps those articles forever.
+# Category wins over source. Curated stories are not news and never expire.
+SOURCE_RETENTION_DAYS: Dict[str, Optional[int]] = {
+    "Sample Story": None,
+}
+CATEGORY_RETENTION_DAYS: Dict[str, Optional[int]] = {
+    "story": None,
+}
+
+DELETE_BATCH = 100
+VACUUM_STEP_PAGES = 256
+MAX_VACUUM_STEPS = 64
+VACUUM_PAUSE_SECONDS = 0.01
+
+
+def default_policy() -> Dict:
+    return {
+        "days": int(os.environ.get("CONTENT_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)),
+        "sources": dict(SOURCE_RETENTION_DAYS),
+        "categories": dict(CATEGORY_RETENTION_DAYS),
+    }
+
+
+def _policy_scopes(policy: Dict) -> List[Tuple[str, tuple, Optional[int]]]:
+    """(WHERE clause, params, days) per rule, each article falling under exactly one"""
+    categories = policy.get("categories", {})
+    sources = policy.get("sources", {})
+    scopes = []
+    category_names = tuple(categories)
+    not_category = (
+        f"IFNULL(category, '') NOT IN ({', '.join('?' * len(category_names))})" if category_names else "1"
+    )
+    for category, days in categories.items():
+        scopes.append(("category = ?", (category,), days))
+    for source, days in sources.items():
+        scopes.append((f"source = ? AND {not_category}", (source,) + category_names, days))
+    source_names = tuple(sources)
+    not_source = f"IFNULL(source, '') NOT IN ({', '.join('?' * len(source_names))})" if source_names else "1"
+    scopes.append((f"{not_source} AND {not_category}", source_names + category_names, policy["days"]))
+    return scopes
+
+
+def expire_articles(db_path: str = CONTENT_DB_PATH, policy: Optional[Dict] = None,
+                    batch_size: int = DELETE_BATCH, now: Optional[datetime] = None,
+                    dry_run: bool = False) -> int:
+    """Delete articles older than their retention period; returns how many expired
+
+    Stories of deleted articles are removed by the delete trigger.
+    """
+    policy = policy or default_policy()
+    now = now or datetime.now()
+    conn = sqlite3.connect(db_path)
+    expired = 0
+    try:
+        for where, params, days in _policy_scopes(policy):
+            if days is None:
+                continue
+            cutoff = str(now - timedelta(days=days))
+            query = f'''
+                SELECT id FROM punjabi_articles
+                WHERE created_date < ? AND {where}
+            '''
+            if dry_run:
+                expired += conn.execute(f"SELECT COUNT(*) FROM ({query})", (cutoff,) + params).fetchone()[0]
+                continue
+            # One short transaction per batch keeps the write lock brief
+            while True:
+                ids = [row[0] for row in conn.execute(query + " LIMIT ?", (cutoff,) + params + (batch_size,))]
+                if not ids:
+                    break
+                conn.execute(f"DELETE FROM punjabi_articles WHERE id IN ({', '.join('?' * len(ids))})", ids)
+                bump_generation(conn)
+                conn.commit()
+                expired += len(ids)
+    finally:
+        conn.close()
+    return expired
+
+
+def incremental_vacuum(db_path: str = CONTENT_DB_PATH, step_pages: int = VACUUM_STEP_PAGES,
+                       max_steps: int = MAX_VACUUM_STEPS) -> int:
+    """Return free pages to the filesystem a few at a time; returns pages freed"""
+    conn = sqlite3.connect(db_path)
+    freed = 0
+    try:
+        for _ in range(max_steps):
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # Each step is its own short write transaction
+            conn.execute(f"PRAGMA incremental_vacuum({min(step_pages, free)})").fetchall()
+            conn.commit()
+            freed += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(VACUUM_PAUSE_SECONDS)
+    finally:
+        conn.close()
+    return freed
+
+
+def apply_retention(db_path: str = CONTENT_DB_PATH, policy: Optional[Dict] = None,
+                    now: Optional[datetime] = None) -> Dict[str, int]:
+    """Expire old articles, then reclaim their space"""
+    size_before = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+    expired = expire_articles(db_path, policy, now=now)
+    pages_freed = incremental_vacuum(db_path) if expired else 0
+    return {
+        "expired": expired,
+        "pages_freed": pages_freed,
+        "size_before": size_before,
+        "size_after": os.path.getsize(db_path),
+    }
+
+
+def simulate(days: int = 120, articles_per_day: int = 15, db_path: str = "retention_sim.db"):
+    """Daily ingestion plus retention; size and story query latency should level off"""
+    from content_codec import _sample_corpus, get_codec, letters_to_mask
+    from learning_stories import get_learning_stories, refresh_learning_stories
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    init_content_database(db_path)
+    corpus = _sample_corpus()
+    start_day = datetime.now() - timedelta(days=days)
+    for day in range(days):
+        today = start_day + timedelta(days=day)
+        conn = sqlite3.connect(db_path)
+        codec = get_codec(conn, db_path)
+        for i in range(articles_per_day):
+            text = corpus[(day * articles_per_day + i) % len(corpus)]
+            conn.execute('''
+                INSERT INTO punjabi_articles
+                (title_punjabi, title_english, content_punjabi, content_english,
+                 source, url, difficulty_level, letter_mask, created_date, category)
+                VALUES (?, ?, ?, ?, 'Simulated', ?, ?, ?, ?, 'news')
+            ''', (text[:20], f"Article {day}-{i}", codec.compress(text), None,
+                  f"sim://{day}/{i}", 1 + i % 3, letters_to_mask(text), str(today)))
+        bump_generation(conn)
+        conn.commit()
+        conn.close()
+        refresh_learning_stories(db_path)
+        stats = apply_retention(db_path, now=today)
+
+        if day % 10 == 9 or day == days - 1:
+            t = time.perf_counter()
+            for difficulty in (1, 2, 3):
+                get_learning_stories(db_path, difficulty=difficulty)
+            query_ms = (time.perf_counter() - t) * 1000 / 3
+            print(f"day {day + 1:4d}: {stats['size_after'] / 1024:8.1f} KB, "
+                  f"expired {stats['expired']:3d}, story query {query_ms:.2f} ms")
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expire old content and reclaim space")
+    parser.add_argument("--db", default=CONTENT_DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="only count expired articles")
+    parser.add_argument("--simulate", type=int, metavar="DAYS", help="simulate months of ingestion")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args.simulate)
+    elif args.dry_run:
+        init_content_database(args.db)
+        print(f"{expire_articles(args.db, dry_run=True)} articles would expire")
+    else:
+        init_content_database(args.db)
+        stats = apply_retention(args.db)
+        print(f"Expired {stats['expired']} articles, freed {stats['pages_freed']} pages "
+              f"({stats['size_before'] / 1024:.1f} KB -> {stats['size_after'] / 1024:.1f} KB)")
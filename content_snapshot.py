@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Read-only Content Snapshots
+After each ingestion cycle the content database is copied with VACUUM INTO,
+analyzed, and published by atomically replacing a small CURRENT pointer file.
+The app reads the newest snapshot with immutable=1 and memory-mapped I/O, so
+its reads never wait on the ingestion job's write locks.
+
+Usage:
+    python content_snapshot.py            # refresh stories and publish a snapshot of the current generation
+    python content_snapshot.py --status   # show the published snapshot
+"""
+
+import argparse
+import os
+import sqlite3
+import urllib.parse
+from typing import Optional, Tuple
+
+from content_db import CONTENT_DB_PATH, get_generation
+
+POINTER_FILE = "CURRENT"
+SNAPSHOT_PREFIX = "content-"
+SNAPSHOT_SUFFIX = ".db"
+# Readers may still have the previous snapshot open while they switch
+KEEP_SNAPSHOTS = 2
+MMAP_BYTES = 256 * 1024 * 1024
+
+
+def snapshot_dir_for(db_path: str = CONTENT_DB_PATH) -> str:
+    """CONTENT_SNAPSHOT_DIR, or a directory next to the database"""
+    return os.environ.get("CONTENT_SNAPSHOT_DIR") or os.path.splitext(db_path)[0] + "_snapshots"
+
+
+def current_snapshot(snapshot_dir: str) -> Optional[Tuple[int, str]]:
+    """(generation, path) of the published snapshot, or None if there is none"""
+    try:
+        with open(os.path.join(snapshot_dir, POINTER_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(snapshot_dir, name)
+    if not name.startswith(SNAPSHOT_PREFIX) or not os.path.exists(path):
+        return None
+    return int(name[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]), path
+
+
+def open_snapshot(path: str) -> sqlite3.Connection:
+    """Lock-free read-only connection; immutable=1 skips locking and change detection"""
+    uri = "file:" + urllib.parse.quote(os.path.abspath(path)) + "?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    return conn
+
+
+def publish_snapshot(db_path: str = CONTENT_DB_PATH, snapshot_dir: Optional[str] = None) -> Optional[str]:
+    """Publish a compact, analyzed copy of the database if its generation is new
+
+    Returns the new snapshot's path, or None when the published one is current.
+    """
+    snapshot_dir = snapshot_dir or snapshot_dir_for(db_path)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        generation = get_generation(conn)
+        current = current_snapshot(snapshot_dir)
+        if current is not None and current[0] == generation:
+            return None
+        name = f"{SNAPSHOT_PREFIX}{generation}{SNAPSHOT_SUFFIX}"
+        path = os.path.join(snapshot_dir, name)
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # A consistent copy of one read transaction, rebuilt without free pages
+        conn.execute("VACUUM INTO ?", (tmp_path,))
+    finally:
+        conn.close()
+
+    snapshot = sqlite3.connect(tmp_path)
+    try:
+        snapshot.execute("ANALYZE")
+        snapshot.commit()
+    finally:
+        snapshot.close()
+    os.replace(tmp_path, path)
+
+    # Readers see either the old pointer or the new one, never a partial file
+    pointer_tmp = os.path.join(snapshot_dir, POINTER_FILE + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(snapshot_dir, POINTER_FILE))
+
+    _prune_snapshots(snapshot_dir)
+    return path
+
+
+def _prune_snapshots(snapshot_dir: str):
+    snapshots = sorted(
+        (int(name[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]), name)
+        for name in os.listdir(snapshot_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+    )
+    for _, name in snapshots[:-KEEP_SNAPSHOTS]:
+        try:
+            os.remove(os.path.join(snapshot_dir, name))
+        except OSError:
+            # Still open by a reader on a platform that forbids deleting open files
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish read-only content snapshots")
+    parser.add_argument("--db", default=CONTENT_DB_PATH)
+    parser.add_argument("--dir", help="snapshot directory (default: next to the database)")
+    parser.add_argument("--status", action="store_true", help="show the published snapshot")
+    args = parser.parse_args()
+
+    snapshot_dir = args.dir or snapshot_dir_for(args.db)
+    if not args.status:
+        # Imported here: story_library reads snapshots through this module
+        from story_library import prepare_stories
+
+        path = prepare_stories(args.db, snapshot_dir)
+        print(f"Published {path}" if path else "Snapshot is already current")
+    current = current_snapshot(snapshot_dir)
+    if current:
+        print(f"Generation {current[0]}: {current[1]} ({os.path.getsize(current[1]) / 1024:.1f} KB)")
+    else:
+        print("No snapshot published")
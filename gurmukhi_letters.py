@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Gurmukhi Akhari data shared by the app and its background tools
+Importing this module has no Streamlit side effects
+"""
+
+# 35 Gurmukhi Akhari (letters) with pronunciation and meanings
+GURMUKHI_AKHARI = {
+    "ੳ": {"roman": "Oora", "sound": "a", "phonetic": "OO-dha", "example": "ਅੰਗੂਰ (Angoor - Grapes)", "emoji": "🍇"},
+    "ਅ": {"roman": "Aira", "sound": "aa", "phonetic": "AY-dha", "example": "ਆਮ (Aam - Mango)", "emoji": "🥭"},
+    "ੲ": {"roman": "Iri", "sound": "i", "phonetic": "EE-dhee", "example": "ਇਕ (Ik - One)", "emoji": "1️⃣"},
+    "ਸ": {"roman": "Sassa", "sound": "s", "phonetic": "SUSS-saa", "example": "ਸੇਬ (Seb - Apple)", "emoji": "🍎"},
+    "ਹ": {"roman": "Haha", "sound": "h", "phonetic": "HAH-haa", "example": "ਹਾਥੀ (Haathi - Elephant)", "emoji": "🐘"},
+    "ਕ": {"roman": "Kakka", "sound": "k", "phonetic": "KUCK-kaa", "example": "ਕਮਲ (Kamal - Lotus)", "emoji": "🪷"},
+    "ਖ": {"roman": "Khakha", "sound": "kh", "phonetic": "KHUCK-khaa", "example": "ਖਰਗੋਸ਼ (Khargosh - Rabbit)", "emoji": "🐰"},
+    "ਗ": {"roman": "Gagga", "sound": "g", "phonetic": "GUCK-gaa", "example": "ਗਾਂ (Gaan - Cow)", "emoji": "🐄"},
+    "ਘ": {"roman": "Ghagha", "sound": "gh", "phonetic": "GHUCK-ghaa", "example": "ਘੋੜਾ (Ghora - Horse)", "emoji": "🐎"},
+    "ਙ": {"roman": "Nganga", "sound": "ng", "phonetic": "NG-ung-gaa", "example": "ਅੰਗ (Ang - Body part)", "emoji": "👤"},
+    "ਚ": {"roman": "Chacha", "sound": "ch", "phonetic": "CHUH-chaa", "example": "ਚੰਦ (Chand - Moon)", "emoji": "🌙"},
+    "ਛ": {"roman": "Chhachha", "sound": "chh", "phonetic": "CHHUH-chhaa", "example": "ਛਤਰੀ (Chhatri - Umbrella)", "emoji": "☂️"},
+    "ਜ": {"roman": "Jajja", "sound": "j", "phonetic": "JUH-jaa", "example": "ਜਹਾਜ਼ (Jahaaz - Ship)", "emoji": "🚢"},
+    "ਝ": {"roman": "Jhajha", "sound": "jh", "phonetic": "JHUH-jhaa", "example": "ਝੰਡਾ (Jhanda - Flag)", "emoji": "🏳️"},
+    "ਞ": {"roman": "Nyanya", "sound": "ny", "phonetic": "NYUH-nyaa", "example": "ਞਾਣ (Gyaan - Knowledge)", "emoji": "🧠"},
+    "ਟ": {"roman": "Tanka", "sound": "t", "phonetic": "TUNK-kaa", "example": "ਟੋਪੀ (Topi - Hat)", "emoji": "🎩"},
+    "ਠ": {"roman": "Thatha", "sound": "th", "phonetic": "THUH-thaa", "example": "ਠੰਡ (Thand - Cold)", "emoji": "🥶"},
+    "ਡ": {"roman": "Dadda", "sound": "d", "phonetic": "DUH-daa", "example": "ਡਰਾਮਾ (Drama)", "emoji": "🎭"},
+    "ਢ": {"roman": "Dhadha", "sound": "dh", "phonetic": "DHUH-dhaa", "example": "ਢੋਲ (Dhol - Drum)", "emoji": "🥁"},
+    "ਣ": {"roman": "Nana", "sound": "n", "phonetic": "NUH-naa", "example": "ਗੁਣ (Gun - Quality)", "emoji": "⭐"},
+    "ਤ": {"roman": "Tatta", "sound": "t", "phonetic": "TUH-taa", "example": "ਤਾਰਾ (Tara - Star)", "emoji": "⭐"},
+    "ਥ": {"roman": "Thatha", "sound": "th", "phonetic": "THUH-thaa", "example": "ਥਾਲੀ (Thaali - Plate)", "emoji": "🍽️"},
+    "ਦ": {"roman": "Dadda", "sound": "d", "phonetic": "DUH-daa", "example": "ਦਰਵਾਜ਼ਾ (Darwaza - Door)", "emoji": "🚪"},
+    "ਧ": {"roman": "Dhadha", "sound": "dh", "phonetic": "DHUH-dhaa", "example": "ਧੁੱਪ (Dhoop - Sunlight)", "emoji": "☀️"},
+    "ਨ": {"roman": "Nanna", "sound": "n", "phonetic": "NUH-naa", "example": "ਨਦੀ (Nadi - River)", "emoji": "🏞️"},
+    "ਪ": {"roman": "Pappa", "sound": "p", "phonetic": "PUH-paa", "example": "ਪੰਛੀ (Panchhi - Bird)", "emoji": "🐦"},
+    "ਫ": {"roman": "Phappha", "sound": "ph", "phonetic": "PHUH-phaa", "example": "ਫੁੱਲ (Phul - Flower)", "emoji": "🌸"},
+    "ਬ": {"roman": "Babba", "sound": "b", "phonetic": "BUH-baa", "example": "ਬਿੱਲਾ (Billa - Cat)", "emoji": "🐱"},
+    "ਭ": {"roman": "Bhabha", "sound": "bh", "phonetic": "BHUH-bhaa", "example": "ਭਾਲੂ (Bhaloo - Bear)", "emoji": "🐻"},
+    "ਮ": {"roman": "Mamma", "sound": "m", "phonetic": "MUH-maa", "example": "ਮੱਛੀ (Machhi - Fish)", "emoji": "🐟"},
+    "ਯ": {"roman": "Yayya", "sound": "y", "phonetic": "YUH-yaa", "example": "ਯੋਗ (Yog - Yoga)", "emoji": "🧘"},
+    "ਰ": {"roman": "Rara", "sound": "r", "phonetic": "RUH-raa", "example": "ਰੋਟੀ (Roti - Bread)", "emoji": "🫓"},
+    "ਲ": {"roman": "Lalla", "sound": "l", "phonetic": "LUH-laa", "example": "ਲੱਡੂ (Laddu - Sweet)", "emoji": "🍬"},
+    "ਵ": {"roman": "Vava", "sound": "v", "phonetic": "VUH-vaa", "example": "ਵਿਆਹ (Viah - Wedding)", "emoji": "💒"},
+    "ੜ": {"roman": "Rara", "sound": "r", "phonetic": "RUH-raa", "example": "ਪੜ੍ਹਨਾ (Parhna - To read)", "emoji": "📖"}
+}
+
+# Combining signs that belong to the preceding letter: bindi, visarga, nukta,
+# vowel signs, virama, udaat, tippi, addak and yakash
+COMBINING_MARKS = frozenset(
+    [chr(c) for c in (0x0A01, 0x0A02, 0x0A03, 0x0A3C, 0x0A51, 0x0A70, 0x0A71, 0x0A75)]
+    + [chr(c) for c in range(0x0A3E, 0x0A4E)]
+)
+VIRAMA = "੍"
+
+# Independent vowels are written with one of the three vowel carriers plus a vowel sign
+INDEPENDENT_VOWELS = {
+    "ਆ": ("ਅ", "ਾ"), "ਐ": ("ਅ", "ੈ"), "ਔ": ("ਅ", "ੌ"),
+    "ਇ": ("ੲ", "ਿ"), "ਈ": ("ੲ", "ੀ"), "ਏ": ("ੲ", "ੇ"),
+    "ਉ": ("ੳ", "ੁ"), "ਊ": ("ੳ", "ੂ"), "ਓ": ("ੳ", "ੋ"),
+}
+# Precomposed nukta letters decompose to their base letter plus nukta
+NUKTA_LETTERS = {
+    "ਲ਼": ("ਲ", "਼"), "ਸ਼": ("ਸ", "਼"), "ਖ਼": ("ਖ", "਼"),
+    "ਗ਼": ("ਗ", "਼"), "ਜ਼": ("ਜ", "਼"), "ਫ਼": ("ਫ", "਼"),
+}
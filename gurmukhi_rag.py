@@ -13,6 +13,13 @@ from typing import List, Dict, Optional
 import json
 import re
 
+from content_codec import LazyArticle, get_codec, letters_to_mask, mask_to_letters
+from content_db import init_content_database, bump_generation
+from content_retention import apply_retention
+from content_snapshot import publish_snapshot
+from learning_stories import get_learning_stories, refresh_learning_stories, simplify_article
+from story_library import seed_sample_stories
+
 class GurmukhiRAG:
     def __init__(self, db_path="gurmukhi_content.db"):
         self.db_path = db_path
@@ -39,38 +46,7 @@ class GurmukhiRAG:
     
     def init_database(self):
         """Initialize database for storing Punjabi content"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS punjabi_articles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title_punjabi TEXT,
-                title_english TEXT,
-                content_punjabi TEXT,
-                content_english TEXT,
-                source TEXT,
-                url TEXT,
-                difficulty_level INTEGER,
-                gurmukhi_letters TEXT,
-                created_date TEXT,
-                category TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vocabulary (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                word_punjabi TEXT,
-                word_english TEXT,
-                pronunciation TEXT,
-                difficulty INTEGER,
-                category TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        init_content_database(self.db_path)
     
     def fetch_punjabi_content(self) -> List[Dict]:
         """Fetch latest Punjabi articles from RSS feeds"""
@@ -191,35 +167,39 @@ class GurmukhiRAG:
         title_english = self.translate_to_english(article_data.get('title', ''))
         content_english = self.translate_to_english(analysis['gurmukhi_text'])
         
+        # Bodies are stored compressed and the letter set as a bit mask
+        codec = get_codec(conn, self.db_path)
         cursor.execute('''
             INSERT INTO punjabi_articles 
             (title_punjabi, title_english, content_punjabi, content_english, 
-             source, url, difficulty_level, gurmukhi_letters, created_date, category)
+             source, url, difficulty_level, letter_mask, created_date, category)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             article_data.get('title', ''),
             title_english,
-            analysis['gurmukhi_text'],
-            content_english,
+            codec.compress(analysis['gurmukhi_text']),
+            codec.compress(content_english),
             article_data.get('source', ''),
             article_data.get('link', ''),
             analysis['difficulty'],
-            json.dumps(analysis['unique_letters']),
+            letters_to_mask(analysis['unique_letters']),
             str(datetime.now()),
             'news'
         ))
+        bump_generation(conn)
         
         conn.commit()
         conn.close()
     
     def get_articles_by_difficulty(self, difficulty: int) -> List[Dict]:
-        """Retrieve articles by difficulty level"""
+        """Retrieve articles by difficulty level; bodies are decompressed when first read"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        codec = get_codec(conn, self.db_path)
         
         cursor.execute('''
             SELECT title_punjabi, title_english, content_punjabi, content_english,
-                   source, difficulty_level, gurmukhi_letters
+                   source, difficulty_level, gurmukhi_letters, letter_mask
             FROM punjabi_articles 
             WHERE difficulty_level = ?
             ORDER BY created_date DESC
@@ -228,39 +208,42 @@ class GurmukhiRAG:
         
         articles = []
         for row in cursor.fetchall():
-            articles.append({
-                'title_punjabi': row[0],
-                'title_english': row[1],
-                'content_punjabi': row[2],
-                'content_english': row[3],
-                'source': row[4],
-                'difficulty': row[5],
-                'letters': json.loads(row[6]) if row[6] else []
-            })
+            articles.append(LazyArticle(
+                codec,
+                {'content_punjabi': row[2], 'content_english': row[3]},
+                title_punjabi=row[0],
+                title_english=row[1],
+                source=row[4],
+                difficulty=row[5],
+                letters=mask_to_letters(row[7]) if row[7] is not None else (json.loads(row[6]) if row[6] else [])
+            ))
         
         conn.close()
         return articles
     
     def create_learning_stories(self) -> List[Dict]:
-        """Create kid-friendly learning stories from news content"""
-        articles = self.get_articles_by_difficulty(1)  # Get beginner level content
-        
-        learning_stories = []
-        for article in articles[:3]:  # Process top 3 articles
-            # Simplify content for kids
-            simplified_story = self.simplify_for_kids(article)
-            learning_stories.append(simplified_story)
-        
-        return learning_stories
+        """Kid-friendly learning stories, read from the materialized learning_stories table"""
+        return [{
+            'title_punjabi': story['title_punjabi'],
+            'title_english': story['title_english'],
+            'content_punjabi': story['content_punjabi'],
+            'content_english': story['content_english'],
+            'difficulty': story['difficulty_level'],
+            'category': 'story',
+            'article_id': story['article_id'],
+            'source': story['source'],
+            'source_url': story['source_url'],
+        } for story in get_learning_stories(self.db_path, difficulty=1, limit=3)]
     
     def simplify_for_kids(self, article: Dict) -> Dict:
         """Simplify article content for children"""
         # This would use LLM to simplify content in real implementation
+        story = simplify_article({**article, 'difficulty_level': 1})
         return {
-            'title_punjabi': article['title_punjabi'],
-            'title_english': f"Story: {article['title_english']}",
-            'content_punjabi': article['content_punjabi'][:200] + "...",
-            'content_english': article['content_english'][:200] + "...",
+            'title_punjabi': story['title_punjabi'],
+            'title_english': story['title_english'],
+            'content_punjabi': story['content_punjabi'],
+            'content_english': story['content_english'],
             'difficulty': 1,
             'category': 'story'
         }
@@ -273,7 +256,16 @@ class GurmukhiRAG:
         for article in articles:
             self.store_article(article)
         
-        print(f"Updated database with {len(articles)} new articles")
+        # Built-in stories keep Stories mode usable until a feed delivers articles
+        seed_sample_stories(self.db_path)
+        # Only the newly stored articles are simplified into stories
+        stories = refresh_learning_stories(self.db_path)
+        retention = apply_retention(self.db_path)
+        # The app reads this copy, so it never waits on ingestion locks
+        publish_snapshot(self.db_path)
+        
+        print(f"Updated database with {len(articles)} new articles ({stories} stories refreshed, "
+              f"{retention['expired']} old articles expired)")
         return len(articles)
 
 # Sample usage and testing
@@ -298,5 +290,6 @@ if __name__ == "__main__":
     
     for story in sample_stories:
         rag.store_article(story)
+    refresh_learning_stories(rag.db_path)
     
     print("Sample stories added to database!")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Gurmukhi Text Segmentation
+Grapheme-cluster and sentence boundaries so text can be shortened without
+splitting a letter from its vowel signs or a subjoined letter from its base
+"""
+
+import unicodedata
+from typing import List
+
+from gurmukhi_letters import COMBINING_MARKS, VIRAMA
+
+ZERO_WIDTH_JOINERS = frozenset(["\u200c", "\u200d"])
+# Danda and double danda end Gurmukhi sentences
+SENTENCE_ENDS = frozenset(["।", "॥", ".", "!", "?"])
+ELLIPSIS = "…"
+
+# Prefer a sentence end, as long as it keeps at least this much of the allowed length
+MIN_SENTENCE_FRACTION = 0.5
+
+
+def _extends_cluster(char: str) -> bool:
+    return char in COMBINING_MARKS or char in ZERO_WIDTH_JOINERS or unicodedata.category(char).startswith("M")
+
+
+def cluster_boundaries(text: str) -> List[int]:
+    """Offsets where a grapheme cluster starts, plus len(text)"""
+    boundaries = []
+    i = 0
+    n = len(text)
+    while i < n:
+        boundaries.append(i)
+        i += 1
+        while i < n:
+            if text[i - 1] == VIRAMA or text[i - 1] in ZERO_WIDTH_JOINERS:
+                # The letter after a virama is subjoined to this cluster
+                i += 1
+            elif _extends_cluster(text[i]):
+                i += 1
+            else:
+                break
+    boundaries.append(n)
+    return boundaries
+
+
+def grapheme_clusters(text: str) -> List[str]:
+    boundaries = cluster_boundaries(text)
+    return [text[a:b] for a, b in zip(boundaries, boundaries[1:])]
+
+
+def truncate_text(text: str, max_chars: int, ellipsis: str = ELLIPSIS) -> str:
+    """Shorten text to at most max_chars (ellipsis included), cutting at a
+    sentence end if one is close enough, else at a word or cluster boundary"""
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return text
+
+    limit = max(0, max_chars - len(ellipsis))
+    boundaries = [b for b in cluster_boundaries(text) if b <= limit]
+    cut = boundaries[-1] if boundaries else 0
+
+    # Last sentence end that fits
+    for b in reversed(boundaries):
+        if b < MIN_SENTENCE_FRACTION * limit:
+            break
+        if b > 0 and text[b - 1] in SENTENCE_ENDS:
+            return text[:b].rstrip()
+
+    # Otherwise the last word break
+    for b in reversed(boundaries):
+        if b < MIN_SENTENCE_FRACTION * limit:
+            break
+        if b < len(text) and text[b].isspace():
+            cut = b
+            break
+    return text[:cut].rstrip() + ellipsis
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Handwritten Letter Recognizer
+Renders reference templates of the 35 letters, extracts HOG and zoning
+features with batched NumPy and classifies photographed letters by their
+nearest template
+
+Usage:
+    python handwriting.py --benchmark               # latency over rendered samples
+    python handwriting.py --evaluate labels.csv     # accuracy over labelled photos
+"""
+
+import argparse
+import csv
+import glob
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+
+IMAGE_SIZE = 32
+CELL_SIZE = 8
+ORIENTATION_BINS = 9
+ZONES = 4
+TEMPLATE_CANVAS = 128
+
+# Augmentations applied to every rendered template
+TEMPLATE_ROTATIONS = (-10, 0, 10)
+TEMPLATE_STROKES = (0, 2, 4)
+
+# The vendored font (fonts/, OFL) comes first among the ones shipped with the app
+FONT_CANDIDATES = (
+    "fonts/NotoSansGurmukhi-Regular.ttf",
+    "fonts/NotoSansGurmukhi-Bold.ttf",
+    "fonts/NotoSerifGurmukhi-Regular.otf",
+    "/usr/share/fonts/truetype/noto/NotoSansGurmukhi-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansGurmukhi-Regular.ttf",
+    "/usr/share/fonts/truetype/lohit-punjabi/Lohit-Gurmukhi.ttf",
+    "/Library/Fonts/NotoSansGurmukhi-Regular.ttf",
+    "C:/Windows/Fonts/raavi.ttf",
+)
+
+ImageLike = Union[Image.Image, np.ndarray]
+
+
+def find_gurmukhi_font() -> str:
+    """First available Gurmukhi font (GURMUKHI_FONT_PATH overrides the search)"""
+    candidates = [os.environ.get("GURMUKHI_FONT_PATH", "")] + list(FONT_CANDIDATES)
+    candidates += glob.glob("fonts/*Gurmukhi*.ttf") + glob.glob("fonts/*Gurmukhi*.otf")
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    raise RuntimeError("No Gurmukhi font found; set GURMUKHI_FONT_PATH to a .ttf file")
+
+
+def gurmukhi_font_available() -> bool:
+    """Whether templates can be rendered, so the app only offers checks that can work"""
+    try:
+        find_gurmukhi_font()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _to_gray(image: ImageLike) -> np.ndarray:
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("L"), dtype=np.uint8)
+    array = np.asarray(image)
+    if array.ndim == 3:
+        # RGB(A) -> luma without going through PIL
+        array = array[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return array.astype(np.uint8)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Otsu's threshold computed from the 256-bin histogram"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    mean_bg = np.cumsum(hist * levels)
+    mean_total = mean_bg[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_total * weight_bg - mean_bg * total) ** 2 / (weight_bg * weight_fg)
+    between = np.nan_to_num(between)
+    return int(np.argmax(between))
+
+
+def normalize_glyph(image: ImageLike, size: int = IMAGE_SIZE) -> np.ndarray:
+    """Binarize, crop to the ink and scale into a size x size float array (ink = 1)"""
+    gray = _to_gray(image)
+    ink = gray < otsu_threshold(gray)
+    if ink.mean() > 0.5:
+        # Light ink on a dark background
+        ink = ~ink
+    return normalize_mask(ink, size)
+
+
+def normalize_mask(ink: np.ndarray, size: int = IMAGE_SIZE) -> np.ndarray:
+    """Crop a boolean ink mask to its bounding box and scale it, keeping the aspect ratio"""
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if rows.size == 0:
+        return np.zeros((size, size), dtype=np.float32)
+
+    cropped = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    height, width = cropped.shape
+    side = int(max(height, width) * 1.1) + 2
+    canvas = np.zeros((side, side), dtype=np.uint8)
+    top, left = (side - height) // 2, (side - width) // 2
+    canvas[top:top + height, left:left + width] = cropped * 255
+
+    resized = Image.fromarray(canvas).resize((size, size), Image.BILINEAR)
+    return np.asarray(resized, dtype=np.float32) / 255.0
+
+
+def extract_features(batch: np.ndarray) -> np.ndarray:
+    """HOG + zoning features for an (N, S, S) batch, L2-normalized per row"""
+    batch = np.asarray(batch, dtype=np.float32)
+    n, size, _ = batch.shape
+    cells = size // CELL_SIZE
+
+    gx = np.zeros_like(batch)
+    gy = np.zeros_like(batch)
+    gx[:, :, 1:-1] = batch[:, :, 2:] - batch[:, :, :-2]
+    gy[:, 1:-1, :] = batch[:, 2:, :] - batch[:, :-2, :]
+    magnitude = np.hypot(gx, gy)
+    orientation = np.mod(np.arctan2(gy, gx), np.pi)
+    bins = np.minimum((orientation / np.pi * ORIENTATION_BINS).astype(np.int64), ORIENTATION_BINS - 1)
+
+    # Scatter magnitudes into one-hot orientation planes, then pool per cell
+    planes = np.zeros((n, size, size, ORIENTATION_BINS), dtype=np.float32)
+    np.put_along_axis(planes, bins[..., None], magnitude[..., None], axis=3)
+    hog = planes.reshape(n, cells, CELL_SIZE, cells, CELL_SIZE, ORIENTATION_BINS).sum(axis=(2, 4))
+    hog = hog.reshape(n, cells * cells, ORIENTATION_BINS)
+    hog /= np.linalg.norm(hog, axis=2, keepdims=True) + 1e-6
+    hog = hog.reshape(n, -1)
+
+    zone = size // ZONES
+    zoning = batch.reshape(n, ZONES, zone, ZONES, zone).mean(axis=(2, 4)).reshape(n, -1)
+    zoning /= np.linalg.norm(zoning, axis=1, keepdims=True) + 1e-6
+
+    features = np.concatenate([hog / np.sqrt(cells * cells), zoning], axis=1)
+    features /= np.linalg.norm(features, axis=1, keepdims=True) + 1e-6
+    return features
+
+
+def render_templates(font_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Rendered, augmented glyphs for every letter: (N, S, S) images and letter indices"""
+    font = ImageFont.truetype(font_path, int(TEMPLATE_CANVAS * 0.6))
+    images, labels = [], []
+    for label, letter in enumerate(GURMUKHI_AKHARI):
+        for stroke in TEMPLATE_STROKES:
+            base = Image.new("L", (TEMPLATE_CANVAS, TEMPLATE_CANVAS), 255)
+            draw = ImageDraw.Draw(base)
+            draw.text((TEMPLATE_CANVAS // 2, TEMPLATE_CANVAS // 2), letter, font=font, fill=0,
+                      anchor="mm", stroke_width=stroke, stroke_fill=0)
+            for angle in TEMPLATE_ROTATIONS:
+                rotated = base.rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+                images.append(normalize_glyph(rotated))
+                labels.append(label)
+    return np.stack(images), np.array(labels, dtype=np.int64)
+
+
+class HandwritingRecognizer:
+    def __init__(self, font_path: Optional[str] = None):
+        self.letters = list(GURMUKHI_AKHARI)
+        self.font_path = font_path or find_gurmukhi_font()
+        images, labels = render_templates(self.font_path)
+
+        # Keep templates grouped by letter so per-letter maxima can use reduceat
+        order = np.argsort(labels, kind="stable")
+        self.template_features = extract_features(images[order])
+        self.template_labels = labels[order]
+        self._group_starts = np.flatnonzero(np.r_[True, np.diff(self.template_labels) != 0])
+
+    def letter_scores(self, features: np.ndarray) -> np.ndarray:
+        """(N, 35) best cosine similarity to each letter's templates"""
+        similarity = features @ self.template_features.T
+        return np.maximum.reduceat(similarity, self._group_starts, axis=1)
+
+    def classify_batch(self, glyphs: np.ndarray) -> List[Tuple[str, float]]:
+        """Classify already-normalized (N, S, S) glyphs"""
+        if len(glyphs) == 0:
+            return []
+        scores = self.letter_scores(extract_features(glyphs))
+        best = np.argmax(scores, axis=1)
+        # Confidence: margin between the best and second-best letter
+        top_two = np.sort(scores, axis=1)[:, -2:]
+        margin = np.clip((top_two[:, 1] - top_two[:, 0]) * 5.0, 0.0, 1.0)
+        return [(self.letters[i], float(c)) for i, c in zip(best, margin)]
+
+    def classify(self, images: Sequence[ImageLike]) -> List[Tuple[str, float]]:
+        """Classify photos or crops of single letters"""
+        if not images:
+            return []
+        return self.classify_batch(np.stack([normalize_glyph(image) for image in images]))
+
+    def classify_one(self, image: ImageLike) -> Tuple[str, float]:
+        return self.classify([image])[0]
+
+
+_recognizer: Optional[HandwritingRecognizer] = None
+_recognizer_lock = threading.Lock()
+
+
+def get_recognizer() -> HandwritingRecognizer:
+    """Process-wide recognizer; templates are rendered on first use"""
+    global _recognizer
+    with _recognizer_lock:
+        if _recognizer is None:
+            _recognizer = HandwritingRecognizer()
+        return _recognizer
+
+
+def load_labelled_images(labels_path: str) -> List[Tuple[str, str]]:
+    """(image path, letter) pairs from a CSV with 'path' and 'letter' columns"""
+    base_dir = os.path.dirname(labels_path)
+    romans = {info["roman"].lower(): letter for letter, info in GURMUKHI_AKHARI.items()}
+    samples = []
+    with open(labels_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            letter = row["letter"].strip()
+            # Romans are ambiguous for a few letters, so the glyph itself is preferred
+            letter = letter if letter in GURMUKHI_AKHARI else romans.get(letter.lower(), letter)
+            samples.append((os.path.join(base_dir, row["path"].strip()), letter))
+    return samples
+
+
+def evaluate(recognizer: HandwritingRecognizer, labels_path: str):
+    """Accuracy and per-letter latency over labelled photos"""
+    samples = [(p, l) for p, l in load_labelled_images(labels_path) if os.path.exists(p)]
+    if not samples:
+        print(f"No labelled images found via {labels_path}")
+        return
+
+    images = [Image.open(path) for path, _ in samples]
+    start = time.perf_counter()
+    predictions = recognizer.classify(images)
+    elapsed = time.perf_counter() - start
+
+    correct = sum(1 for (_, letter), (predicted, _) in zip(samples, predictions) if predicted == letter)
+    print(f"Accuracy: {correct}/{len(samples)} ({correct / len(samples):.1%})")
+    print(f"Latency: {elapsed / len(samples) * 1000:.2f} ms per letter (batch of {len(samples)})")
+    for (path, letter), (predicted, confidence) in zip(samples, predictions):
+        if predicted != letter:
+            print(f"  {path}: expected {letter}, got {predicted} ({confidence:.2f})")
+
+
+def benchmark(recognizer: HandwritingRecognizer, batch_size: int = 256, rounds: int = 5):
+    """Throughput over noisy copies of the rendered templates"""
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(recognizer.template_labels), batch_size)
+    images, labels = render_templates(recognizer.font_path)
+    batch = np.clip(images[picks] + rng.normal(0, 0.15, images[picks].shape), 0, 1).astype(np.float32)
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        predictions = recognizer.classify_batch(batch)
+        timings.append(time.perf_counter() - start)
+
+    letters = [recognizer.letters[i] for i in labels[picks]]
+    accuracy = np.mean([p == l for (p, _), l in zip(predictions, letters)])
+    best = min(timings)
+    print(f"Batch of {batch_size}: {best * 1000:.1f} ms ({best / batch_size * 1000:.3f} ms per letter)")
+    print(f"Accuracy on noisy rendered letters: {accuracy:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Handwritten Gurmukhi letter recognizer")
+    parser.add_argument("--benchmark", action="store_true", help="measure classification latency")
+    parser.add_argument("--evaluate", metavar="LABELS_CSV", help="labelled photos, e.g. captured_images/labels.csv")
+    parser.add_argument("--font", help="path to a Gurmukhi .ttf font")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    recognizer = HandwritingRecognizer(args.font)
+    print(f"Built {len(recognizer.template_labels)} templates in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.evaluate:
+        evaluate(recognizer, args.evaluate)
+    if args.benchmark or not args.evaluate:
+        benchmark(recognizer)
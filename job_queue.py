@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Background Job Queue for the Homework Helper
+Runs OCR in a process pool and AI calls in a thread pool so the Streamlit
+script thread never blocks, with a global concurrency limit and round-robin
+fairness between users
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Job kinds and the pool each one runs on
+OCR = "ocr"
+AI = "ai"
+
+
+class Job:
+    """A single unit of background work owned by one user"""
+
+    def __init__(self, user_id: str, kind: str, fn: Callable, args: tuple):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.status = PENDING
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class JobQueue:
+    def __init__(self, ocr_workers=2, ai_workers=4, max_in_flight=6,
+                 per_user_limit=2, max_finished=500):
+        self.max_in_flight = max_in_flight
+        self.per_user_limit = per_user_limit
+        self.max_finished = max_finished
+
+        self._pools = {
+            OCR: ProcessPoolExecutor(max_workers=ocr_workers),
+            AI: ThreadPoolExecutor(max_workers=ai_workers, thread_name_prefix="ai-job"),
+        }
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._finished_order = deque()
+        # user_id -> deque of waiting jobs; order of keys is the round-robin order
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._running_per_user: Dict[str, int] = {}
+        self._in_flight = 0
+
+    def submit(self, user_id: str, kind: str, fn: Callable, *args) -> str:
+        """Queue a job and return its ID; fn must be picklable for OCR jobs"""
+        if kind not in self._pools:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job = Job(user_id, kind, fn, args)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._waiting.setdefault(user_id, deque()).append(job)
+        self._dispatch()
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID (None once it has been pruned)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != PENDING:
+                return False
+            waiting = self._waiting.get(job.user_id)
+            if waiting is not None:
+                waiting.remove(job)
+                if not waiting:
+                    del self._waiting[job.user_id]
+            del self._jobs[job_id]
+            return True
+
+    def stats(self) -> Dict:
+        """Queue depth and in-flight counts for monitoring"""
+        with self._lock:
+            queued = sum(len(q) for q in self._waiting.values())
+            return {
+                "queued": queued,
+                "running": self._in_flight,
+                "users_waiting": len(self._waiting),
+                "tracked_jobs": len(self._jobs),
+            }
+
+    def _next_job(self) -> Optional[Job]:
+        """Pick the next job round-robin across users under their limit (lock held)"""
+        for user_id in list(self._waiting.keys()):
+            if self._running_per_user.get(user_id, 0) >= self.per_user_limit:
+                continue
+            waiting = self._waiting[user_id]
+            job = waiting.popleft()
+            if waiting:
+                # Move this user to the back so others get the next slot
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            return job
+        return None
+
+    def _dispatch(self):
+        """Start as many waiting jobs as the global limit allows"""
+        to_start = []
+        with self._lock:
+            while self._in_flight < self.max_in_flight:
+                job = self._next_job()
+                if job is None:
+                    break
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._in_flight += 1
+                self._running_per_user[job.user_id] = self._running_per_user.get(job.user_id, 0) + 1
+                to_start.append(job)
+
+        for job in to_start:
+            try:
+                future = self._pools[job.kind].submit(job.fn, *job.args)
+            except Exception as e:
+                self._finish(job, None, str(e))
+                continue
+            future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    def _on_done(self, job: Job, future):
+        try:
+            self._finish(job, future.result(), None)
+        except Exception as e:
+            self._finish(job, None, str(e))
+
+    def _finish(self, job: Job, result: Any, error: Optional[str]):
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = FAILED if error is not None else DONE
+            job.finished_at = time.time()
+            # Drop the callable and arguments (e.g. image bytes) once the job is done
+            job.fn = None
+            job.args = ()
+
+            self._in_flight -= 1
+            remaining = self._running_per_user.get(job.user_id, 1) - 1
+            if remaining > 0:
+                self._running_per_user[job.user_id] = remaining
+            else:
+                self._running_per_user.pop(job.user_id, None)
+
+            self._finished_order.append(job.job_id)
+            while len(self._finished_order) > self.max_finished:
+                self._jobs.pop(self._finished_order.popleft(), None)
+
+        self._dispatch()
+
+    def shutdown(self, wait: bool = False):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue shared by every Streamlit session"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
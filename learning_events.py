@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Learning Events and Rollups
+Appends every letter view, answer, quiz completion and upload to an event
+log in batches, and folds new events into per-user daily and per-letter
+rollups past a watermark, so the parent dashboard reads only the small
+rollup tables however long the log grows.
+
+Usage:
+    python learning_events.py --user NAME      # dashboard numbers for a learner
+    python learning_events.py --simulate 1000000 --user NAME
+"""
+
+import argparse
+import atexit
+import datetime
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+DB_PATH = "gurmukhi_progress.db"
+
+# Event kinds
+LETTER_VIEW = "letter_view"
+ANSWER = "answer"
+QUIZ_COMPLETE = "quiz_complete"
+UPLOAD = "upload"
+
+# Buffered events are written once this many pile up or this much time passes
+FLUSH_BATCH = 50
+FLUSH_INTERVAL_SECONDS = 10
+# Events folded into the rollups per transaction
+ROLLUP_BATCH = 5000
+# A longer pause between two events ends a sitting; it does not count as time spent
+IDLE_GAP_SECONDS = 5 * 60
+
+WATERMARK = "learning_rollups"
+
+
+def init_database(db_path: str = DB_PATH):
+    """Create the event log, the rollup tables and the rollup watermark"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learning_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            letter TEXT,
+            correct INTEGER,
+            mode TEXT,
+            occurred_at REAL NOT NULL,
+            day TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_daily_rollup (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            events INTEGER NOT NULL DEFAULT 0,
+            letter_views INTEGER NOT NULL DEFAULT 0,
+            answers INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            quizzes INTEGER NOT NULL DEFAULT 0,
+            uploads INTEGER NOT NULL DEFAULT 0,
+            active_seconds REAL NOT NULL DEFAULT 0,
+            last_at REAL,
+            PRIMARY KEY (user_id, day)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_letter_rollup (
+            user_id TEXT NOT NULL,
+            letter TEXT NOT NULL,
+            views INTEGER NOT NULL DEFAULT 0,
+            answers INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            last_at REAL,
+            PRIMARY KEY (user_id, letter)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_watermarks (
+            name TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO rollup_watermarks (name, last_event_id) VALUES (?, 0)', (WATERMARK,))
+
+    conn.commit()
+    conn.close()
+
+
+def day_of(timestamp: float) -> str:
+    """Local calendar day, fixed when the event happens"""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def append_events(db_path: str, rows: Sequence[tuple]):
+    """Write (user_id, kind, letter, correct, mode, occurred_at, day) rows in one transaction"""
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO learning_events (user_id, kind, letter, correct, mode, occurred_at, day)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def update_rollups(db_path: str = DB_PATH, batch: int = ROLLUP_BATCH) -> int:
+    """Fold events past the watermark into the rollups; returns how many were folded
+
+    Each batch is aggregated in memory and applied with the watermark in one
+    IMMEDIATE transaction, so concurrent callers never fold an event twice.
+    """
+    folded = 0
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            (watermark,) = conn.execute(
+                'SELECT last_event_id FROM rollup_watermarks WHERE name = ?', (WATERMARK,)
+            ).fetchone()
+            events = conn.execute('''
+                SELECT id, user_id, kind, letter, correct, occurred_at, day FROM learning_events
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (watermark, batch)).fetchall()
+            if not events:
+                conn.rollback()
+                break
+
+            days: Dict[tuple, Dict] = {}
+            letters: Dict[tuple, List] = {}
+            for _, user_id, kind, letter, correct, occurred_at, day in events:
+                key = (user_id, day)
+                totals = days.get(key)
+                if totals is None:
+                    row = conn.execute(
+                        'SELECT last_at FROM user_daily_rollup WHERE user_id = ? AND day = ?', key
+                    ).fetchone()
+                    totals = days[key] = {"events": 0, "letter_views": 0, "answers": 0, "correct": 0,
+                                          "quizzes": 0, "uploads": 0, "active_seconds": 0.0,
+                                          "last_at": row[0] if row else None}
+                totals["events"] += 1
+                if totals["last_at"] is not None:
+                    gap = occurred_at - totals["last_at"]
+                    if 0 < gap <= IDLE_GAP_SECONDS:
+                        totals["active_seconds"] += gap
+                totals["last_at"] = occurred_at if totals["last_at"] is None else max(totals["last_at"], occurred_at)
+
+                if kind == LETTER_VIEW:
+                    totals["letter_views"] += 1
+                elif kind == ANSWER:
+                    totals["answers"] += 1
+                    totals["correct"] += int(bool(correct))
+                elif kind == QUIZ_COMPLETE:
+                    totals["quizzes"] += 1
+                elif kind == UPLOAD:
+                    totals["uploads"] += 1
+
+                if letter and kind in (LETTER_VIEW, ANSWER):
+                    counts = letters.setdefault((user_id, letter), [0, 0, 0, occurred_at])
+                    if kind == LETTER_VIEW:
+                        counts[0] += 1
+                    else:
+                        counts[1] += 1
+                        counts[2] += int(bool(correct))
+                    counts[3] = max(counts[3], occurred_at)
+
+            conn.executemany('''
+                INSERT INTO user_daily_rollup (user_id, day, events, letter_views, answers, correct,
+                                               quizzes, uploads, active_seconds, last_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, day) DO UPDATE SET
+                    events = events + excluded.events,
+                    letter_views = letter_views + excluded.letter_views,
+                    answers = answers + excluded.answers,
+                    correct = correct + excluded.correct,
+                    quizzes = quizzes + excluded.quizzes,
+                    uploads = uploads + excluded.uploads,
+                    active_seconds = active_seconds + excluded.active_seconds,
+                    last_at = excluded.last_at
+            ''', [(user_id, day, t["events"], t["letter_views"], t["answers"], t["correct"],
+                   t["quizzes"], t["uploads"], t["active_seconds"], t["last_at"])
+                  for (user_id, day), t in days.items()])
+            conn.executemany('''
+                INSERT INTO user_letter_rollup (user_id, letter, views, answers, correct, last_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, letter) DO UPDATE SET
+                    views = views + excluded.views,
+                    answers = answers + excluded.answers,
+                    correct = correct + excluded.correct,
+                    last_at = MAX(COALESCE(last_at, 0), excluded.last_at)
+            ''', [(user_id, letter, *counts) for (user_id, letter), counts in letters.items()])
+            conn.execute('UPDATE rollup_watermarks SET last_event_id = ? WHERE name = ?',
+                         (events[-1][0], WATERMARK))
+            conn.commit()
+            folded += len(events)
+            if len(events) < batch:
+                break
+    finally:
+        conn.close()
+    return folded
+
+
+class EventRecorder:
+    """Process-wide event buffer shared by every session"""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        init_database(db_path)
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._last_flush = time.time()
+
+    def record(self, user_id: str, kind: str, letter: Optional[str] = None,
+               correct: Optional[bool] = None, mode: Optional[str] = None, now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._pending.append((user_id, kind, letter, None if correct is None else int(correct),
+                                  mode, now, day_of(now)))
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """Write buffered events once enough pile up or enough time passes"""
+        with self._lock:
+            if not self._pending:
+                return
+            if len(self._pending) < FLUSH_BATCH and time.time() - self._last_flush < FLUSH_INTERVAL_SECONDS:
+                return
+        self.flush()
+
+    def flush(self):
+        """Append buffered events and bring the rollups up to date"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.time()
+        if rows:
+            append_events(self.db_path, rows)
+            update_rollups(self.db_path)
+
+
+class LearningDashboard:
+    """Parent dashboard queries; they read the rollup tables only"""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        init_database(db_path)
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def streaks(self, user_id: str, today: Optional[str] = None) -> Dict[str, int]:
+        """Current and longest runs of consecutive active days
+
+        The current streak still counts if the learner was active yesterday
+        but has not practiced yet today.
+        """
+        days = [datetime.date.fromisoformat(day) for (day,) in self._query(
+            'SELECT day FROM user_daily_rollup WHERE user_id = ? ORDER BY day', (user_id,)
+        )]
+        longest = run = 0
+        previous = None
+        for day in days:
+            run = run + 1 if previous is not None and (day - previous).days == 1 else 1
+            longest = max(longest, run)
+            previous = day
+
+        today_date = datetime.date.fromisoformat(today or day_of(time.time()))
+        current = run if previous is not None and (today_date - previous).days <= 1 else 0
+        return {"current": current, "longest": longest, "active_days": len(days)}
+
+    def letter_accuracy(self, user_id: str) -> List[Dict]:
+        """Views, answers and accuracy per letter, weakest answered letters first"""
+        rows = self._query('''
+            SELECT letter, views, answers, correct FROM user_letter_rollup
+            WHERE user_id = ?
+            ORDER BY answers = 0, CAST(correct AS REAL) / MAX(answers, 1), letter
+        ''', (user_id,))
+        return [{"letter": letter, "views": views, "answers": answers, "correct": correct,
+                 "accuracy": correct / answers if answers else None}
+                for letter, views, answers, correct in rows]
+
+    def daily_activity(self, user_id: str, days: int = 14, today: Optional[str] = None) -> List[Dict]:
+        """Per-day totals for the last `days` days, oldest first (inactive days are omitted)"""
+        today_date = datetime.date.fromisoformat(today or day_of(time.time()))
+        since = (today_date - datetime.timedelta(days=days - 1)).isoformat()
+        rows = self._query('''
+            SELECT day, events, letter_views, answers, correct, quizzes, uploads, active_seconds
+            FROM user_daily_rollup WHERE user_id = ? AND day >= ? ORDER BY day
+        ''', (user_id, since))
+        return [{"day": day, "events": events, "letter_views": views, "answers": answers,
+                 "correct": correct, "quizzes": quizzes, "uploads": uploads,
+                 "minutes": active_seconds / 60}
+                for day, events, views, answers, correct, quizzes, uploads, active_seconds in rows]
+
+    def time_spent(self, user_id: str, days: int = 7, today: Optional[str] = None) -> float:
+        """Minutes of practice over the last `days` days"""
+        return sum(row["minutes"] for row in self.daily_activity(user_id, days, today))
+
+    def summary(self, user_id: str) -> Dict:
+        (totals,) = self._query('''
+            SELECT COALESCE(SUM(answers), 0), COALESCE(SUM(correct), 0), COALESCE(SUM(quizzes), 0),
+                   COALESCE(SUM(uploads), 0), COALESCE(SUM(active_seconds), 0)
+            FROM user_daily_rollup WHERE user_id = ?
+        ''', (user_id,))
+        answers, correct, quizzes, uploads, active_seconds = totals
+        return {
+            "answers": answers,
+            "accuracy": correct / answers if answers else None,
+            "quizzes": quizzes,
+            "uploads": uploads,
+            "total_minutes": active_seconds / 60,
+            "week_minutes": self.time_spent(user_id, 7),
+            **self.streaks(user_id),
+        }
+
+
+_recorder: Optional[EventRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_event_recorder() -> EventRecorder:
+    """Process-wide recorder; buffered events are written at exit"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = EventRecorder()
+            atexit.register(_recorder.flush)
+        return _recorder
+
+
+_dashboard: Optional[LearningDashboard] = None
+_dashboard_lock = threading.Lock()
+
+
+def get_learning_dashboard() -> LearningDashboard:
+    """Process-wide dashboard, so the schema is set up once rather than on every rerun"""
+    global _dashboard
+    with _dashboard_lock:
+        if _dashboard is None:
+            _dashboard = LearningDashboard()
+        return _dashboard
+
+
+def simulate(db_path: str, n: int, user_id: str, seed: int = 7):
+    """Append n synthetic events over the last year and time the rollup and dashboard queries"""
+    from gurmukhi_letters import GURMUKHI_AKHARI
+
+    rng = random.Random(seed)
+    letters = list(GURMUKHI_AKHARI)
+    users = [user_id] + [f"learner-{i}" for i in range(49)]
+    init_database(db_path)
+    start = time.time() - 365 * 24 * 60 * 60
+    step = 365 * 24 * 60 * 60 / n
+    rows = []
+    for i in range(n):
+        at = start + i * step
+        kind = rng.choices((LETTER_VIEW, ANSWER, QUIZ_COMPLETE, UPLOAD), (30, 60, 5, 5))[0]
+        letter = rng.choice(letters) if kind in (LETTER_VIEW, ANSWER) else None
+        correct = rng.random() < 0.7 if kind == ANSWER else None
+        rows.append((rng.choice(users), kind, letter, None if correct is None else int(correct),
+                     "simulated", at, day_of(at)))
+        if len(rows) >= 50000:
+            append_events(db_path, rows)
+            rows = []
+    if rows:
+        append_events(db_path, rows)
+
+    t = time.perf_counter()
+    folded = update_rollups(db_path)
+    print(f"Folded {folded} events in {time.perf_counter() - t:.1f} s")
+    t = time.perf_counter()
+    update_rollups(db_path)
+    print(f"Caught-up rollup pass: {(time.perf_counter() - t) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learning event rollups and dashboard numbers")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--user", required=True, help="learner name")
+    parser.add_argument("--simulate", type=int, metavar="N", help="append N synthetic events first")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(args.db, args.simulate, args.user)
+    else:
+        init_database(args.db)
+        print(f"Folded {update_rollups(args.db)} new events")
+
+    dashboard = LearningDashboard(args.db)
+    t = time.perf_counter()
+    summary = dashboard.summary(args.user)
+    accuracy = dashboard.letter_accuracy(args.user)
+    elapsed_ms = (time.perf_counter() - t) * 1000
+    print(f"Dashboard queries: {elapsed_ms:.2f} ms")
+    print(f"Streak {summary['current']} days (longest {summary['longest']}), "
+          f"{summary['week_minutes']:.0f} min this week, {summary['quizzes']} quizzes")
+    if summary["accuracy"] is not None:
+        print(f"Accuracy {summary['accuracy']:.0%} over {summary['answers']} answers")
+    for row in accuracy[:5]:
+        if row["accuracy"] is not None:
+            print(f"  {row['letter']}: {row['accuracy']:.0%} of {row['answers']}")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Materialized Learning Stories
+Keeps the learning_stories table in step with punjabi_articles. Triggers queue
+every inserted or edited article; a refresh rebuilds stories for queued
+articles only, so ingestion cost is proportional to what changed.
+
+Usage:
+    python learning_stories.py           # process the refresh queue
+    python learning_stories.py --full    # rebuild every story
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from content_codec import get_codec, letters_to_mask
+from content_db import CONTENT_DB_PATH, bump_generation, init_content_database
+from gurmukhi_text import truncate_text
+from transliteration import transliterate
+
+STORY_CHARS = 200
+TITLE_CHARS = 80
+REFRESH_BATCH = 200
+
+
+def article_hash(article: Dict) -> str:
+    """Fingerprint of the article fields a story is built from"""
+    fields = [article.get(k) or "" for k in (
+        'title_punjabi', 'title_english', 'content_punjabi', 'content_english', 'difficulty_level',
+        'source', 'url',
+    )]
+    return hashlib.sha1("\x1f".join(str(f) for f in fields).encode("utf-8")).hexdigest()
+
+
+def simplify_article(article: Dict) -> Dict:
+    """Kid-sized story from an article, cut at sentence or grapheme-cluster boundaries"""
+    content_punjabi = truncate_text(article.get('content_punjabi') or "", STORY_CHARS)
+    letters = sorted({c for c in content_punjabi if '\u0A01' <= c <= '\u0A75'})
+    title_punjabi = truncate_text(article.get('title_punjabi') or "", TITLE_CHARS)
+    title_english = article.get('title_english') or ""
+    return {
+        'title_punjabi': title_punjabi,
+        'title_english': truncate_text(f"Story: {title_english}" if title_english else "", TITLE_CHARS),
+        'content_punjabi': content_punjabi,
+        'content_english': truncate_text(article.get('content_english') or "", STORY_CHARS),
+        # Romanized reading aid
+        'title_roman': transliterate(title_punjabi),
+        'content_roman': transliterate(content_punjabi),
+        'difficulty_level': article.get('difficulty_level'),
+        'gurmukhi_letters': json.dumps(letters, ensure_ascii=False),
+        'letter_mask': letters_to_mask(letters),
+    }
+
+
+def refresh_learning_stories(db_path: str = CONTENT_DB_PATH, batch_size: int = REFRESH_BATCH) -> int:
+    """Rebuild stories for queued articles; returns how many stories changed"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    changed = 0
+    try:
+        codec = get_codec(conn, db_path)
+        while True:
+            rows = conn.execute('''
+                SELECT q.article_id, a.id, a.title_punjabi, a.title_english, a.content_punjabi,
+                       a.content_english, a.difficulty_level, a.source, a.url, a.created_date
+                FROM learning_story_queue q
+                LEFT JOIN punjabi_articles a ON a.id = q.article_id
+                ORDER BY q.article_id
+                LIMIT ?
+            ''', (batch_size,)).fetchall()
+            if not rows:
+                break
+
+            now = str(datetime.now())
+            batch_changed = 0
+            for row in rows:
+                if row['id'] is None:
+                    # Article is gone; its story goes with it
+                    batch_changed += conn.execute(
+                        "DELETE FROM learning_stories WHERE article_id = ?", (row['article_id'],)
+                    ).rowcount
+                    continue
+
+                article = dict(row)
+                # Hash and simplify the text, not its compressed form
+                article['content_punjabi'] = codec.decompress(article['content_punjabi'])
+                article['content_english'] = codec.decompress(article['content_english'])
+                source_hash = article_hash(article)
+                story = simplify_article(article)
+                # Unchanged articles (same hash) leave their story untouched
+                batch_changed += conn.execute('''
+                    INSERT INTO learning_stories
+                    (article_id, title_punjabi, title_english, content_punjabi, content_english,
+                     title_roman, content_roman, difficulty_level, gurmukhi_letters, letter_mask,
+                     source, source_url, source_created_date, source_hash, refreshed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(article_id) DO UPDATE SET
+                        title_punjabi = excluded.title_punjabi,
+                        title_english = excluded.title_english,
+                        content_punjabi = excluded.content_punjabi,
+                        content_english = excluded.content_english,
+                        title_roman = excluded.title_roman,
+                        content_roman = excluded.content_roman,
+                        difficulty_level = excluded.difficulty_level,
+                        gurmukhi_letters = excluded.gurmukhi_letters,
+                        letter_mask = excluded.letter_mask,
+                        source = excluded.source,
+                        source_url = excluded.source_url,
+                        source_created_date = excluded.source_created_date,
+                        source_hash = excluded.source_hash,
+                        refreshed_at = excluded.refreshed_at
+                    WHERE learning_stories.source_hash IS NOT excluded.source_hash
+                ''', (
+                    row['id'], story['title_punjabi'], story['title_english'], story['content_punjabi'],
+                    story['content_english'], story['title_roman'], story['content_roman'],
+                    story['difficulty_level'], story['gurmukhi_letters'], story['letter_mask'],
+                    row['source'], row['url'], row['created_date'], source_hash, now
+                )).rowcount
+
+            conn.executemany(
+                "DELETE FROM learning_story_queue WHERE article_id = ?",
+                [(row['article_id'],) for row in rows]
+            )
+            if batch_changed:
+                bump_generation(conn)
+            conn.commit()
+            changed += batch_changed
+    finally:
+        conn.close()
+    return changed
+
+
+def queue_all_articles(db_path: str = CONTENT_DB_PATH):
+    """Queue every article, e.g. after changing how stories are simplified"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("UPDATE learning_stories SET source_hash = NULL")
+        conn.execute("INSERT OR IGNORE INTO learning_story_queue (article_id) SELECT id FROM punjabi_articles")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_learning_stories(db_path: str = CONTENT_DB_PATH, difficulty: Optional[int] = None,
+                         limit: int = 10) -> List[Dict]:
+    """Newest ready-made stories, optionally at one difficulty (single indexed query)"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if difficulty is None:
+            rows = conn.execute('''
+                SELECT * FROM learning_stories
+                ORDER BY source_created_date DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        else:
+            rows = conn.execute('''
+                SELECT * FROM learning_stories
+                WHERE difficulty_level = ?
+                ORDER BY source_created_date DESC LIMIT ?
+            ''', (difficulty, limit)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh materialized learning stories")
+    parser.add_argument("--db", default=CONTENT_DB_PATH)
+    parser.add_argument("--full", action="store_true", help="rebuild every story")
+    args = parser.parse_args()
+
+    init_content_database(args.db)
+    if args.full:
+        queue_all_articles(args.db)
+    print(f"{refresh_learning_stories(args.db)} stories updated")
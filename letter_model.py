@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Compiled Letter Model
+Precomputes letter indices, unique answer keys, a visual/phonetic
+confusability matrix and per-letter distractor samplers once at import, so
+games can draw multiple-choice options in constant time
+"""
+
+import random
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+
+# Rows of the traditional Painti Akhari chart; letters in a row share a place of articulation
+AKHARI_ROWS = (
+    ("ੳ", "ਅ", "ੲ", "ਸ", "ਹ"),
+    ("ਕ", "ਖ", "ਗ", "ਘ", "ਙ"),
+    ("ਚ", "ਛ", "ਜ", "ਝ", "ਞ"),
+    ("ਟ", "ਠ", "ਡ", "ਢ", "ਣ"),
+    ("ਤ", "ਥ", "ਦ", "ਧ", "ਨ"),
+    ("ਪ", "ਫ", "ਬ", "ਭ", "ਮ"),
+    ("ਯ", "ਰ", "ਲ", "ਵ", "ੜ"),
+)
+
+# Pairs of glyphs that beginners commonly mix up because of their shape
+VISUALLY_SIMILAR = (
+    ("ਸ", "ਮ"), ("ਪ", "ਘ"), ("ਪ", "ਧ"), ("ਘ", "ਧ"), ("ਖ", "ਥ"), ("ਬ", "ਥ"),
+    ("ਭ", "ਤ"), ("ਡ", "ਙ"), ("ਠ", "ਨ"), ("ਜ", "ਝ"), ("ਝ", "ਞ"), ("ਚ", "ਰ"),
+    ("ਟ", "ੲ"), ("ਣ", "ੜ"), ("ਗ", "ਤ"), ("ਦ", "ਫ"), ("ਯ", "ਘ"), ("ੳ", "ਙ"),
+)
+
+BASE_WEIGHT = 1.0
+SAME_ROW_WEIGHT = 2.0      # same place of articulation
+SAME_COLUMN_WEIGHT = 1.5   # same voicing/aspiration pattern
+VISUAL_WEIGHT = 4.0
+
+# Fraction of draws taken from the learner's own past mistakes
+LEARNER_MIX = 0.5
+
+
+class AliasSampler:
+    """Walker's alias method: O(1) weighted draws after O(n) setup"""
+
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        n = len(items)
+        self.items = tuple(items)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def draw(self, rng=random):
+        i = int(rng.random() * len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class LetterModel:
+    def __init__(self, akhari: Dict = GURMUKHI_AKHARI):
+        self.letters: Tuple[str, ...] = tuple(akhari)
+        self.index: Dict[str, int] = {letter: i for i, letter in enumerate(self.letters)}
+        self.info = akhari
+
+        # Romans and sounds repeat (e.g. ਠ/ਥ are both "Thatha"), so answers are keyed by value;
+        # the "letter" attribute asks for the glyph itself
+        self.answer_keys: Dict[str, Tuple[str, ...]] = {}
+        self.letters_by_key: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        for attr in ("roman", "sound", "letter"):
+            keys = tuple(dict.fromkeys(self._key(letter, attr) for letter in self.letters))
+            self.answer_keys[attr] = keys
+            self.letters_by_key[attr] = {
+                key: tuple(l for l in self.letters if self._key(l, attr) == key) for key in keys
+            }
+
+        self.confusability = self._build_confusability()
+        self._samplers = {
+            attr: {letter: self._build_sampler(letter, attr) for letter in self.letters}
+            for attr in self.answer_keys
+        }
+
+    def _key(self, letter: str, attr: str) -> str:
+        return letter if attr == "letter" else self.info[letter][attr]
+
+    def _build_confusability(self) -> List[List[float]]:
+        n = len(self.letters)
+        position = {}
+        for row_i, row in enumerate(AKHARI_ROWS):
+            for col_i, letter in enumerate(row):
+                position[letter] = (row_i, col_i)
+
+        matrix = [[0.0] * n for _ in range(n)]
+        for a in self.letters:
+            for b in self.letters:
+                if a == b:
+                    continue
+                weight = BASE_WEIGHT
+                if a in position and b in position:
+                    if position[a][0] == position[b][0]:
+                        weight += SAME_ROW_WEIGHT
+                    elif position[a][1] == position[b][1] and position[a][0] > 0 and position[b][0] > 0:
+                        weight += SAME_COLUMN_WEIGHT
+                matrix[self.index[a]][self.index[b]] = weight
+
+        for a, b in VISUALLY_SIMILAR:
+            if a in self.index and b in self.index:
+                matrix[self.index[a]][self.index[b]] += VISUAL_WEIGHT
+                matrix[self.index[b]][self.index[a]] += VISUAL_WEIGHT
+        return matrix
+
+    def _build_sampler(self, letter: str, attr: str) -> AliasSampler:
+        """Weighted sampler over every answer key except the letter's own"""
+        own_key = self._key(letter, attr)
+        row = self.confusability[self.index[letter]]
+        keys, weights = [], []
+        for key in self.answer_keys[attr]:
+            if key == own_key:
+                continue
+            keys.append(key)
+            weights.append(max(row[self.index[l]] for l in self.letters_by_key[attr][key]))
+        return AliasSampler(keys, weights)
+
+    def answer(self, letter: str, attr: str = "roman") -> str:
+        return self._key(letter, attr)
+
+    def distractors(self, letter: str, k: int = 3, attr: str = "roman", rng=random,
+                    learner_confusions: Optional[Dict[str, int]] = None,
+                    exclude: Collection[str] = ()) -> List[str]:
+        """k distinct wrong answers, weighted toward confusable letters and past mistakes"""
+        own_key = self._key(letter, attr)
+        sampler = self._samplers[attr][letter]
+        excluded = sum(1 for key in set(exclude) if key != own_key and key in self.letters_by_key[attr])
+        available = len(sampler.items) - excluded
+        k = min(k, available)
+
+        mistakes = None
+        if learner_confusions:
+            mistakes = [
+                key for key in learner_confusions
+                if key != own_key and key in self.letters_by_key[attr] and key not in exclude
+            ]
+
+        chosen: List[str] = []
+        draws = 0
+        while len(chosen) < k:
+            draws += 1
+            if draws > 64 * (k + 1):
+                # Heavily excluded pools: finish with a plain scan
+                chosen.extend(key for key in sampler.items if key not in exclude and key not in chosen)
+                del chosen[k:]
+                break
+            if mistakes and rng.random() < LEARNER_MIX:
+                key = rng.choice(mistakes)
+            else:
+                key = sampler.draw(rng)
+            if key not in chosen and key not in exclude:
+                chosen.append(key)
+        return chosen
+
+    def options(self, letter: str, k: int = 3, attr: str = "roman", rng=random,
+                learner_confusions: Optional[Dict[str, int]] = None,
+                exclude: Collection[str] = ()) -> List[str]:
+        """Shuffled multiple-choice options: the correct answer plus k distractors"""
+        options = self.distractors(letter, k, attr, rng, learner_confusions, exclude)
+        options.append(self._key(letter, attr))
+        rng.shuffle(options)
+        return options
+
+    def random_letter(self, rng=random) -> str:
+        return self.letters[int(rng.random() * len(self.letters))]
+
+
+# Compiled once per process
+LETTER_MODEL = LetterModel()
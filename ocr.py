@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+OCR helpers for homework photos
+Kept free of Streamlit so the functions can run inside worker processes
+"""
+
+import io
+import os
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+
+def extract_text_from_image(image):
+    """Extract text from image using OCR"""
+    try:
+        # Convert PIL image to numpy array for OpenCV
+        img_array = np.array(image)
+
+        # Convert RGB to BGR for OpenCV
+        if len(img_array.shape) == 3:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+
+        # Preprocess image for better OCR
+        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+
+        # Apply threshold to get better text recognition
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        # Use pytesseract to extract text
+        extracted_text = pytesseract.image_to_string(thresh, config='--psm 6')
+
+        return extracted_text.strip()
+    except Exception as e:
+        return f"Error extracting text: {str(e)}"
+
+
+def extract_text_from_bytes(image_bytes: bytes) -> str:
+    """Decode raw image bytes and run OCR (picklable entry point for process pools)
+
+    OCR_STUB_TEXT, when set, is returned instead so benchmarks need no OCR engine.
+    """
+    stub_text = os.environ.get("OCR_STUB_TEXT")
+    if stub_text is not None:
+        return stub_text
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    return extract_text_from_image(image)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Photo Store
+Saves photos under their SHA-256 hash in sharded subdirectories and keeps a
+SQLite index so gallery listing, filtering and deletion never scan the disk
+"""
+
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from thumbnails import create_thumbnail, delete_thumbnails
+
+LEGACY_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoStore:
+    def __init__(self, root_dir="captured_images", db_path="gurmukhi_photos.db"):
+        self.root_dir = root_dir
+        self.db_path = db_path
+        os.makedirs(self.root_dir, exist_ok=True)
+        self.init_database()
+        self.import_legacy_photos()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Initialize the photo metadata index"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS photos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                size_bytes INTEGER,
+                ext TEXT NOT NULL,
+                original_name TEXT,
+                ocr_text TEXT,
+                UNIQUE (owner, content_hash)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_photos_created ON photos (created_at DESC, id DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_photos_owner_created ON photos (owner, created_at DESC, id DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_photos_hash ON photos (content_hash)')
+        # Flat-directory photos already copied into the store
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS legacy_imports (
+                name TEXT PRIMARY KEY,
+                imported_at TEXT NOT NULL
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def blob_path(self, content_hash: str, ext: str = ".jpg") -> str:
+        """Sharded location of a photo: <root>/ab/cd/abcd....jpg"""
+        return os.path.join(self.root_dir, content_hash[:2], content_hash[2:4], content_hash + ext)
+
+    def save_image(self, image: Image.Image, owner: str, original_name: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Encode a PIL image as JPEG and store it; returns (photo, is_new)"""
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=90)
+        return self.save_bytes(buffer.getvalue(), owner, ".jpg", image.size, original_name)
+
+    def save_bytes(self, data: bytes, owner: str, ext: str = ".jpg",
+                   size: Optional[Tuple[int, int]] = None,
+                   original_name: Optional[str] = None,
+                   created_at: Optional[str] = None) -> Tuple[Dict, bool]:
+        """Store encoded image bytes, deduplicating identical content"""
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(content_hash, ext)
+
+        # Unreadable images are rejected before anything is written
+        if size is None:
+            with Image.open(io.BytesIO(data)) as image:
+                size = image.size
+
+        # Identical bytes map to the same file, so only write it once
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            create_thumbnail(path)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO photos
+            (content_hash, owner, created_at, width, height, size_bytes, ext, original_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            content_hash,
+            owner,
+            created_at or datetime.now().isoformat(timespec="microseconds"),
+            size[0],
+            size[1],
+            len(data),
+            ext,
+            original_name
+        ))
+        is_new = cursor.rowcount > 0
+        conn.commit()
+
+        cursor.execute('SELECT * FROM photos WHERE owner = ? AND content_hash = ?', (owner, content_hash))
+        photo = self._row_to_photo(cursor.fetchone())
+        conn.close()
+        return photo, is_new
+
+    def list_photos(self, owner: Optional[str] = None, limit: int = 9, offset: int = 0) -> List[Dict]:
+        """One page of photos, newest first, optionally for a single owner"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        if owner is None:
+            cursor.execute('''
+                SELECT * FROM photos
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ''', (limit, offset))
+        else:
+            cursor.execute('''
+                SELECT * FROM photos
+                WHERE owner = ?
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ''', (owner, limit, offset))
+
+        photos = [self._row_to_photo(row) for row in cursor.fetchall()]
+        conn.close()
+        return photos
+
+    def count_photos(self, owner: Optional[str] = None) -> int:
+        conn = self._connect()
+        cursor = conn.cursor()
+        if owner is None:
+            cursor.execute('SELECT COUNT(*) FROM photos')
+        else:
+            cursor.execute('SELECT COUNT(*) FROM photos WHERE owner = ?', (owner,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def get_photo(self, photo_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM photos WHERE id = ?', (photo_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return self._row_to_photo(row) if row else None
+
+    def set_ocr_text(self, photo_id: int, ocr_text: str):
+        """Attach recognised text to a photo"""
+        conn = self._connect()
+        conn.execute('UPDATE photos SET ocr_text = ? WHERE id = ?', (ocr_text, photo_id))
+        conn.commit()
+        conn.close()
+
+    def delete_photo(self, photo_id: int) -> bool:
+        """Remove a photo entry, and its file once no other owner references it"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT content_hash, ext FROM photos WHERE id = ?', (photo_id,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.close()
+            return False
+
+        cursor.execute('DELETE FROM photos WHERE id = ?', (photo_id,))
+        cursor.execute('SELECT 1 FROM photos WHERE content_hash = ? LIMIT 1', (row['content_hash'],))
+        still_referenced = cursor.fetchone() is not None
+        conn.commit()
+        conn.close()
+
+        if not still_referenced:
+            path = self.blob_path(row['content_hash'], row['ext'])
+            if os.path.exists(path):
+                os.remove(path)
+            delete_thumbnails(path)
+        return True
+
+    def import_legacy_photos(self, owner: str = "unknown") -> int:
+        """Copy timestamp-named photos from the flat directory into the store
+
+        The originals are left in place (some are tracked in git); each file
+        is imported once, so deleting it from the gallery does not bring it back.
+        """
+        conn = self._connect()
+        done = {row['name'] for row in conn.execute('SELECT name FROM legacy_imports')}
+        conn.close()
+
+        imported = 0
+        for entry in os.scandir(self.root_dir):
+            if not entry.is_file() or not entry.name.lower().endswith(LEGACY_EXTENSIONS):
+                continue
+            if entry.name in done:
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    data = f.read()
+                created_at = datetime.fromtimestamp(entry.stat().st_mtime).isoformat(timespec="microseconds")
+                ext = os.path.splitext(entry.name)[1].lower()
+                self.save_bytes(data, owner, ext, original_name=entry.name, created_at=created_at)
+            except (OSError, ValueError, sqlite3.Error):
+                logger.exception("Could not import legacy photo %s", entry.path)
+                continue
+            conn = self._connect()
+            conn.execute('INSERT OR IGNORE INTO legacy_imports (name, imported_at) VALUES (?, ?)',
+                         (entry.name, datetime.now().isoformat()))
+            conn.commit()
+            conn.close()
+            imported += 1
+        return imported
+
+    def _row_to_photo(self, row) -> Dict:
+        photo = dict(row)
+        photo['path'] = self.blob_path(photo['content_hash'], photo['ext'])
+        return photo
+
+
+_photo_store: Optional[PhotoStore] = None
+_photo_store_lock = threading.Lock()
+
+
+def get_photo_store() -> PhotoStore:
+    """Process-wide photo store; the schema and legacy import run once"""
+    global _photo_store
+    with _photo_store_lock:
+        if _photo_store is None:
+            _photo_store = PhotoStore()
+        return _photo_store
+
+
+if __name__ == "__main__":
+    store = get_photo_store()
+    print(f"Photo store has {store.count_photos()} photos")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Rerun Latency Profiler
+Times every Streamlit rerun by mode and phase (setup, sidebar, body) plus
+heavy calls made inside it (OCR, AI, handwriting grading). Latencies go into
+rolling histograms kept in memory; snapshots are written periodically as JSON
+and in the Prometheus text format.
+
+Usage in the app:
+    with get_rerun_profiler().rerun() as trace:
+        ...
+        trace.lap("setup")
+        trace.mode = "learn"
+        with timed("recognize"):
+            ...
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Bucket upper bounds in milliseconds, roughly x1.5 apart
+BUCKETS_MS = (
+    1, 2, 3, 5, 7.5, 10, 15, 25, 35, 50, 75, 100, 150, 250, 350, 500, 750,
+    1000, 1500, 2500, 3500, 5000, 7500, 10000, 15000, 30000, 60000, float("inf"),
+)
+# Percentiles cover the last WINDOW_SLOTS x SLOT_SECONDS
+SLOT_SECONDS = 60
+WINDOW_SLOTS = 15
+SLOWEST_KEPT = 20
+RECENT_RERUNS = 500
+
+DEFAULT_SNAPSHOT_DIR = "rerun_profiles"
+DEFAULT_SNAPSHOT_SECONDS = 60.0
+
+TOTAL = "total"
+
+
+class RollingHistogram:
+    """Bucketed latencies over a sliding window, plus lifetime totals for Prometheus"""
+
+    def __init__(self):
+        self._slots: deque = deque(maxlen=WINDOW_SLOTS)   # (slot number, counts)
+        self.lifetime = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float, now: float):
+        slot = int(now // SLOT_SECONDS)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots.append((slot, [0] * len(BUCKETS_MS)))
+        i = bisect.bisect_left(BUCKETS_MS, ms)
+        self._slots[-1][1][i] += 1
+        self.lifetime[i] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def window(self, now: float) -> List[int]:
+        oldest = int(now // SLOT_SECONDS) - WINDOW_SLOTS + 1
+        counts = [0] * len(BUCKETS_MS)
+        for slot, slot_counts in self._slots:
+            if slot >= oldest:
+                for i, n in enumerate(slot_counts):
+                    counts[i] += n
+        return counts
+
+    def percentile(self, q: float, now: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile of the window"""
+        counts = self.window(now)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != float("inf") else BUCKETS_MS[-2]
+        return BUCKETS_MS[-2]
+
+
+class RerunTrace:
+    """Phase timings of one rerun; lap() closes the phase that ends now"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self._lap_started = self.started
+        self.phases: Dict[str, float] = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.add(phase, (now - self._lap_started) * 1000)
+        self._lap_started = now
+
+    def add(self, phase: str, ms: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + ms
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+
+class RerunProfiler:
+    def __init__(self, snapshot_dir: Optional[str] = None,
+                 snapshot_seconds: float = DEFAULT_SNAPSHOT_SECONDS):
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_seconds = snapshot_seconds
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], RollingHistogram] = {}
+        self._recent: deque = deque(maxlen=RECENT_RERUNS)
+        self._local = threading.local()
+        self._last_snapshot = time.monotonic()
+
+    @contextmanager
+    def rerun(self, mode: str = "unknown") -> Iterator[RerunTrace]:
+        """Time one script run; records even when it ends in st.rerun() or st.stop()"""
+        trace = RerunTrace(mode)
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = None
+            self.record(trace)
+            self.maybe_write_snapshot()
+
+    def current(self) -> Optional[RerunTrace]:
+        return getattr(self._local, "trace", None)
+
+    def record(self, trace: RerunTrace):
+        total_ms = (time.perf_counter() - trace.started) * 1000
+        now = time.time()
+        with self._lock:
+            for phase, ms in list(trace.phases.items()) + [(TOTAL, total_ms)]:
+                self._histogram(trace.mode, phase).observe(ms, now)
+            self._recent.append({
+                "mode": trace.mode,
+                "total_ms": round(total_ms, 2),
+                "phases": {p: round(ms, 2) for p, ms in trace.phases.items()},
+                "at": now,
+            })
+
+    def observe(self, mode: str, phase: str, ms: float):
+        """Latency measured outside a rerun, e.g. a background OCR or AI job"""
+        with self._lock:
+            self._histogram(mode, phase).observe(ms, time.time())
+
+    def _histogram(self, mode: str, phase: str) -> RollingHistogram:
+        histogram = self._histograms.get((mode, phase))
+        if histogram is None:
+            histogram = self._histograms[(mode, phase)] = RollingHistogram()
+        return histogram
+
+    def summary(self) -> List[Dict]:
+        """p50/p95 over the window per mode and phase, slowest p95 first"""
+        now = time.time()
+        with self._lock:
+            rows = [{
+                "mode": mode,
+                "phase": phase,
+                "count": sum(h.window(now)),
+                "p50_ms": h.percentile(0.5, now),
+                "p95_ms": h.percentile(0.95, now),
+            } for (mode, phase), h in self._histograms.items()]
+        rows = [r for r in rows if r["count"]]
+        rows.sort(key=lambda r: (r["phase"] != TOTAL, -(r["p95_ms"] or 0)))
+        return rows
+
+    def slowest(self, n: int = SLOWEST_KEPT) -> List[Dict]:
+        with self._lock:
+            recent = list(self._recent)
+        return sorted(recent, key=lambda r: r["total_ms"], reverse=True)[:n]
+
+    def snapshot(self) -> Dict:
+        return {"generated_at": time.time(), "latency": self.summary(), "slowest": self.slowest()}
+
+    def to_prometheus(self) -> str:
+        """Lifetime histograms in the Prometheus text exposition format"""
+        name = "gurmukhi_rerun_latency_ms"
+        lines = [f"# HELP {name} Streamlit rerun latency by mode and phase",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (mode, phase), h in items:
+                labels = f'mode="{mode}",phase="{phase}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS_MS, h.lifetime):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum_ms:.3f}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_write_snapshot(self, force: bool = False):
+        if not self.snapshot_dir:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_snapshot < self.snapshot_seconds:
+                return
+            self._last_snapshot = now
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            _write_atomic(os.path.join(self.snapshot_dir, "rerun_latency.json"),
+                          json.dumps(self.snapshot(), indent=2))
+            _write_atomic(os.path.join(self.snapshot_dir, "rerun_latency.prom"), self.to_prometheus())
+        except OSError as e:
+            print(f"Could not write rerun profile snapshot: {e}")
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Time a heavy call as a phase of the current rerun (no-op outside one)"""
+    trace = get_rerun_profiler().current()
+    if trace is None:
+        yield
+        return
+    with trace.phase(phase):
+        yield
+
+
+_profiler: Optional[RerunProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_rerun_profiler() -> RerunProfiler:
+    """Process-wide profiler; RERUN_PROFILE_DIR="" turns snapshot files off"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = RerunProfiler(
+                snapshot_dir=os.environ.get("RERUN_PROFILE_DIR", DEFAULT_SNAPSHOT_DIR),
+                snapshot_seconds=float(os.environ.get("RERUN_PROFILE_SECONDS", DEFAULT_SNAPSHOT_SECONDS)),
+            )
+        return _profiler
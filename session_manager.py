@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Session-State Footprint Control
+Assigns every session-state key to the mode that owns it, drops a mode's
+per-round keys when the learner leaves it (or finishes a quiz), accounts
+memory per namespace, and evicts the largest namespaces once a session
+goes over its memory budget, so RAM per concurrent learner stays predictable.
+
+Works on any mutable mapping; the app passes st.session_state.
+"""
+
+import io
+import os
+import sys
+from typing import Dict, Iterable, List, MutableMapping, Optional, Tuple
+
+# Policies
+PINNED = "pinned"          # never removed (identity, progress, schedulers)
+TRANSIENT = "transient"    # removed when the learner leaves the mode
+EVICTABLE = "evictable"    # kept across modes, removed only when over budget
+
+GLOBAL = "global"
+SEPARATOR = ":"
+
+DEFAULT_BUDGET_BYTES = 4 * 1024 * 1024
+MAX_DEPTH = 6
+
+LAST_MODE_KEY = "session_last_mode"
+
+# Keys each namespace owns. A pattern ending in ":" matches every key scoped
+# to that namespace with scoped(). Keys not listed anywhere count as global.
+NAMESPACES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    GLOBAL: {
+        PINNED: ("user_name", "session_id", "score", "learned_letters", "current_letter", "game_mode",
+                 "scheduler", "adaptive_quiz", "letter_confusions", LAST_MODE_KEY),
+    },
+    "learn": {
+        TRANSIENT: ("learn:",),
+    },
+    "practice": {
+        TRANSIENT: ("practice:", "game_letter", "game_options", "sound_letters", "sound_checked", "puzzle"),
+    },
+    "quiz": {
+        TRANSIENT: ("quiz:",),
+        EVICTABLE: ("quiz_started", "quiz_score", "quiz_question", "quiz_id", "quiz_questions",
+                    "quiz_options", "next_quiz"),
+    },
+    "stories": {
+        TRANSIENT: ("stories:",),
+        EVICTABLE: ("story_difficulty", "story_readable_only", "story_page", "story_id"),
+    },
+    "camera": {
+        TRANSIENT: ("camera:", "saved_images", "gallery_full_image", "gallery_page", "gallery_only_mine",
+                    "handwriting_target", "handwriting_check", "sheet_same_letter", "grade_sheet",
+                    "close_full_image"),
+    },
+    "ai_helper": {
+        TRANSIENT: ("ai_helper:",),
+        EVICTABLE: ("chat_history", "homework_jobs", "current_question_context", "pending_followup",
+                    "followup_input"),
+    },
+}
+
+
+def scoped(namespace: str, name: str) -> str:
+    """Session-state key owned by a namespace, e.g. scoped("quiz", "radio_3") -> "quiz:radio_3" """
+    return f"{namespace}{SEPARATOR}{name}"
+
+
+def _build_index():
+    exact = {}
+    prefixes = []
+    for namespace, policies in NAMESPACES.items():
+        for policy, patterns in policies.items():
+            for pattern in patterns:
+                if pattern.endswith(SEPARATOR):
+                    prefixes.append((pattern, namespace, policy))
+                else:
+                    exact[pattern] = (namespace, policy)
+    return exact, prefixes
+
+
+_EXACT, _PREFIXES = _build_index()
+
+
+def classify(key: str) -> Tuple[str, str]:
+    """(namespace, policy) of a session-state key"""
+    found = _EXACT.get(key)
+    if found is not None:
+        return found
+    for prefix, namespace, policy in _PREFIXES:
+        if key.startswith(prefix):
+            return namespace, policy
+    return GLOBAL, PINNED
+
+
+def deep_size(value, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """Approximate bytes held by a value, counting shared objects once"""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, io.BytesIO):
+        # Uploaded files and camera photos
+        return sys.getsizeof(value) + value.getbuffer().nbytes
+    size = sys.getsizeof(value)
+    if _depth >= MAX_DEPTH:
+        return size
+    if isinstance(value, dict):
+        return size + sum(deep_size(k, seen, _depth + 1) + deep_size(v, seen, _depth + 1)
+                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(v, seen, _depth + 1) for v in value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes is not None:
+        return size + deep_size(attributes, seen, _depth + 1)
+    return size
+
+
+class SessionStateManager:
+    def __init__(self, state: MutableMapping, budget_bytes: Optional[int] = None):
+        self.state = state
+        self.budget_bytes = budget_bytes if budget_bytes is not None else int(
+            os.environ.get("SESSION_STATE_BUDGET_BYTES", DEFAULT_BUDGET_BYTES)
+        )
+
+    def keys(self, namespace: str, policies: Iterable[str] = (TRANSIENT, EVICTABLE)) -> List[str]:
+        policies = set(policies)
+        return [
+            key for key in list(self.state.keys())
+            if classify(key)[0] == namespace and classify(key)[1] in policies
+        ]
+
+    def clear(self, namespace: str, policies: Iterable[str] = (TRANSIENT,), prefix: str = "") -> int:
+        """Remove a namespace's keys with these policies; returns how many were removed"""
+        removed = 0
+        for key in self.keys(namespace, policies):
+            if key.startswith(prefix):
+                del self.state[key]
+                removed += 1
+        return removed
+
+    def enter(self, mode: str) -> int:
+        """Call once per rerun with the current mode; clears the previous mode's per-round keys"""
+        previous = self.state.get(LAST_MODE_KEY)
+        self.state[LAST_MODE_KEY] = mode
+        if previous is None or previous == mode:
+            return 0
+        return self.clear(previous)
+
+    def sizes(self) -> Dict[str, int]:
+        """Approximate bytes per namespace"""
+        sizes: Dict[str, int] = {}
+        seen: set = set()
+        for key in list(self.state.keys()):
+            namespace = classify(key)[0]
+            sizes[namespace] = sizes.get(namespace, 0) + deep_size(self.state[key], seen)
+        return sizes
+
+    def enforce_budget(self, current_mode: Optional[str] = None) -> List[str]:
+        """Evict whole namespaces, largest first, until the session fits its budget
+
+        A namespace's keys go together so a mode never sees half of its state
+        (the mode rebuilds it from scratch). Other modes go before the current
+        one; pinned keys stay. Returns the evicted namespaces.
+        """
+        groups: Dict[str, int] = {}
+        total = 0
+        seen: set = set()
+        for key in list(self.state.keys()):
+            size = deep_size(self.state[key], seen)
+            total += size
+            namespace, policy = classify(key)
+            if policy != PINNED:
+                groups[namespace] = groups.get(namespace, 0) + size
+        if total <= self.budget_bytes:
+            return []
+
+        evicted = []
+        for namespace, size in sorted(groups.items(), key=lambda item: (item[0] == current_mode, -item[1])):
+            if total <= self.budget_bytes:
+                break
+            self.clear(namespace, (TRANSIENT, EVICTABLE))
+            total -= size
+            evicted.append(namespace)
+        return evicted
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Practice Sheet Segmentation
+Splits a photographed sheet of handwritten letters into glyph boxes with
+OpenCV connected components, merges matra fragments, orders the boxes into
+rows and grades the crops in batches until the time budget runs out
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from handwriting import HandwritingRecognizer, normalize_mask
+
+# Large photos are scaled down first so a sheet is processed in bounded time
+MAX_SIDE = 1600
+MAX_GLYPHS = 300
+# Only the largest components are merged, so a noisy photo cannot blow up the merge step
+MAX_COMPONENTS = 4 * MAX_GLYPHS
+DEFAULT_TIME_BUDGET = 2.0
+# Glyphs classified between two deadline checks
+CLASSIFY_CHUNK = 32
+
+# Components smaller than this fraction of the median glyph area are noise
+MIN_AREA_RATIO = 0.08
+# Fragments overlapping this much horizontally and this close vertically are one glyph
+MERGE_OVERLAP = 0.4
+MERGE_GAP_RATIO = 0.6
+# Glyph centres within this fraction of the median height share a row
+ROW_TOLERANCE = 0.6
+
+
+def binarize(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """Grayscale, downscale and threshold into a uint8 mask with ink = 255"""
+    array = np.asarray(image.convert("RGB")) if isinstance(image, Image.Image) else np.asarray(image)
+    gray = cv2.cvtColor(array, cv2.COLOR_RGB2GRAY) if array.ndim == 3 else array
+
+    scale = MAX_SIDE / max(gray.shape)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    # Adaptive threshold copes with uneven lighting across a page
+    binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 35, 15)
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+
+def find_components(binary: np.ndarray) -> np.ndarray:
+    """Bounding boxes (x0, y0, x1, y1) of ink components, noise removed"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    stats = stats[1:]  # drop the background
+    if len(stats) == 0:
+        return np.zeros((0, 4), dtype=np.int64)
+
+    areas = stats[:, cv2.CC_STAT_AREA]
+    keep = areas >= max(4, np.median(areas) * MIN_AREA_RATIO)
+    # Components spanning most of the page are borders or ruled lines
+    keep &= stats[:, cv2.CC_STAT_WIDTH] < binary.shape[1] * 0.8
+    stats = stats[keep]
+
+    if len(stats) > MAX_COMPONENTS:
+        stats = stats[np.argsort(stats[:, cv2.CC_STAT_AREA], kind="stable")[-MAX_COMPONENTS:]]
+
+    x0 = stats[:, cv2.CC_STAT_LEFT]
+    y0 = stats[:, cv2.CC_STAT_TOP]
+    return np.stack([x0, y0, x0 + stats[:, cv2.CC_STAT_WIDTH], y0 + stats[:, cv2.CC_STAT_HEIGHT]], axis=1)
+
+
+def merge_fragments(boxes: np.ndarray) -> np.ndarray:
+    """Union boxes that are vertically stacked pieces of one glyph (matras, dots, headlines)"""
+    n = len(boxes)
+    if n < 2:
+        return boxes
+
+    heights = boxes[:, 3] - boxes[:, 1]
+    max_gap = np.median(heights) * MERGE_GAP_RATIO
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sweep in x order so each box is compared only with boxes it can overlap
+    order = np.argsort(boxes[:, 0], kind="stable")
+    for a_pos, a in enumerate(order):
+        for b in order[a_pos + 1:]:
+            if boxes[b, 0] >= boxes[a, 2]:
+                break
+            overlap = min(boxes[a, 2], boxes[b, 2]) - max(boxes[a, 0], boxes[b, 0])
+            narrower = min(boxes[a, 2] - boxes[a, 0], boxes[b, 2] - boxes[b, 0])
+            gap = max(boxes[a, 1], boxes[b, 1]) - min(boxes[a, 3], boxes[b, 3])
+            if overlap >= MERGE_OVERLAP * narrower and gap <= max_gap:
+                parent[find(a)] = find(b)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return np.array([
+        [boxes[m, 0].min(), boxes[m, 1].min(), boxes[m, 2].max(), boxes[m, 3].max()]
+        for m in (np.array(members) for members in groups.values())
+    ])
+
+
+def order_rows(boxes: np.ndarray) -> List[List[int]]:
+    """Group box indices into rows (top to bottom), each sorted left to right"""
+    if len(boxes) == 0:
+        return []
+    centres = (boxes[:, 1] + boxes[:, 3]) / 2.0
+    tolerance = np.median(boxes[:, 3] - boxes[:, 1]) * ROW_TOLERANCE
+
+    rows: List[List[int]] = []
+    row_centre = None
+    for i in np.argsort(centres, kind="stable"):
+        if row_centre is None or centres[i] - row_centre > tolerance:
+            rows.append([])
+            row_centre = centres[i]
+        rows[-1].append(int(i))
+    return [sorted(row, key=lambda i: boxes[i, 0]) for row in rows]
+
+
+def _past(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def segment_sheet(image: Union[Image.Image, np.ndarray], deadline: Optional[float] = None) -> Dict:
+    """Glyph boxes in reading order with crops that are views into the binarized sheet
+
+    The deadline is checked between phases. A phase that has started runs to
+    the end, and each is bounded by MAX_SIDE and MAX_COMPONENTS. A sheet that
+    is already late after a phase comes back with no glyphs and timed_out set.
+    """
+    binary = binarize(image)
+    empty = {"binary": binary, "glyphs": [], "rows": 0, "timed_out": True}
+    if _past(deadline):
+        return empty
+    components = find_components(binary)
+    if _past(deadline):
+        return empty
+    boxes = merge_fragments(components)
+    if _past(deadline):
+        return empty
+
+    rows = order_rows(boxes)
+    glyphs = []
+    for row_index, row in enumerate(rows):
+        for col_index, i in enumerate(row):
+            if len(glyphs) >= MAX_GLYPHS:
+                break
+            x0, y0, x1, y1 = (int(v) for v in boxes[i])
+            glyphs.append({
+                "box": (x0, y0, x1, y1),
+                "row": row_index,
+                "col": col_index,
+                # Slicing keeps a view into the sheet instead of copying pixels
+                "crop": binary[y0:y1, x0:x1],
+            })
+    return {"binary": binary, "glyphs": glyphs, "rows": len(rows), "timed_out": False}
+
+
+def grade_sheet(image: Union[Image.Image, np.ndarray], recognizer: HandwritingRecognizer,
+                expected: Optional[Union[str, Sequence[str]]] = None,
+                time_budget: float = DEFAULT_TIME_BUDGET) -> Dict:
+    """Segment a practice sheet and classify its glyphs in chunks within the time budget
+
+    expected may be one letter (the whole sheet repeats it) or a sequence in reading order.
+    When the budget runs out, the glyphs classified so far keep their letters,
+    the rest have none, and timed_out is set.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget
+    segmentation = segment_sheet(image, deadline)
+    glyphs = segmentation["glyphs"]
+    timed_out = segmentation["timed_out"]
+
+    classified = 0
+    for chunk_start in range(0, len(glyphs), CLASSIFY_CHUNK):
+        if _past(deadline):
+            timed_out = True
+            break
+        chunk = glyphs[chunk_start:chunk_start + CLASSIFY_CHUNK]
+        batch = np.stack([normalize_mask(glyph["crop"] > 0) for glyph in chunk])
+        for glyph, (letter, confidence) in zip(chunk, recognizer.classify_batch(batch)):
+            glyph["letter"] = letter
+            glyph["confidence"] = confidence
+        classified += len(chunk)
+
+    correct = None
+    if expected is not None and classified:
+        targets = [expected] * len(glyphs) if isinstance(expected, str) else list(expected)
+        for glyph, target in zip(glyphs[:classified], targets):
+            glyph["expected"] = target
+            glyph["correct"] = glyph["letter"] == target
+        correct = sum(1 for glyph in glyphs if glyph.get("correct"))
+
+    return {
+        "glyphs": glyphs,
+        "rows": segmentation["rows"],
+        "correct": correct,
+        "graded": sum(1 for glyph in glyphs if "expected" in glyph),
+        "classified": classified,
+        "timed_out": timed_out,
+        "elapsed": time.perf_counter() - start,
+    }
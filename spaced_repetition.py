@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Spaced Repetition Scheduler
+SM-2 style scheduling of the 35 letters per learner, persisted in SQLite,
+with an in-memory heap of due letters and batched write-back
+"""
+
+import heapq
+import sqlite3
+import time
+import weakref
+from typing import Dict, List, Optional, Sequence
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+
+DAY_SECONDS = 24 * 60 * 60
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# A missed letter comes back after a minute so it is retried in the same session
+RELEARN_SECONDS = 60
+
+# Pending reviews are written back once this many pile up or this much time passes
+FLUSH_BATCH = 20
+FLUSH_INTERVAL_SECONDS = 60
+
+LETTER_ORDER = {letter: i for i, letter in enumerate(GURMUKHI_AKHARI)}
+
+
+def init_database(db_path: str):
+    """Create the per-learner letter review table"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS letter_reviews (
+            user_id TEXT NOT NULL,
+            letter TEXT NOT NULL,
+            ease REAL NOT NULL DEFAULT 2.5,
+            interval_seconds REAL NOT NULL DEFAULT 0,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            lapses INTEGER NOT NULL DEFAULT 0,
+            due_at REAL NOT NULL DEFAULT 0,
+            last_review REAL,
+            PRIMARY KEY (user_id, letter)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_letter_reviews_due ON letter_reviews (user_id, due_at)')
+
+    conn.commit()
+    conn.close()
+
+
+def due_letters(db_path: str, user_id: str, limit: int, now: Optional[float] = None) -> List[str]:
+    """Next letters due for a learner straight from the (user_id, due_at) index
+
+    Reads the persisted queue, so it serves views of a learner whose scheduler
+    is not loaded; reviews a scheduler has not flushed yet are not seen.
+    """
+    now = time.time() if now is None else now
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT letter FROM letter_reviews
+        WHERE user_id = ? AND due_at <= ?
+        ORDER BY due_at
+        LIMIT ?
+    ''', (user_id, now, limit))
+    letters = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return letters
+
+
+def flush_reviews(db_path: str, rows: Sequence[tuple]):
+    """Write many learners' pending reviews in one transaction"""
+    if not rows:
+        return
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO letter_reviews
+        (user_id, letter, ease, interval_seconds, repetitions, lapses, due_at, last_review)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, letter) DO UPDATE SET
+            ease = excluded.ease,
+            interval_seconds = excluded.interval_seconds,
+            repetitions = excluded.repetitions,
+            lapses = excluded.lapses,
+            due_at = excluded.due_at,
+            last_review = excluded.last_review
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def _flush_pending(db_path: str, pending: Dict[str, tuple]):
+    flush_reviews(db_path, list(pending.values()))
+    pending.clear()
+
+
+class SpacedRepetitionScheduler:
+    def __init__(self, user_id: str, db_path: str = "gurmukhi_progress.db"):
+        self.user_id = user_id
+        self.db_path = db_path
+        init_database(db_path)
+
+        # Letters never reviewed are due now, in alphabet order
+        self.cards: Dict[str, Dict] = {
+            letter: {
+                "ease": DEFAULT_EASE, "interval_seconds": 0.0, "repetitions": 0,
+                "lapses": 0, "due_at": 0.0, "last_review": None,
+            }
+            for letter in GURMUKHI_AKHARI
+        }
+        self._load()
+
+        self._versions = {letter: 0 for letter in self.cards}
+        self._heap = [
+            (card["due_at"], LETTER_ORDER[letter], letter, 0)
+            for letter, card in self.cards.items()
+        ]
+        heapq.heapify(self._heap)
+
+        self._pending: Dict[str, tuple] = {}
+        self._last_flush = time.time()
+        # Reviews still pending when the session's scheduler is dropped, or the
+        # process exits, are written then rather than lost
+        weakref.finalize(self, _flush_pending, db_path, self._pending)
+
+    def _load(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT letter, ease, interval_seconds, repetitions, lapses, due_at, last_review
+            FROM letter_reviews WHERE user_id = ?
+        ''', (self.user_id,))
+        for letter, ease, interval, repetitions, lapses, due_at, last_review in cursor.fetchall():
+            if letter in self.cards:
+                self.cards[letter] = {
+                    "ease": ease, "interval_seconds": interval, "repetitions": repetitions,
+                    "lapses": lapses, "due_at": due_at, "last_review": last_review,
+                }
+        conn.close()
+
+    def next_letters(self, n: int, exclude: Sequence[str] = ()) -> List[str]:
+        """The n letters due soonest (most overdue first)"""
+        taken = []
+        chosen = []
+        while self._heap and len(chosen) < n:
+            entry = heapq.heappop(self._heap)
+            due_at, order, letter, version = entry
+            if version != self._versions[letter]:
+                continue  # stale entry left behind by an earlier review
+            taken.append(entry)
+            if letter not in exclude:
+                chosen.append(letter)
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return chosen
+
+    def next_letter(self, exclude: Sequence[str] = ()) -> str:
+        letters = self.next_letters(1, exclude)
+        return letters[0] if letters else next(iter(self.cards))
+
+    def due_count(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return sum(1 for card in self.cards.values() if card["due_at"] <= now)
+
+    def record(self, letter: str, correct: bool, quality: Optional[int] = None, now: Optional[float] = None):
+        """Apply an SM-2 update for one answer (quality 0-5, derived from correct if omitted)"""
+        now = time.time() if now is None else now
+        if quality is None:
+            quality = 4 if correct else 1
+        card = self.cards[letter]
+
+        if quality < 3:
+            card["repetitions"] = 0
+            card["lapses"] += 1
+            card["interval_seconds"] = RELEARN_SECONDS
+        else:
+            card["repetitions"] += 1
+            if card["repetitions"] == 1:
+                card["interval_seconds"] = DAY_SECONDS
+            elif card["repetitions"] == 2:
+                card["interval_seconds"] = 6 * DAY_SECONDS
+            else:
+                card["interval_seconds"] = card["interval_seconds"] * card["ease"]
+        card["ease"] = max(MIN_EASE, card["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        card["due_at"] = now + card["interval_seconds"]
+        card["last_review"] = now
+
+        self._versions[letter] += 1
+        heapq.heappush(self._heap, (card["due_at"], LETTER_ORDER[letter], letter, self._versions[letter]))
+        # Stale entries are skipped lazily; rebuild once they dominate the heap
+        if len(self._heap) > 4 * len(self.cards):
+            self._heap = [(c["due_at"], LETTER_ORDER[l], l, self._versions[l]) for l, c in self.cards.items()]
+            heapq.heapify(self._heap)
+
+        self._pending[letter] = (
+            self.user_id, letter, card["ease"], card["interval_seconds"], card["repetitions"],
+            card["lapses"], card["due_at"], card["last_review"],
+        )
+
+    def pending_rows(self) -> List[tuple]:
+        return list(self._pending.values())
+
+    def maybe_flush(self):
+        """Flush when enough reviews are pending or enough time has passed"""
+        if not self._pending:
+            return
+        if len(self._pending) >= FLUSH_BATCH or time.time() - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Write pending reviews back to SQLite in one batch"""
+        _flush_pending(self.db_path, self._pending)
+        self._last_flush = time.time()
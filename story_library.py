@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Story Library for Stories Mode
+Cached, paginated read access to the materialized learning_stories table.
+Difficulty and letter filters and LIMIT/OFFSET paging run in SQL over the
+indexed columns; pages, counts and story bodies are cached until their TTL
+runs out or the ingestion generation changes.
+Reads go to the newest read-only snapshot (see content_snapshot), so they never
+wait on ingestion. The library itself never writes: seeding, story refresh and
+publishing are ingestion steps (prepare_stories). Nothing here touches the
+network.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from content_codec import get_codec, letters_to_mask
+from content_db import CONTENT_DB_PATH, bump_generation, get_generation, init_content_database
+from content_snapshot import current_snapshot, open_snapshot, publish_snapshot, snapshot_dir_for
+from learning_stories import refresh_learning_stories
+
+STORY_CACHE_TTL_SECONDS = 300
+# How often a cached catalog re-reads the generation counter
+GENERATION_CHECK_SECONDS = 5
+STORY_BODY_CACHE_ENTRIES = 64
+FILTER_CACHE_ENTRIES = 128
+STORIES_PAGE_SIZE = 10
+
+# Built-in stories so the mode works before any content has been ingested
+SAMPLE_STORIES = (
+    {
+        "title_punjabi": "ਚੰਗਾ ਬੱਚਾ",
+        "title_english": "The Good Child",
+        "content_punjabi": "ਇੱਕ ਵਾਰ ਇੱਕ ਚੰਗਾ ਬੱਚਾ ਸੀ। ਉਹ ਰੋਜ਼ ਸਕੂਲ ਜਾਂਦਾ ਸੀ।",
+        "content_english": "Once there was a good child. He went to school every day.",
+        "difficulty": 1,
+    },
+    {
+        "title_punjabi": "ਸੁੰਦਰ ਬਾਗ਼",
+        "title_english": "Beautiful Garden",
+        "content_punjabi": "ਬਾਗ਼ ਵਿੱਚ ਬਹੁਤ ਸਾਰੇ ਫੁੱਲ ਸਨ। ਤਿਤਲੀਆਂ ਉੱਡ ਰਹੀਆਂ ਸਨ।",
+        "content_english": "There were many flowers in the garden. Butterflies were flying.",
+        "difficulty": 2,
+    },
+)
+
+# Comprehension questions for stories that have them, keyed by Punjabi title
+STORY_QUESTIONS = {
+    "ਚੰਗਾ ਬੱਚਾ": {
+        "question": "What did the good child do every day?",
+        "options": ["Played games", "Went to school", "Watched TV"],
+        "answer": "Went to school",
+    },
+}
+
+
+def seed_sample_stories(db_path: str = CONTENT_DB_PATH) -> int:
+    """Insert the built-in stories if the content database has no articles"""
+    conn = sqlite3.connect(db_path)
+    try:
+        if conn.execute("SELECT 1 FROM punjabi_articles LIMIT 1").fetchone():
+            return 0
+        now = str(datetime.now())
+        codec = get_codec(conn, db_path)
+        for story in SAMPLE_STORIES:
+            conn.execute('''
+                INSERT INTO punjabi_articles
+                (title_punjabi, title_english, content_punjabi, content_english,
+                 source, url, difficulty_level, letter_mask, created_date, category)
+                VALUES (?, ?, ?, ?, 'Sample Story', 'sample', ?, ?, ?, 'story')
+            ''', (story["title_punjabi"], story["title_english"], codec.compress(story["content_punjabi"]),
+                  codec.compress(story["content_english"]), story["difficulty"],
+                  letters_to_mask(story["content_punjabi"]), now))
+        bump_generation(conn)
+        conn.commit()
+        return len(SAMPLE_STORIES)
+    finally:
+        conn.close()
+
+
+def prepare_stories(db_path: str = CONTENT_DB_PATH, snapshot_dir: Optional[str] = None) -> Optional[str]:
+    """Ingestion side of Stories mode: schema, sample stories, story backlog, then a new snapshot"""
+    init_content_database(db_path)
+    seed_sample_stories(db_path)
+    refresh_learning_stories(db_path)
+    return publish_snapshot(db_path, snapshot_dir)
+
+
+logger = logging.getLogger(__name__)
+
+
+class StoryLibrary:
+    """Reads the newest published snapshot when there is one, else the live database read-only"""
+
+    def __init__(self, db_path: str = CONTENT_DB_PATH, ttl: float = STORY_CACHE_TTL_SECONDS,
+                 snapshot_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.snapshot_dir = snapshot_dir or snapshot_dir_for(db_path)
+
+        self._lock = threading.Lock()
+        self._snapshot_path: Optional[str] = None
+        # False when there is neither a snapshot nor a readable content database yet
+        self._has_content = True
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._cache_started_at = time.monotonic()
+        # (difficulty, learned mask, page, page size) -> page rows; page None -> count
+        self._query_cache: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._bodies: "OrderedDict[int, Dict]" = OrderedDict()
+
+    def _connect(self):
+        snapshot_path = self._snapshot_path
+        if snapshot_path:
+            conn = open_snapshot(snapshot_path)
+        else:
+            uri = "file:" + urllib.parse.quote(os.path.abspath(self.db_path)) + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _current_generation(self) -> int:
+        """Published snapshot's generation (switching to it), or the live database's"""
+        snapshot = current_snapshot(self.snapshot_dir)
+        if snapshot is not None:
+            self._snapshot_path = snapshot[1]
+            self._has_content = True
+            return snapshot[0]
+        self._snapshot_path = None
+        try:
+            conn = self._connect()
+            try:
+                generation = get_generation(conn)
+                conn.execute("SELECT 1 FROM learning_stories LIMIT 1")
+            finally:
+                conn.close()
+        except sqlite3.OperationalError:
+            if self._has_content:
+                logger.warning("No story content at %s; run python content_snapshot.py", self.db_path)
+            self._has_content = False
+            return -1
+        self._has_content = True
+        return generation
+
+    def _validate(self):
+        """Drop cached results after the TTL or when ingestion bumped the generation (lock held)"""
+        now = time.monotonic()
+        if now - self._cache_started_at > self.ttl:
+            self._invalidate()
+        if now - self._checked_at < GENERATION_CHECK_SECONDS:
+            return
+        generation = self._current_generation()
+        self._checked_at = now
+        if generation != self._generation:
+            self._generation = generation
+            self._invalidate()
+
+    def _invalidate(self):
+        self._cache_started_at = time.monotonic()
+        self._query_cache.clear()
+        self._bodies.clear()
+
+    def invalidate(self):
+        with self._lock:
+            self._invalidate()
+            self._checked_at = 0.0
+
+    @staticmethod
+    def _where(difficulty: Optional[int], learned_mask: Optional[int]) -> Tuple[str, tuple]:
+        clauses, params = [], []
+        if difficulty is not None:
+            clauses.append("difficulty_level = ?")
+            params.append(difficulty)
+        if learned_mask is not None:
+            # Readable: the story uses no letter outside the learned set
+            clauses.append("letter_mask IS NOT NULL AND (letter_mask & ~?) = 0")
+            params.append(learned_mask)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", tuple(params)
+
+    def _cached(self, key: Tuple, load):
+        with self._lock:
+            self._validate()
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key]
+        value = load()
+        with self._lock:
+            self._query_cache[key] = value
+            while len(self._query_cache) > FILTER_CACHE_ENTRIES:
+                self._query_cache.popitem(last=False)
+        return value
+
+    def _query(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        if not self._has_content:
+            return []
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def list_stories(self, difficulty: Optional[int] = None, readable_with: Optional[Sequence[str]] = None,
+                     page: int = 1, page_size: int = STORIES_PAGE_SIZE) -> Tuple[List[Dict], int]:
+        """One page of story summaries (newest first) and the total number matching the filters
+
+        readable_with limits results to stories that only use those letters.
+        """
+        learned_mask = None if readable_with is None else letters_to_mask(readable_with)
+        page = max(page, 1)
+        where, params = self._where(difficulty, learned_mask)
+
+        def load_page():
+            # Walks idx_learning_stories_created or idx_learning_stories_difficulty in order
+            rows = self._query(f'''
+                SELECT id, title_punjabi, title_english, difficulty_level, source
+                FROM learning_stories{where}
+                ORDER BY source_created_date DESC, id DESC
+                LIMIT ? OFFSET ?
+            ''', params + (page_size, (page - 1) * page_size))
+            return [{
+                'id': row['id'],
+                'title_punjabi': row['title_punjabi'],
+                'title_english': row['title_english'],
+                'difficulty': row['difficulty_level'],
+                'source': row['source'],
+            } for row in rows]
+
+        stories = self._cached((difficulty, learned_mask, page, page_size), load_page) if page_size else []
+        return stories, self._count(difficulty, learned_mask)
+
+    def _count(self, difficulty: Optional[int], learned_mask: Optional[int]) -> int:
+        where, params = self._where(difficulty, learned_mask)
+
+        def load_count():
+            rows = self._query(f"SELECT COUNT(*) FROM learning_stories{where}", params)
+            return rows[0][0] if rows else 0
+
+        return self._cached((difficulty, learned_mask, None, None), load_count)
+
+    def count_stories(self, difficulty: Optional[int] = None, readable_with: Optional[Sequence[str]] = None) -> int:
+        learned_mask = None if readable_with is None else letters_to_mask(readable_with)
+        return self._count(difficulty, learned_mask)
+
+    def get_story(self, story_id: int) -> Optional[Dict]:
+        """Full story by id, served from a small LRU cache"""
+        with self._lock:
+            self._validate()
+            story = self._bodies.get(story_id)
+            if story is not None:
+                self._bodies.move_to_end(story_id)
+                return story
+
+        rows = self._query('''
+            SELECT id, article_id, title_punjabi, title_english, content_punjabi, content_english,
+                   title_roman, content_roman, source, source_url, difficulty_level
+            FROM learning_stories WHERE id = ?
+        ''', (story_id,))
+        if not rows:
+            return None
+        row = rows[0]
+
+        story = {
+            'id': row['id'],
+            'title_punjabi': row['title_punjabi'],
+            'title_english': row['title_english'],
+            'content_punjabi': row['content_punjabi'],
+            'content_english': row['content_english'],
+            'title_roman': row['title_roman'],
+            'content_roman': row['content_roman'],
+            'source': row['source'],
+            'source_url': row['source_url'],
+            'article_id': row['article_id'],
+            'difficulty': row['difficulty_level'],
+            'question': STORY_QUESTIONS.get(row['title_punjabi']),
+        }
+        with self._lock:
+            self._bodies[story_id] = story
+            while len(self._bodies) > STORY_BODY_CACHE_ENTRIES:
+                self._bodies.popitem(last=False)
+        return story
+
+
+_story_library: Optional[StoryLibrary] = None
+_story_library_lock = threading.Lock()
+
+
+def get_story_library() -> StoryLibrary:
+    """Process-wide story library shared by every session"""
+    global _story_library
+    with _story_library_lock:
+        if _story_library is None:
+            _story_library = StoryLibrary()
+        return _story_library
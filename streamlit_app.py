@@ -6,19 +6,45 @@ With LLM+RAG for latest Punjabi stories and bilingual content
 """
 
 import streamlit as st
-import random
 import json
-from datetime import datetime
 from typing import Dict, List, Optional
 import requests
 import sqlite3
 import os
+import hashlib
+import uuid
 from PIL import Image
 import io
-import pytesseract
-import cv2
-import numpy as np
-import google.generativeai as genai
+
+from gurmukhi_letters import GURMUKHI_AKHARI
+from letter_model import LETTER_MODEL
+from spaced_repetition import SpacedRepetitionScheduler, due_letters
+from adaptive_quiz import AdaptiveQuiz, QUIZ_LENGTH
+from word_index import get_word_index
+from handwriting import get_recognizer, gurmukhi_font_available
+from sheet_segmentation import grade_sheet
+from ocr import extract_text_from_bytes
+from job_queue import get_job_queue, OCR, AI, FAILED
+from thumbnails import get_thumbnail
+from photo_store import get_photo_store
+from audio_assets import get_letter_audio, save_letter_audio, delete_letter_audio
+from audio_sprite import get_sprite_clip, rebuild_sprite_async
+from ai_backend import get_ai_client
+from ai_scheduler import get_ai_scheduler
+from chat_store import ChatStore
+from story_library import get_story_library, STORIES_PAGE_SIZE
+from transliteration import transliterate
+from rerun_profiler import get_rerun_profiler, timed
+from session_manager import SessionStateManager, scoped
+from web_assets import style_tag
+from learning_events import get_event_recorder, get_learning_dashboard, LETTER_VIEW, ANSWER, QUIZ_COMPLETE, UPLOAD
+
+# How often pending background jobs are polled (seconds)
+JOB_POLL_SECONDS = 0.5
+
+# Photos shown per gallery page
+GALLERY_PAGE_SIZE = 9
+CHAT_RENDER_TURNS = 5
 
 # Configure page
 st.set_page_config(
@@ -28,45 +54,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# 35 Gurmukhi Akhari (letters) with pronunciation and meanings
-GURMUKHI_AKHARI = {
-    "ੳ": {"roman": "Oora", "sound": "a", "phonetic": "OO-dha", "example": "ਅੰਗੂਰ (Angoor - Grapes)", "emoji": "🍇"},
-    "ਅ": {"roman": "Aira", "sound": "aa", "phonetic": "AY-dha", "example": "ਆਮ (Aam - Mango)", "emoji": "🥭"},
-    "ੲ": {"roman": "Iri", "sound": "i", "phonetic": "EE-dhee", "example": "ਇਕ (Ik - One)", "emoji": "1️⃣"},
-    "ਸ": {"roman": "Sassa", "sound": "s", "phonetic": "SUSS-saa", "example": "ਸੇਬ (Seb - Apple)", "emoji": "🍎"},
-    "ਹ": {"roman": "Haha", "sound": "h", "phonetic": "HAH-haa", "example": "ਹਾਥੀ (Haathi - Elephant)", "emoji": "🐘"},
-    "ਕ": {"roman": "Kakka", "sound": "k", "phonetic": "KUCK-kaa", "example": "ਕਮਲ (Kamal - Lotus)", "emoji": "🪷"},
-    "ਖ": {"roman": "Khakha", "sound": "kh", "phonetic": "KHUCK-khaa", "example": "ਖਰਗੋਸ਼ (Khargosh - Rabbit)", "emoji": "🐰"},
-    "ਗ": {"roman": "Gagga", "sound": "g", "phonetic": "GUCK-gaa", "example": "ਗਾਂ (Gaan - Cow)", "emoji": "🐄"},
-    "ਘ": {"roman": "Ghagha", "sound": "gh", "phonetic": "GHUCK-ghaa", "example": "ਘੋੜਾ (Ghora - Horse)", "emoji": "🐎"},
-    "ਙ": {"roman": "Nganga", "sound": "ng", "phonetic": "NG-ung-gaa", "example": "ਅੰਗ (Ang - Body part)", "emoji": "👤"},
-    "ਚ": {"roman": "Chacha", "sound": "ch", "phonetic": "CHUH-chaa", "example": "ਚੰਦ (Chand - Moon)", "emoji": "🌙"},
-    "ਛ": {"roman": "Chhachha", "sound": "chh", "phonetic": "CHHUH-chhaa", "example": "ਛਤਰੀ (Chhatri - Umbrella)", "emoji": "☂️"},
-    "ਜ": {"roman": "Jajja", "sound": "j", "phonetic": "JUH-jaa", "example": "ਜਹਾਜ਼ (Jahaaz - Ship)", "emoji": "🚢"},
-    "ਝ": {"roman": "Jhajha", "sound": "jh", "phonetic": "JHUH-jhaa", "example": "ਝੰਡਾ (Jhanda - Flag)", "emoji": "🏳️"},
-    "ਞ": {"roman": "Nyanya", "sound": "ny", "phonetic": "NYUH-nyaa", "example": "ਞਾਣ (Gyaan - Knowledge)", "emoji": "🧠"},
-    "ਟ": {"roman": "Tanka", "sound": "t", "phonetic": "TUNK-kaa", "example": "ਟੋਪੀ (Topi - Hat)", "emoji": "🎩"},
-    "ਠ": {"roman": "Thatha", "sound": "th", "phonetic": "THUH-thaa", "example": "ਠੰਡ (Thand - Cold)", "emoji": "🥶"},
-    "ਡ": {"roman": "Dadda", "sound": "d", "phonetic": "DUH-daa", "example": "ਡਰਾਮਾ (Drama)", "emoji": "🎭"},
-    "ਢ": {"roman": "Dhadha", "sound": "dh", "phonetic": "DHUH-dhaa", "example": "ਢੋਲ (Dhol - Drum)", "emoji": "🥁"},
-    "ਣ": {"roman": "Nana", "sound": "n", "phonetic": "NUH-naa", "example": "ਗੁਣ (Gun - Quality)", "emoji": "⭐"},
-    "ਤ": {"roman": "Tatta", "sound": "t", "phonetic": "TUH-taa", "example": "ਤਾਰਾ (Tara - Star)", "emoji": "⭐"},
-    "ਥ": {"roman": "Thatha", "sound": "th", "phonetic": "THUH-thaa", "example": "ਥਾਲੀ (Thaali - Plate)", "emoji": "🍽️"},
-    "ਦ": {"roman": "Dadda", "sound": "d", "phonetic": "DUH-daa", "example": "ਦਰਵਾਜ਼ਾ (Darwaza - Door)", "emoji": "🚪"},
-    "ਧ": {"roman": "Dhadha", "sound": "dh", "phonetic": "DHUH-dhaa", "example": "ਧੁੱਪ (Dhoop - Sunlight)", "emoji": "☀️"},
-    "ਨ": {"roman": "Nanna", "sound": "n", "phonetic": "NUH-naa", "example": "ਨਦੀ (Nadi - River)", "emoji": "🏞️"},
-    "ਪ": {"roman": "Pappa", "sound": "p", "phonetic": "PUH-paa", "example": "ਪੰਛੀ (Panchhi - Bird)", "emoji": "🐦"},
-    "ਫ": {"roman": "Phappha", "sound": "ph", "phonetic": "PHUH-phaa", "example": "ਫੁੱਲ (Phul - Flower)", "emoji": "🌸"},
-    "ਬ": {"roman": "Babba", "sound": "b", "phonetic": "BUH-baa", "example": "ਬਿੱਲਾ (Billa - Cat)", "emoji": "🐱"},
-    "ਭ": {"roman": "Bhabha", "sound": "bh", "phonetic": "BHUH-bhaa", "example": "ਭਾਲੂ (Bhaloo - Bear)", "emoji": "🐻"},
-    "ਮ": {"roman": "Mamma", "sound": "m", "phonetic": "MUH-maa", "example": "ਮੱਛੀ (Machhi - Fish)", "emoji": "🐟"},
-    "ਯ": {"roman": "Yayya", "sound": "y", "phonetic": "YUH-yaa", "example": "ਯੋਗ (Yog - Yoga)", "emoji": "🧘"},
-    "ਰ": {"roman": "Rara", "sound": "r", "phonetic": "RUH-raa", "example": "ਰੋਟੀ (Roti - Bread)", "emoji": "🫓"},
-    "ਲ": {"roman": "Lalla", "sound": "l", "phonetic": "LUH-laa", "example": "ਲੱਡੂ (Laddu - Sweet)", "emoji": "🍬"},
-    "ਵ": {"roman": "Vava", "sound": "v", "phonetic": "VUH-vaa", "example": "ਵਿਆਹ (Viah - Wedding)", "emoji": "💒"},
-    "ੜ": {"roman": "Rara", "sound": "r", "phonetic": "RUH-raa", "example": "ਪੜ੍ਹਨਾ (Parhna - To read)", "emoji": "📖"}
-}
-
 class GurmukhiLearningApp:
     def __init__(self):
         self.init_database()
@@ -115,60 +102,19 @@ class GurmukhiLearningApp:
             st.session_state.learned_letters = []
         if 'game_mode' not in st.session_state:
             st.session_state.game_mode = "learn"
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
 
 def main():
+    with get_rerun_profiler().rerun() as trace:
+        run_app(trace)
+
+def run_app(trace):
+    """One script run; trace.lap() closes each timed phase"""
     app = GurmukhiLearningApp()
     
-    # Custom CSS for Gurmukhi fonts and styling
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+Gurmukhi:wght@400;700&display=swap');
-    
-    .gurmukhi-text {
-        font-family: 'Noto Sans Gurmukhi', sans-serif;
-        font-size: 3rem;
-        font-weight: bold;
-        text-align: center;
-        color: #FF6B35;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .letter-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 20px;
-        text-align: center;
-        margin: 1rem;
-        box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-        transition: transform 0.3s ease;
-    }
-    
-    .letter-card:hover {
-        transform: translateY(-10px);
-    }
-    
-    .app-header {
-        background: linear-gradient(135deg, #FF6B35, #F7931E);
-        padding: 2rem;
-        border-radius: 15px;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    
-    .progress-bar {
-        background: #e0e0e0;
-        border-radius: 10px;
-        height: 20px;
-        overflow: hidden;
-    }
-    
-    .progress-fill {
-        background: linear-gradient(90deg, #4CAF50, #45a049);
-        height: 100%;
-        transition: width 0.5s ease;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Custom CSS for Gurmukhi fonts and styling (web_assets.py builds the bundle)
+    st.markdown(style_tag(), unsafe_allow_html=True)
     
     # App Header
     st.markdown("""
@@ -178,9 +124,11 @@ def main():
         <p style="color: white; margin: 10px 0;">Learn the 35 Gurmukhi letters through fun games and stories!</p>
     </div>
     """, unsafe_allow_html=True)
+    trace.lap("setup")
     
     # User name input
     if not st.session_state.user_name:
+        trace.mode = "welcome"
         st.markdown("### 👋 Welcome! What's your name?")
         name = st.text_input("Enter your name:", placeholder="Your name here...")
         if st.button("Start Learning! 🚀") and name:
@@ -219,26 +167,116 @@ def main():
             st.session_state.game_mode = "ai_helper"
         else:
             st.session_state.game_mode = "quiz"
+        
+        display_parent_dashboard()
+        if os.environ.get("GURMUKHI_ADMIN") == "1":
+            display_profiler_panel()
+    trace.mode = st.session_state.game_mode
+    # Per-round keys of the mode the learner just left are dropped
+    session_state = SessionStateManager(st.session_state)
+    session_state.enter(st.session_state.game_mode)
+    trace.lap("sidebar")
     
     # Main content based on selected mode
-    if st.session_state.game_mode == "learn":
-        display_learn_mode()
-    elif st.session_state.game_mode == "practice":
-        display_practice_mode()
-    elif st.session_state.game_mode == "stories":
-        display_stories_mode()
-    elif st.session_state.game_mode == "camera":
-        display_camera_mode()
-    elif st.session_state.game_mode == "ai_helper":
-        display_ai_helper_mode()
-    else:
-        display_quiz_mode()
+    try:
+        if st.session_state.game_mode == "learn":
+            display_learn_mode()
+        elif st.session_state.game_mode == "practice":
+            display_practice_mode()
+        elif st.session_state.game_mode == "stories":
+            display_stories_mode()
+        elif st.session_state.game_mode == "camera":
+            display_camera_mode()
+        elif st.session_state.game_mode == "ai_helper":
+            display_ai_helper_mode()
+        else:
+            display_quiz_mode()
+        trace.lap("body")
+    finally:
+        # Write back this run's reviews and learning events in batches, also
+        # when the body ends in st.rerun()
+        get_scheduler().maybe_flush()
+        get_event_recorder().maybe_flush()
+    
+    # Keep this session's memory under its budget
+    session_state.enforce_budget(st.session_state.game_mode)
+
+def display_parent_dashboard():
+    """Streak, practice time and weakest letters, read from the learning rollups"""
+    with st.expander("👪 Parent Dashboard"):
+        dashboard = get_learning_dashboard()
+        summary = dashboard.summary(st.session_state.user_name)
+        col1, col2 = st.columns(2)
+        col1.metric("🔥 Streak", f"{summary['current']} days", help=f"Longest: {summary['longest']} days")
+        col2.metric("⏱️ This week", f"{summary['week_minutes']:.0f} min")
+        if summary['accuracy'] is not None:
+            st.caption(f"{summary['answers']} answers, {summary['accuracy']:.0%} correct, "
+                       f"{summary['quizzes']} quizzes finished")
+        weakest = [row for row in dashboard.letter_accuracy(st.session_state.user_name)
+                   if row['accuracy'] is not None][:5]
+        if weakest:
+            st.markdown("**Letters to practice**")
+            for row in weakest:
+                st.caption(f"{row['letter']} {GURMUKHI_AKHARI[row['letter']]['roman']}: "
+                           f"{row['accuracy']:.0%} of {row['answers']}")
+        elif summary['accuracy'] is None:
+            st.caption("No answers yet.")
+        # Persisted review queue, read through the (user_id, due_at) index
+        due = due_letters(get_scheduler().db_path, st.session_state.user_name, 5)
+        if due:
+            st.caption("Due for review: " + " ".join(due))
+
+def record_event(kind, letter=None, correct=None):
+    """Append a learning event for the current learner (written in batches)"""
+    get_event_recorder().record(st.session_state.user_name, kind, letter, correct,
+                                mode=st.session_state.game_mode)
+
+def display_profiler_panel():
+    """Admin view of rerun latency per mode and the slowest recent reruns"""
+    profiler = get_rerun_profiler()
+    with st.expander("⏱️ Rerun Latency"):
+        rows = profiler.summary()
+        if not rows:
+            st.caption("No reruns recorded yet.")
+            return
+        st.dataframe(
+            [{"mode": r["mode"], "phase": r["phase"], "runs": r["count"],
+              "p50 ms": r["p50_ms"], "p95 ms": r["p95_ms"]} for r in rows],
+            hide_index=True, use_container_width=True,
+        )
+        st.markdown("**Slowest recent reruns**")
+        for run in profiler.slowest(5):
+            phases = ", ".join(f"{p} {ms:.0f}" for p, ms in run["phases"].items())
+            st.caption(f"{run['mode']}: {run['total_ms']:.0f} ms ({phases})")
+        if st.button("💾 Write snapshot", key="profiler_snapshot"):
+            profiler.maybe_write_snapshot(force=True)
+    
+    with st.expander("🧠 Session Memory"):
+        sizes = SessionStateManager(st.session_state).sizes()
+        for namespace, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            st.caption(f"{namespace}: {size / 1024:.1f} KB")
+
+def record_job_latency(job, phase):
+    """Background job run time, recorded under the current mode"""
+    if job.started_at and job.finished_at:
+        get_rerun_profiler().observe(st.session_state.game_mode, phase,
+                                     (job.finished_at - job.started_at) * 1000)
+
+def get_scheduler():
+    """Spaced-repetition scheduler for the current learner"""
+    scheduler = st.session_state.get('scheduler')
+    if scheduler is None or scheduler.user_id != st.session_state.user_name:
+        if scheduler is not None:
+            scheduler.flush()
+        scheduler = SpacedRepetitionScheduler(st.session_state.user_name)
+        st.session_state.scheduler = scheduler
+    return scheduler
 
 def display_learn_mode():
     """Display letter learning interface"""
     st.markdown("## 📖 Learn Gurmukhi Letters")
     
-    letters = list(GURMUKHI_AKHARI.keys())
+    letters = LETTER_MODEL.letters
     
     # Letter navigation
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -260,6 +298,12 @@ def display_learn_mode():
     current_letter = letters[st.session_state.current_letter]
     letter_info = GURMUKHI_AKHARI[current_letter]
     
+    # One view per letter shown, not per rerun
+    viewed_key = scoped("learn", "viewed_letter")
+    if st.session_state.get(viewed_key) != current_letter:
+        st.session_state[viewed_key] = current_letter
+        record_event(LETTER_VIEW, current_letter)
+    
     # Letter card
     st.markdown(f"""
     <div class="letter-card">
@@ -272,18 +316,15 @@ def display_learn_mode():
     """, unsafe_allow_html=True)
     
     # Audio pronunciation with recording capability
-    import os
-    audio_file_path = f"audio/{current_letter}.wav"
-    
-    # Check if custom audio exists
-    has_custom_audio = os.path.exists(audio_file_path)
+    custom_audio = get_letter_audio(current_letter)
     
-    if has_custom_audio:
-        # Play custom recorded audio
+    if custom_audio is not None:
+        # Play custom recorded audio (served from memory after the first load)
         st.markdown("### 🎵 **Custom Pronunciation Available**")
-        with open(audio_file_path, "rb") as audio_file:
-            audio_bytes = audio_file.read()
-            st.audio(audio_bytes, format='audio/wav')
+        # Prefer the shared sprite; fall back to the single clip until it is rebuilt
+        if not display_sprite_player(current_letter):
+            audio_bytes, audio_mime = custom_audio
+            st.audio(audio_bytes, format=audio_mime)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -291,7 +332,8 @@ def display_learn_mode():
                 st.success(f"🎵 Playing custom pronunciation for {letter_info['roman']}")
         with col2:
             if st.button("🗑️ Delete Custom Audio", use_container_width=True):
-                os.remove(audio_file_path)
+                delete_letter_audio(current_letter)
+                rebuild_sprite_async()
                 st.success("Custom audio deleted!")
                 st.rerun()
     else:
@@ -302,18 +344,21 @@ def display_learn_mode():
             # Upload audio file
             uploaded_file = st.file_uploader(
                 "📁 Upload Audio", 
-                type=['wav', 'mp3', 'ogg'], 
-                key=f"upload_{current_letter}",
+                type=['wav', 'mp3', 'ogg', 'webm', 'm4a'], 
+                key=scoped("learn", f"upload_{current_letter}"),
                 help="Upload your recorded pronunciation"
             )
             
             if uploaded_file is not None:
-                # Save uploaded file
-                os.makedirs("audio", exist_ok=True)
-                with open(audio_file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                st.success("✅ Audio saved!")
-                st.rerun()
+                # Trim, normalize and re-encode before saving
+                try:
+                    save_letter_audio(current_letter, uploaded_file.getvalue(), uploaded_file.name)
+                    rebuild_sprite_async()
+                    record_event(UPLOAD, current_letter)
+                    st.success("✅ Audio saved!")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Could not process audio: {str(e)}")
         
         with col2:
             # Record using device microphone
@@ -348,7 +393,7 @@ def display_learn_mode():
                         }};
                         
                         mediaRecorder.onstop = () => {{
-                            const audioBlob = new Blob(audioChunks, {{ type: 'audio/wav' }});
+                            const audioBlob = new Blob(audioChunks, {{ type: mediaRecorder.mimeType || 'audio/webm' }});
                             const audioUrl = URL.createObjectURL(audioBlob);
                             const audioPlayback = document.getElementById('audioPlayback');
                             audioPlayback.src = audioUrl;
@@ -357,7 +402,7 @@ def display_learn_mode():
                             // Create download link
                             const downloadSection = document.getElementById('downloadSection');
                             downloadSection.innerHTML = `
-                                <a href="${{audioUrl}}" download="{current_letter}_pronunciation.wav" 
+                                <a href="${{audioUrl}}" download="{current_letter}_pronunciation.webm" 
                                    style="background: #28a745; color: white; text-decoration: none; padding: 8px 16px; border-radius: 4px; display: inline-block; margin: 5px;">
                                     💾 Download Recording
                                 </a>
@@ -418,6 +463,48 @@ def display_learn_mode():
             st.balloons()
             st.success("Great job! Letter learned! 🎉")
 
+def display_sprite_player(letter, label="🔊 Hear it"):
+    """Play a letter's clip from the cached audio sprite; returns False if it has none"""
+    clip = get_sprite_clip(letter)
+    if clip is None:
+        return False
+    
+    # The audio element lives on the parent page so the sprite is fetched once per visit
+    st.components.v1.html(f"""
+    <div style="text-align: center;">
+        <button onclick="playClip()"
+                style="background: #667eea; color: white; border: none; padding: 10px 20px; border-radius: 5px; font-size: 1rem;">
+            {label}
+        </button>
+    </div>
+    <script>
+        function getSprite() {{
+            let host = window;
+            try {{ host = window.parent; host.document; }} catch (err) {{ host = window; }}
+            host.__gurmukhiSprites = host.__gurmukhiSprites || {{}};
+            let audio = host.__gurmukhiSprites['{clip['url']}'];
+            if (!audio) {{
+                audio = host.document.createElement('audio');
+                audio.preload = 'auto';
+                audio.src = new URL('{clip['url']}', host.location.href).href;
+                host.__gurmukhiSprites['{clip['url']}'] = audio;
+            }}
+            return audio;
+        }}
+        
+        function playClip() {{
+            const audio = getSprite();
+            clearTimeout(audio.__stopTimer);
+            audio.currentTime = {clip['start']:.3f};
+            audio.play();
+            audio.__stopTimer = setTimeout(() => audio.pause(), {clip['duration'] * 1000:.0f});
+        }}
+        
+        getSprite();
+    </script>
+    """, height=60)
+    return True
+
 def display_practice_mode():
     """Display practice games"""
     st.markdown("## 🎯 Practice Games")
@@ -438,7 +525,7 @@ def display_recognition_game():
     st.markdown("Look at the letter and choose the correct name!")
     
     if 'game_letter' not in st.session_state:
-        st.session_state.game_letter = random.choice(list(GURMUKHI_AKHARI.keys()))
+        start_recognition_round()
     
     letter = st.session_state.game_letter
     letter_info = GURMUKHI_AKHARI[letter]
@@ -449,15 +536,13 @@ def display_recognition_game():
         <div class="gurmukhi-text">{letter}</div>
     </div>
     """, unsafe_allow_html=True)
+    display_sprite_player(letter)
     
-    # Multiple choice options
+    # Multiple choice options (drawn once per round)
     correct_answer = letter_info['roman']
-    all_romans = [info['roman'] for info in GURMUKHI_AKHARI.values()]
-    options = random.sample([r for r in all_romans if r != correct_answer], 3)
-    options.append(correct_answer)
-    random.shuffle(options)
+    options = st.session_state.game_options
     
-    selected = st.radio("What is this letter called?", options)
+    selected = st.radio("What is this letter called?", options, key=scoped("practice", f"recognition_{letter}"))
     
     if st.button("Check Answer"):
         if selected == correct_answer:
@@ -466,19 +551,40 @@ def display_recognition_game():
             st.balloons()
         else:
             st.error(f"❌ Not quite! This is {correct_answer}")
+            record_confusion(letter, selected)
+        get_scheduler().record(letter, selected == correct_answer)
+        record_event(ANSWER, letter, selected == correct_answer)
         
         # New letter for next round
-        st.session_state.game_letter = random.choice(list(GURMUKHI_AKHARI.keys()))
+        start_recognition_round()
         if st.button("Next Letter"):
             st.rerun()
 
+def record_confusion(letter, wrong_answer):
+    """Remember a wrong answer so future distractors focus on it"""
+    confusions = st.session_state.setdefault('letter_confusions', {})
+    letter_confusions = confusions.setdefault(letter, {})
+    letter_confusions[wrong_answer] = letter_confusions.get(wrong_answer, 0) + 1
+
+def start_recognition_round():
+    """Pick the next recognition letter and its answer options"""
+    letter = get_scheduler().next_letter(exclude=[st.session_state.get('game_letter')])
+    st.session_state.game_letter = letter
+    st.session_state.game_options = LETTER_MODEL.options(
+        letter, learner_confusions=st.session_state.get('letter_confusions', {}).get(letter)
+    )
+
 def display_sound_matching_game():
     """Sound matching game"""
     st.markdown("### 🔤 Sound Matching Game")
     st.info("Match the letter with its sound!")
     
-    # Simple matching interface
-    letters = random.sample(list(GURMUKHI_AKHARI.keys()), 4)
+    # Letters due for review, kept until the child asks for new ones
+    if 'sound_letters' not in st.session_state or st.button("🔄 New Letters"):
+        st.session_state.sound_letters = get_scheduler().next_letters(4)
+        st.session_state.sound_checked = set()
+    letters = st.session_state.sound_letters
+    sound_options = list(dict.fromkeys(GURMUKHI_AKHARI[l]['sound'] for l in letters))
     
     for i, letter in enumerate(letters):
         col1, col2 = st.columns(2)
@@ -490,90 +596,102 @@ def display_sound_matching_game():
             """, unsafe_allow_html=True)
         
         with col2:
-            sound_options = [GURMUKHI_AKHARI[l]['sound'] for l in letters]
-            selected_sound = st.selectbox(f"Sound for {letter}:", sound_options, key=f"sound_{i}")
+            selected_sound = st.selectbox(f"Sound for {letter}:", sound_options, key=scoped("practice", f"sound_{i}"))
             
-            if st.button(f"Check {letter}", key=f"check_{i}"):
-                if selected_sound == GURMUKHI_AKHARI[letter]['sound']:
+            if st.button(f"Check {letter}", key=scoped("practice", f"check_{i}")):
+                correct = selected_sound == GURMUKHI_AKHARI[letter]['sound']
+                if correct:
                     st.success("✅ Correct!")
                 else:
                     st.error(f"❌ Wrong! Correct sound is '{GURMUKHI_AKHARI[letter]['sound']}'")
+                # Only the first attempt per letter counts toward scheduling
+                if letter not in st.session_state.sound_checked:
+                    st.session_state.sound_checked.add(letter)
+                    get_scheduler().record(letter, correct)
+                    record_event(ANSWER, letter, correct)
 
 def display_puzzle_game():
     """Letter puzzle game"""
     st.markdown("### 🧩 Letter Puzzle")
     st.info("Complete the word by choosing the missing letter!")
     
-    # Simple word completion game
-    sample_words = [
-        {"word": "ਸੇਬ", "missing_pos": 0, "meaning": "Apple"},
-        {"word": "ਗਾਂ", "missing_pos": 0, "meaning": "Cow"},
-        {"word": "ਚੰਦ", "missing_pos": 0, "meaning": "Moon"}
-    ]
+    difficulty = st.select_slider("Difficulty:", options=[1, 2, 3], value=1,
+                                  format_func=lambda d: {1: "⭐ Short words", 2: "⭐⭐ Three letters", 3: "⭐⭐⭐ Long words"}[d])
     
-    if 'puzzle_word' not in st.session_state:
-        st.session_state.puzzle_word = random.choice(sample_words)
-    
-    word_data = st.session_state.puzzle_word
-    word = word_data['word']
-    missing_pos = word_data['missing_pos']
-    
-    # Display word with missing letter
-    display_word = list(word)
-    missing_letter = display_word[missing_pos]
-    display_word[missing_pos] = "___"
+    # Puzzles come from the word index, preferring words made of learned letters
+    puzzle = st.session_state.get('puzzle')
+    if puzzle is None or puzzle['difficulty'] != difficulty:
+        puzzle = get_word_index().generate(st.session_state.learned_letters, difficulty)
+        st.session_state.puzzle = puzzle
+    if puzzle is None:
+        st.warning("No puzzles available at this level yet.")
+        return
     
-    st.markdown(f"### Complete this word: {''.join(display_word)}")
-    st.markdown(f"**Meaning:** {word_data['meaning']}")
+    missing_letter = puzzle['missing']
     
-    # Letter options
-    options = random.sample(list(GURMUKHI_AKHARI.keys()), 4)
-    if missing_letter not in options:
-        options[0] = missing_letter
-    random.shuffle(options)
+    st.markdown(f"""
+    <div style="text-align: center; padding: 1rem;">
+        <div class="gurmukhi-text">{puzzle['display']}</div>
+    </div>
+    """, unsafe_allow_html=True)
+    if puzzle['meaning']:
+        st.markdown(f"**Meaning:** {puzzle['meaning']}")
     
-    selected = st.radio("Choose the missing letter:", options)
+    selected = st.radio("Choose the missing letter:", puzzle['options'],
+                        key=scoped("practice", f"puzzle_{puzzle['word']}_{puzzle['position']}"))
     
     if st.button("Complete Word"):
         if selected == missing_letter:
-            st.success(f"🎉 Correct! The word is {word}")
+            st.success(f"🎉 Correct! The word is {puzzle['word']}")
             st.session_state.score += 10
         else:
             st.error(f"❌ Wrong! The correct letter is {missing_letter}")
+        record_event(ANSWER, missing_letter, selected == missing_letter)
         
-        st.session_state.puzzle_word = random.choice(sample_words)
+        st.session_state.puzzle = get_word_index().generate(st.session_state.learned_letters, difficulty)
 
 def display_stories_mode():
     """Display Punjabi stories with bilingual support"""
     st.markdown("## 📚 Punjabi Stories")
     
-    # Sample stories (in real app, these would come from RAG system)
-    sample_stories = [
-        {
-            "title_punjabi": "ਚੰਗਾ ਬੱਚਾ",
-            "title_english": "The Good Child",
-            "content_punjabi": "ਇੱਕ ਵਾਰ ਇੱਕ ਚੰਗਾ ਬੱਚਾ ਸੀ। ਉਹ ਰੋਜ਼ ਸਕੂਲ ਜਾਂਦਾ ਸੀ।",
-            "content_english": "Once there was a good child. He went to school every day.",
-            "difficulty": 1
-        },
-        {
-            "title_punjabi": "ਸੁੰਦਰ ਬਾਗ਼",
-            "title_english": "Beautiful Garden",
-            "content_punjabi": "ਬਾਗ਼ ਵਿੱਚ ਬਹੁਤ ਸਾਰੇ ਫੁੱਲ ਸਨ। ਤਿਤਲੀਆਂ ਉੱਡ ਰਹੀਆਂ ਸਨ।",
-            "content_english": "There were many flowers in the garden. Butterflies were flying.",
-            "difficulty": 2
-        }
-    ]
+    library = get_story_library()
     
-    # Story selection
-    story = st.selectbox("Choose a story:", 
-                        [f"{s['title_english']} - {s['title_punjabi']}" for s in sample_stories])
+    # Filters
+    col1, col2 = st.columns(2)
+    with col1:
+        level = st.selectbox("Difficulty:", ["All levels", "1 - Beginner", "2 - Intermediate", "3 - Advanced"],
+                             key="story_difficulty")
+    with col2:
+        readable_only = st.checkbox("Only stories I can read", value=False, key="story_readable_only",
+                                    help="Stories that only use letters you have learned")
+    difficulty = None if level == "All levels" else int(level[0])
+    readable_with = st.session_state.learned_letters if readable_only else None
+    if readable_only and not readable_with:
+        st.info("✏️ Mark letters as learned in 📖 Learn Letters, and the stories you can read will show up here!")
+        return
+    
+    # Only one page of story titles is queried; pages are cached across sessions
+    total = library.count_stories(difficulty, readable_with)
+    if total == 0:
+        st.info("📖 No stories match these filters yet. Learn more letters or try another level!")
+        return
+    
+    page_count = (total + STORIES_PAGE_SIZE - 1) // STORIES_PAGE_SIZE
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                           key="story_page") if page_count > 1 else 1
+    stories, _ = library.list_stories(difficulty, readable_with, page=page)
     
-    story_index = [f"{s['title_english']} - {s['title_punjabi']}" for s in sample_stories].index(story)
-    selected_story = sample_stories[story_index]
+    # Story selection
+    titles = {s['id']: f"{s['title_english']} - {s['title_punjabi']}" for s in stories}
+    story_id = st.selectbox("Choose a story:", list(titles), format_func=titles.get, key="story_id")
+    selected_story = library.get_story(story_id)
+    if selected_story is None:
+        st.warning("This story is no longer available.")
+        return
     
     # Language toggle
     show_punjabi = st.checkbox("Show Punjabi text", value=True)
+    show_roman = st.checkbox("Show pronunciation (Roman letters)", value=False)
     show_english = st.checkbox("Show English translation", value=True)
     
     # Story display
@@ -589,6 +707,18 @@ def display_stories_mode():
         </div>
         """, unsafe_allow_html=True)
     
+    if show_roman:
+        title_roman = selected_story['title_roman'] or transliterate(selected_story['title_punjabi'])
+        content_roman = selected_story['content_roman'] or transliterate(selected_story['content_punjabi'])
+        st.markdown(f"""
+        <div style="background: #ede7f6; padding: 2rem; border-radius: 15px; margin: 1rem 0;">
+            <h2 style="color: #4527a0;">{title_roman}</h2>
+            <p style="font-size: 1.2rem; line-height: 1.8; color: #333333; font-style: italic;">
+                {content_roman}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    
     if show_english:
         st.markdown(f"""
         <div style="background: #e8f5e8; padding: 2rem; border-radius: 15px; margin: 1rem 0;">
@@ -599,20 +729,39 @@ def display_stories_mode():
         </div>
         """, unsafe_allow_html=True)
     
-    # Story comprehension questions
-    st.markdown("### 🤔 Story Questions")
-    st.info("Answer these questions about the story!")
+    if selected_story['source']:
+        source = selected_story['source']
+        if selected_story['source_url'] and selected_story['source_url'].startswith("http"):
+            source = f"[{source}]({selected_story['source_url']})"
+        st.caption(f"📰 Adapted from {source}")
     
-    # Simple comprehension questions (would be generated by LLM in real app)
-    if story_index == 0:
-        question = st.radio("What did the good child do every day?", 
-                           ["Played games", "Went to school", "Watched TV"])
+    # Story comprehension questions
+    question = selected_story['question']
+    if question:
+        st.markdown("### 🤔 Story Questions")
+        st.info("Answer these questions about the story!")
+        
+        choice = st.radio(question['question'], question['options'], key=scoped("stories", f"question_{story_id}"))
         if st.button("Check Answer"):
-            if question == "Went to school":
+            if choice == question['answer']:
                 st.success("🎉 Correct!")
             else:
                 st.error("❌ Try again!")
 
+def get_adaptive_quiz():
+    """Adaptive quiz generator backed by the progress database"""
+    if 'adaptive_quiz' not in st.session_state:
+        st.session_state.adaptive_quiz = AdaptiveQuiz()
+    return st.session_state.adaptive_quiz
+
+def prepare_next_quiz():
+    """Prebuild the next quiz so starting it is instant"""
+    st.session_state.next_quiz = get_adaptive_quiz().generate(
+        st.session_state.user_name,
+        QUIZ_LENGTH,
+        due_letters=get_scheduler().next_letters(QUIZ_LENGTH)
+    )
+
 def display_quiz_mode():
     """Display quiz challenge"""
     st.markdown("## 🏆 Quiz Challenge")
@@ -627,9 +776,16 @@ def display_quiz_mode():
         st.markdown("### Ready for the challenge?")
         st.markdown("Answer 10 questions about Gurmukhi letters!")
         
+        if st.session_state.get('next_quiz') is None:
+            prepare_next_quiz()
+        
         if st.button("🚀 Start Quiz", use_container_width=True):
+            quiz = st.session_state.next_quiz
+            st.session_state.next_quiz = None
             st.session_state.quiz_started = True
-            st.session_state.quiz_questions = random.sample(list(GURMUKHI_AKHARI.keys()), 10)
+            st.session_state.quiz_id = quiz['quiz_id']
+            st.session_state.quiz_questions = quiz['letters']
+            st.session_state.quiz_options = quiz['options']
             st.rerun()
     else:
         # Quiz interface
@@ -646,39 +802,50 @@ def display_quiz_mode():
                 <div class="gurmukhi-text">{letter}</div>
             </div>
             """, unsafe_allow_html=True)
+            display_sprite_player(letter)
             
-            # Multiple choice
+            # Multiple choice (prebuilt when the quiz started)
             correct = letter_info['roman']
-            all_options = [info['roman'] for info in GURMUKHI_AKHARI.values()]
-            options = random.sample([o for o in all_options if o != correct], 3)
-            options.append(correct)
-            random.shuffle(options)
+            options = st.session_state.quiz_options[current_q]
             
             # Initialize quiz answer key for this question
-            quiz_answer_key = f"quiz_answer_{current_q}"
+            quiz_answer_key = scoped("quiz", f"answer_{current_q}")
             if quiz_answer_key not in st.session_state:
                 st.session_state[quiz_answer_key] = None
             
-            answer = st.radio("What is this letter called?", options, key=f"quiz_radio_{current_q}")
+            answer = st.radio("What is this letter called?", options, key=scoped("quiz", f"radio_{current_q}"))
             
-            if st.button("Submit Answer", key=f"submit_{current_q}"):
+            if st.button("Submit Answer", key=scoped("quiz", f"submit_{current_q}")):
+                get_scheduler().record(letter, answer == correct)
+                get_adaptive_quiz().record_answer(
+                    st.session_state.user_name, letter, answer, answer == correct,
+                    quiz_id=st.session_state.quiz_id
+                )
+                record_event(ANSWER, letter, answer == correct)
                 if answer == correct:
                     st.success("✅ Correct!")
                     st.session_state.quiz_score += 1
                 else:
                     st.error(f"❌ Wrong! Correct answer: {correct}")
+                    record_confusion(letter, answer)
                 
                 st.session_state.quiz_question += 1
                 
                 if st.session_state.quiz_question < 10:
                     st.info("Click below to continue to the next question!")
-                    if st.button("Next Question ➡️", key=f"next_{current_q}"):
+                    if st.button("Next Question ➡️", key=scoped("quiz", f"next_{current_q}")):
                         st.rerun()
                 else:
+                    get_scheduler().flush()
+                    record_event(QUIZ_COMPLETE)
+                    # Finished: the per-question answers are no longer needed
+                    SessionStateManager(st.session_state).clear("quiz")
                     st.rerun()
         else:
-            # Quiz completed
+            # Quiz completed; build the next one while the results are shown
             score = st.session_state.quiz_score
+            if st.session_state.get('next_quiz') is None:
+                prepare_next_quiz()
             st.markdown(f"""
             <div style="text-align: center; padding: 3rem; background: linear-gradient(135deg, #4CAF50, #45a049); border-radius: 20px;">
                 <h1 style="color: white; font-size: 3rem;">🎉 Quiz Complete!</h1>
@@ -700,15 +867,14 @@ def display_camera_mode():
     st.markdown("## 📷 Camera Practice")
     st.markdown("Take pictures of Gurmukhi letters, handwriting, or anything related to your learning!")
     
-    # Create images directory if it doesn't exist
-    images_dir = "captured_images"
-    os.makedirs(images_dir, exist_ok=True)
+    # Content-addressed photo store with a SQLite index
+    photo_store = get_photo_store()
     
     # Camera input section
     st.markdown("### 📸 Take a Picture")
     
     # Camera input widget
-    camera_photo = st.camera_input("Take a photo with your camera")
+    camera_photo = st.camera_input("Take a photo with your camera", key=scoped("camera", "photo"))
     
     if camera_photo is not None:
         # Display the captured image
@@ -729,6 +895,13 @@ def display_camera_mode():
             st.write(f"🎨 Mode: {image.mode}")
             st.write(f"📊 Format: {image.format if hasattr(image, 'format') else 'Unknown'}")
         
+        # Grade a single handwritten letter or a whole practice sheet
+        if gurmukhi_font_available():
+            display_letter_check(image)
+            display_sheet_grading(image)
+        else:
+            st.info("✍️ Letter checking needs a Gurmukhi font. Add one to fonts/ or set GURMUKHI_FONT_PATH.")
+        
         # Image processing options
         st.markdown("### ⚙️ Image Options")
         
@@ -737,22 +910,20 @@ def display_camera_mode():
         with col1:
             # Save image option
             if st.button("💾 Save Image", use_container_width=True):
-                # Generate filename with timestamp
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"gurmukhi_photo_{timestamp}.jpg"
-                filepath = os.path.join(images_dir, filename)
-                
-                # Save the image
-                image.save(filepath, "JPEG")
-                st.success(f"✅ Image saved as {filename}")
+                photo, is_new = photo_store.save_image(image, owner=st.session_state.user_name)
+                if is_new:
+                    record_event(UPLOAD)
+                    st.success("✅ Image saved to your gallery")
+                else:
+                    st.info("📁 This photo is already in your gallery")
                 
                 # Update session state with saved images
                 if 'saved_images' not in st.session_state:
                     st.session_state.saved_images = []
                 st.session_state.saved_images.append({
-                    'filename': filename,
-                    'filepath': filepath,
-                    'timestamp': timestamp
+                    'photo_id': photo['id'],
+                    'filepath': photo['path'],
+                    'timestamp': photo['created_at']
                 })
         
         with col2:
@@ -771,31 +942,7 @@ def display_camera_mode():
     st.markdown("---")
     st.markdown("### 🖼️ Your Photo Gallery")
     
-    # Check for existing saved images
-    if os.path.exists(images_dir):
-        image_files = [f for f in os.listdir(images_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-        
-        if image_files:
-            st.markdown(f"📁 Found {len(image_files)} saved images")
-            
-            # Display images in a grid
-            cols = st.columns(3)
-            for i, img_file in enumerate(image_files):
-                with cols[i % 3]:
-                    img_path = os.path.join(images_dir, img_file)
-                    try:
-                        img = Image.open(img_path)
-                        st.image(img, caption=img_file, use_column_width=True)
-                        
-                        # Delete button for each image
-                        if st.button(f"🗑️ Delete", key=f"delete_{img_file}"):
-                            os.remove(img_path)
-                            st.success(f"Deleted {img_file}")
-                            st.rerun()
-                    except Exception as e:
-                        st.error(f"Error loading {img_file}: {str(e)}")
-        else:
-            st.info("📷 No images saved yet. Take your first photo above!")
+    display_photo_gallery(photo_store)
     
     # Additional camera features
     st.markdown("---")
@@ -837,102 +984,131 @@ def display_camera_mode():
         - Create a visual learning journal
         """)
 
-def extract_text_from_image(image):
-    """Extract text from image using OCR"""
-    try:
-        # Convert PIL image to numpy array for OpenCV
-        img_array = np.array(image)
+def display_letter_check(image):
+    """Check a photographed handwritten letter against the letter the child meant to write"""
+    st.markdown("### ✍️ Check My Letter")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        target = st.selectbox("Which letter did you write?", LETTER_MODEL.letters,
+                              format_func=lambda l: f"{l} ({GURMUKHI_AKHARI[l]['roman']})",
+                              key="handwriting_target")
+    with col2:
+        check = st.button("✅ Check", use_container_width=True, key="handwriting_check")
+    
+    if check:
+        try:
+            with timed("handwriting"):
+                predicted, confidence = get_recognizer().classify_one(image)
+        except Exception as e:
+            st.error(f"Could not check the letter: {str(e)}")
+            return
         
-        # Convert RGB to BGR for OpenCV
-        if len(img_array.shape) == 3:
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+        if predicted == target:
+            st.success(f"🎉 Great writing! That looks like {target} ({GURMUKHI_AKHARI[target]['roman']})")
+            st.session_state.score += 5
+        else:
+            st.warning(f"🤔 That looks more like {predicted} ({GURMUKHI_AKHARI[predicted]['roman']}). "
+                       f"Try writing {target} again!")
+        st.caption(f"Confidence: {confidence:.0%}")
+
+def display_sheet_grading(image):
+    """Segment a photographed practice sheet and grade every letter on it"""
+    with st.expander("📄 Grade a Whole Practice Sheet"):
+        same_letter = st.checkbox("Every letter on the sheet is the letter chosen above", value=True,
+                                  key="sheet_same_letter")
+        if not st.button("📄 Grade Sheet", use_container_width=True, key="grade_sheet"):
+            return
         
-        # Preprocess image for better OCR
-        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+        expected = st.session_state.get('handwriting_target') if same_letter else None
+        try:
+            with timed("sheet_grading"):
+                result = grade_sheet(image, get_recognizer(), expected=expected)
+        except Exception as e:
+            st.error(f"Could not grade the sheet: {str(e)}")
+            return
         
-        # Apply threshold to get better text recognition
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        glyphs = result['glyphs']
+        if not glyphs:
+            if result['timed_out']:
+                st.warning("⏱️ The sheet took too long to read. Try a closer photo of fewer letters.")
+            else:
+                st.warning("⚠️ No letters found. Try a brighter photo on plain paper.")
+            return
         
-        # Use pytesseract to extract text
-        extracted_text = pytesseract.image_to_string(thresh, config='--psm 6')
+        st.write(f"🔍 Found {len(glyphs)} letters in {result['rows']} rows ({result['elapsed'] * 1000:.0f} ms)")
+        if result['timed_out']:
+            st.warning(f"⏱️ The sheet took too long to grade; showing the first "
+                       f"{result['classified']} letters.")
+        if result['correct'] is not None:
+            st.success(f"✅ {result['correct']}/{result['graded']} letters look right!")
         
-        return extracted_text.strip()
-    except Exception as e:
-        return f"Error extracting text: {str(e)}"
+        # One line of recognised letters per row, wrong ones marked
+        for row in range(result['rows']):
+            cells = [
+                f"{g.get('letter', '?')}{'' if g.get('correct', True) else '❌'}"
+                for g in glyphs if g['row'] == row
+            ]
+            if cells:
+                st.markdown(f"<div class='gurmukhi-text' style='font-size: 1.5rem; text-align: left;'>"
+                            f"{' '.join(cells)}</div>", unsafe_allow_html=True)
+
+def display_photo_gallery(photo_store):
+    """Show saved photos one page of thumbnails at a time"""
+    only_mine = st.checkbox("Show only my photos", value=False, key="gallery_only_mine")
+    owner = st.session_state.user_name if only_mine else None
+    
+    total = photo_store.count_photos(owner)
+    if total == 0:
+        st.info("📷 No images saved yet. Take your first photo above!")
+        return
+    
+    st.markdown(f"📁 Found {total} saved images")
+    
+    # Only the current page is queried, decoded and sent to the browser
+    page_count = (total + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                           key="gallery_page") if page_count > 1 else 1
+    photos = photo_store.list_photos(owner, limit=GALLERY_PAGE_SIZE, offset=(page - 1) * GALLERY_PAGE_SIZE)
+    
+    # Display thumbnails in a grid
+    cols = st.columns(3)
+    for i, photo in enumerate(photos):
+        caption = f"{photo['owner']} · {photo['created_at'][:16].replace('T', ' ')}"
+        with cols[i % 3]:
+            try:
+                st.image(get_thumbnail(photo['path']), caption=caption, use_column_width=True)
+                
+                view_col, delete_col = st.columns(2)
+                with view_col:
+                    if st.button("🔍 View", key=scoped("camera", f"view_{photo['id']}")):
+                        st.session_state.gallery_full_image = photo['id']
+                with delete_col:
+                    # Delete button for each image
+                    if st.button("🗑️ Delete", key=scoped("camera", f"delete_{photo['id']}")):
+                        photo_store.delete_photo(photo['id'])
+                        st.success("Photo deleted")
+                        st.rerun()
+            except Exception as e:
+                st.error(f"Error loading photo {photo['id']}: {str(e)}")
+    
+    # Full-size image only when asked for
+    full_id = st.session_state.get('gallery_full_image')
+    if full_id:
+        photo = photo_store.get_photo(full_id)
+        if photo and os.path.exists(photo['path']):
+            st.image(photo['path'], caption=photo.get('original_name') or "Full size", use_column_width=True)
+            if st.button("✖️ Close", key="close_full_image"):
+                st.session_state.gallery_full_image = None
+                st.rerun()
+        else:
+            st.session_state.gallery_full_image = None
 
-def get_ai_response(question, context="", is_followup=False):
+def get_ai_response(question, context="", is_followup=False, user_id="anonymous"):
     """Get AI response for homework questions"""
     try:
-        # Configure Gemini API (you'll need to set your API key)
-        # genai.configure(api_key="YOUR_GEMINI_API_KEY")
-        
-        # For now, we'll use a mock response since API key setup is needed
-        if is_followup:
-            prompt = f"""
-            You are a friendly AI tutor helping a student with their homework. 
-            The student has a follow-up question: {question}
-            
-            Previous context: {context}
-            
-            Please provide a clear, kid-friendly explanation with examples.
-            """
-        else:
-            prompt = f"""
-            You are a friendly AI tutor helping a student with their homework.
-            
-            Question from image: {question}
-            
-            Please:
-            1. Solve the problem step by step
-            2. Explain each step clearly for a student
-            3. Provide examples if helpful
-            4. Use simple language appropriate for kids
-            5. Include visual descriptions when helpful
-            
-            Format your response in a clear, structured way.
-            """
-        
-        # Mock response for demonstration (replace with actual API call)
-        if "rotation" in question.lower() or "coordinate" in question.lower():
-            return """
-            🎯 **Coordinate Geometry Solution**
-            
-            I can see this is about transformations! Let me solve this step by step:
-            
-            **Step 1: Translation**
-            - Move each point left 2 and up 1
-            - A(3,4) → A'(1,5)
-            - B(-1,-2) → B'(-3,-1)
-            
-            **Step 2: Rotation 90° clockwise about C(1,3)**
-            - Use formula: (x,y) → (h+(y-k), k-(x-h))
-            - A'(1,5) → A''(3,3)
-            - B'(-3,-1) → B''(-3,7)
-            
-            **Why this works:**
-            - Rotation swaps and flips coordinates
-            - Think of turning a clock hand 90° clockwise
-            
-            **Final Answer:** A''(3,3), B''(-3,7)
-            
-            💡 **Need help understanding any step? Just ask!**
-            """
-        else:
-            return f"""
-            📚 **AI Homework Helper**
-            
-            I can see your question: "{question}"
-            
-            Let me help you solve this step by step:
-            
-            1. **Understanding the problem:** [Analysis of what's being asked]
-            2. **Solution approach:** [Method to solve]
-            3. **Step-by-step solution:** [Detailed steps]
-            4. **Final answer:** [Clear result]
-            
-            💡 **Want me to explain any part differently? Just ask a follow-up question!**
-            """
-            
+        # Cached and coalesced; misses are rate-limited and queued fairly per user
+        return get_ai_client().ask(question, context, is_followup, user_id)
     except Exception as e:
         return f"Sorry, I encountered an error: {str(e)}. Please try again!"
 
@@ -943,29 +1119,36 @@ def display_ai_helper_mode():
     
     # Initialize session state for chat
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        st.session_state.chat_history = ChatStore()
     if 'current_question_context' not in st.session_state:
         st.session_state.current_question_context = ""
+    if 'homework_jobs' not in st.session_state:
+        st.session_state.homework_jobs = {}
+    if 'pending_followup' not in st.session_state:
+        st.session_state.pending_followup = None
     
     # Create tabs for different input methods
     tab1, tab2 = st.tabs(["📷 Camera Upload", "📁 File Upload"])
     
     with tab1:
         st.markdown("### 📸 Take a Photo of Your Question")
-        camera_photo = st.camera_input("Capture your homework question")
+        camera_photo = st.camera_input("Capture your homework question", key=scoped("ai_helper", "camera"))
         
         if camera_photo is not None:
             process_homework_image(camera_photo)
     
     with tab2:
         st.markdown("### 📁 Upload Question Image")
-        uploaded_file = st.file_uploader(
-            "Choose an image file", 
+        uploaded_files = st.file_uploader(
+            "Choose image files", 
             type=['png', 'jpg', 'jpeg', 'gif', 'bmp'],
-            help="Upload a clear photo of your homework question"
+            accept_multiple_files=True,
+            help="Upload clear photos of your homework questions",
+            key=scoped("ai_helper", "uploads")
         )
         
-        if uploaded_file is not None:
+        # Every image is queued at once so they are read in parallel
+        for uploaded_file in uploaded_files or []:
             process_homework_image(uploaded_file)
     
     # Chat interface for follow-up questions
@@ -994,50 +1177,98 @@ def display_ai_helper_mode():
         - "What if the numbers were different?"
         """)
 
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def display_job_progress(job_ids, message, preview=None):
+    """Poll background jobs and rerun the app once they have all finished
+
+    preview is an optional (question, context, is_followup) whose answer is
+    streamed in as tokens arrive.
+    """
+    queue = get_job_queue()
+    jobs = [queue.get(job_id) for job_id in job_ids]
+    if all(job is None or job.finished for job in jobs):
+        st.rerun()
+    waiting = get_ai_scheduler().stats()['queued']
+    st.info(f"{message} ({waiting} requests waiting for the AI tutor)" if waiting else message)
+    if preview is not None:
+        partial_answer = get_ai_client().partial(*preview)
+        if partial_answer:
+            st.markdown(partial_answer + " ▌")
+
+def add_chat_exchange(question, answer):
+    """Append a question/answer pair to the chat history"""
+    st.session_state.chat_history.add(question, answer)
+
 def process_homework_image(image_file):
-    """Process uploaded homework image and extract question"""
+    """Queue OCR for an uploaded homework image and show results when ready"""
     try:
-        # Display the uploaded image
-        image = Image.open(image_file)
+        image_bytes = image_file.getvalue()
+        digest = hashlib.sha1(image_bytes).hexdigest()
+        queue = get_job_queue()
+        user_id = st.session_state.session_id
+        
+        # Submit OCR only the first time this image is seen
+        entry = st.session_state.homework_jobs.get(digest)
+        if entry is None:
+            entry = {
+                'ocr_job': queue.submit(user_id, OCR, extract_text_from_bytes, image_bytes),
+                'ai_job': None,
+                'text': None,
+            }
+            st.session_state.homework_jobs[digest] = entry
+            record_event(UPLOAD)
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.image(image, caption="Your Question", use_column_width=True)
+            st.image(image_bytes, caption=getattr(image_file, 'name', "Your Question"), use_column_width=True)
         
         with col2:
-            st.markdown("**Processing...**")
+            if entry['text'] is None:
+                ocr_job = queue.get(entry['ocr_job'])
+                if ocr_job is None:
+                    st.warning("⚠️ This image expired from the queue. Please upload it again.")
+                    del st.session_state.homework_jobs[digest]
+                    return
+                if not ocr_job.finished:
+                    display_job_progress([ocr_job.job_id], "🔍 Reading your question...")
+                    return
+                if ocr_job.status == FAILED:
+                    st.error(f"Error processing image: {ocr_job.error}")
+                    return
+                entry['text'] = ocr_job.result
+                record_job_latency(ocr_job, "ocr")
             
-            # Extract text from image
-            with st.spinner("🔍 Reading your question..."):
-                extracted_text = extract_text_from_image(image)
+            extracted_text = entry['text']
             
             if extracted_text and len(extracted_text.strip()) > 0:
                 st.success("✅ Text extracted!")
                 
                 # Show extracted text
                 with st.expander("📝 Extracted Text"):
-                    st.text_area("Detected text:", extracted_text, height=100)
+                    st.text_area("Detected text:", extracted_text, height=100, key=scoped("ai_helper", f"ocr_text_{digest}"))
                 
-                # Get AI response
-                if st.button("🤖 Get AI Help", use_container_width=True):
-                    with st.spinner("🧠 Analyzing your question..."):
-                        ai_response = get_ai_response(extracted_text)
-                        
-                        # Store in session state
+                if entry['ai_job'] is not None:
+                    ai_job = queue.get(entry['ai_job'])
+                    if ai_job is not None and not ai_job.finished:
+                        display_job_progress([ai_job.job_id], "🧠 Analyzing your question...",
+                                             preview=(extracted_text, "", False))
+                        return
+                    
+                    # AI answer is ready: move it into the chat history once
+                    entry['ai_job'] = None
+                    if ai_job is None or ai_job.status == FAILED:
+                        st.error("Sorry, the AI helper could not answer. Please try again!")
+                    else:
+                        record_job_latency(ai_job, "ai")
                         st.session_state.current_question_context = extracted_text
-                        st.session_state.chat_history.append({
-                            'type': 'question',
-                            'content': extracted_text,
-                            'timestamp': datetime.now().strftime("%H:%M")
-                        })
-                        st.session_state.chat_history.append({
-                            'type': 'answer',
-                            'content': ai_response,
-                            'timestamp': datetime.now().strftime("%H:%M")
-                        })
-                        
+                        add_chat_exchange(extracted_text, ai_job.result)
                         st.rerun()
+                
+                # Get AI response
+                if st.button("🤖 Get AI Help", use_container_width=True, key=scoped("ai_helper", f"ai_help_{digest}")):
+                    entry['ai_job'] = queue.submit(user_id, AI, get_ai_response, extracted_text, "", False, user_id)
+                    st.rerun()
             else:
                 st.warning("⚠️ Could not extract text from image. Please ensure the text is clear and try again.")
                 
@@ -1050,22 +1281,46 @@ def display_chat_interface():
         st.markdown("---")
         st.markdown("### 💬 Question & Answer Session")
         
-        # Display chat history
-        for i, message in enumerate(st.session_state.chat_history):
-            if message['type'] == 'question':
-                st.markdown(f"""
-                <div style="background: #e3f2fd; padding: 1rem; border-radius: 10px; margin: 0.5rem 0;">
-                    <strong>🙋 Your Question ({message['timestamp']}):</strong><br>
-                    {message['content'][:200]}{'...' if len(message['content']) > 200 else ''}
-                </div>
-                """, unsafe_allow_html=True)
+        chat = st.session_state.chat_history
+        
+        # Older turns collapse to one-line summaries so rendering stays cheap
+        older = chat.older(CHAT_RENDER_TURNS)
+        if older:
+            with st.expander(f"📜 Earlier questions ({len(older)})"):
+                for summary in older:
+                    st.caption(summary)
+        
+        # Display the most recent turns in full
+        for turn in chat.recent(CHAT_RENDER_TURNS):
+            st.markdown(f"""
+            <div style="background: #e3f2fd; padding: 1rem; border-radius: 10px; margin: 0.5rem 0;">
+                <strong>🙋 Your Question ({turn['timestamp']}):</strong><br>
+                {turn['question'][:200]}{'...' if len(turn['question']) > 200 else ''}
+            </div>
+            """, unsafe_allow_html=True)
+            st.markdown(f"""
+            <div style="background: #f1f8e9; padding: 1rem; border-radius: 10px; margin: 0.5rem 0;">
+                <strong>🤖 AI Tutor ({turn['timestamp']}):</strong><br>
+                {turn['answer']}
+            </div>
+            """, unsafe_allow_html=True)
+        
+        # Collect a finished follow-up answer, or keep polling while it runs
+        pending = st.session_state.pending_followup
+        if pending is not None:
+            job = get_job_queue().get(pending['job'])
+            if job is not None and not job.finished:
+                display_job_progress([job.job_id], "🤖 Thinking...", preview=(
+                    pending['question'], pending['context'], True
+                ))
             else:
-                st.markdown(f"""
-                <div style="background: #f1f8e9; padding: 1rem; border-radius: 10px; margin: 0.5rem 0;">
-                    <strong>🤖 AI Tutor ({message['timestamp']}):</strong><br>
-                    {message['content']}
-                </div>
-                """, unsafe_allow_html=True)
+                st.session_state.pending_followup = None
+                if job is None or job.status == FAILED:
+                    st.error("Sorry, the AI helper could not answer. Please try again!")
+                else:
+                    record_job_latency(job, "ai")
+                    add_chat_exchange(pending['question'], job.result)
+                    st.rerun()
         
         # Follow-up question input
         st.markdown("### 🤔 Have a Follow-up Question?")
@@ -1080,34 +1335,30 @@ def display_chat_interface():
             )
         
         with col2:
-            if st.button("Ask 🚀", use_container_width=True):
+            if st.button("Ask 🚀", use_container_width=True, disabled=pending is not None):
                 if followup_question.strip():
-                    # Get AI response for follow-up
-                    with st.spinner("🤖 Thinking..."):
-                        followup_response = get_ai_response(
-                            followup_question, 
-                            st.session_state.current_question_context, 
-                            is_followup=True
-                        )
-                        
-                        # Add to chat history
-                        st.session_state.chat_history.append({
-                            'type': 'question',
-                            'content': followup_question,
-                            'timestamp': datetime.now().strftime("%H:%M")
-                        })
-                        st.session_state.chat_history.append({
-                            'type': 'answer',
-                            'content': followup_response,
-                            'timestamp': datetime.now().strftime("%H:%M")
-                        })
-                        
-                        st.rerun()
+                    # Recent turns plus summaries, compacted to a fixed token budget
+                    context = chat.build_context(st.session_state.current_question_context)
+                    # Queue the follow-up; the answer is picked up on a later rerun
+                    job_id = get_job_queue().submit(
+                        st.session_state.session_id, AI, get_ai_response,
+                        followup_question,
+                        context,
+                        True,
+                        st.session_state.session_id
+                    )
+                    st.session_state.pending_followup = {
+                        'job': job_id,
+                        'question': followup_question,
+                        'context': context,
+                    }
+                    st.rerun()
         
         # Clear chat button
         if st.button("🗑️ Clear Chat History"):
-            st.session_state.chat_history = []
+            chat.clear()
             st.session_state.current_question_context = ""
+            st.session_state.pending_followup = None
             st.rerun()
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Thumbnail cache for the photo gallery
+Generates small WebP (or JPEG) thumbnails once and reuses them until the
+source photo changes
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image, features
+
+THUMBNAIL_SIZE = 256
+THUMBNAIL_DIR_NAME = ".thumbnails"
+
+# WebP is much smaller, but not every Pillow build ships with it
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_EXT = ".webp" if THUMBNAIL_FORMAT == "WEBP" else ".jpg"
+
+# Recently used thumbnails kept in memory so gallery reruns skip the disk
+_memory_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+MEMORY_CACHE_ENTRIES = 256
+
+
+def thumbnail_path(image_path: str, mtime_ns: int, size: int = THUMBNAIL_SIZE) -> str:
+    """Location of the cached thumbnail for a given version of a photo"""
+    directory, filename = os.path.split(image_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, THUMBNAIL_DIR_NAME, f"{stem}_{size}_{mtime_ns}{THUMBNAIL_EXT}")
+
+
+def render_thumbnail(image: Image.Image, size: int = THUMBNAIL_SIZE) -> bytes:
+    """Encode a downscaled copy of an image"""
+    # draft() lets the JPEG decoder skip most of the work for large photos
+    image.draft("RGB", (size, size))
+    thumb = image.convert("RGB")
+    thumb.thumbnail((size, size))
+
+    buffer = io.BytesIO()
+    thumb.save(buffer, THUMBNAIL_FORMAT, quality=70)
+    return buffer.getvalue()
+
+
+def create_thumbnail(image_path: str, size: int = THUMBNAIL_SIZE) -> str:
+    """Write the thumbnail for a photo (called at save time) and return its path"""
+    mtime_ns = os.stat(image_path).st_mtime_ns
+    thumb_path = thumbnail_path(image_path, mtime_ns, size)
+    if os.path.exists(thumb_path):
+        return thumb_path
+
+    with Image.open(image_path) as image:
+        data = render_thumbnail(image, size)
+
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    tmp_path = thumb_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, thumb_path)
+
+    _remove_stale_thumbnails(image_path, thumb_path)
+    return thumb_path
+
+
+def get_thumbnail(image_path: str, mtime_ns: Optional[int] = None, size: int = THUMBNAIL_SIZE) -> bytes:
+    """Thumbnail bytes for a photo, generated lazily and cached by mtime"""
+    if mtime_ns is None:
+        mtime_ns = os.stat(image_path).st_mtime_ns
+    key = (image_path, mtime_ns, size)
+
+    with _memory_cache_lock:
+        data = _memory_cache.get(key)
+        if data is not None:
+            _memory_cache.move_to_end(key)
+            return data
+
+    thumb_path = thumbnail_path(image_path, mtime_ns, size)
+    if not os.path.exists(thumb_path):
+        thumb_path = create_thumbnail(image_path, size)
+    with open(thumb_path, "rb") as f:
+        data = f.read()
+
+    with _memory_cache_lock:
+        _memory_cache[key] = data
+        while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+            _memory_cache.popitem(last=False)
+    return data
+
+
+def delete_thumbnails(image_path: str):
+    """Remove every cached thumbnail of a photo"""
+    _remove_stale_thumbnails(image_path, keep=None)
+    with _memory_cache_lock:
+        for key in [k for k in _memory_cache if k[0] == image_path]:
+            del _memory_cache[key]
+
+
+def _remove_stale_thumbnails(image_path: str, keep: Optional[str]):
+    """Delete thumbnails left over from earlier versions of a photo"""
+    directory, filename = os.path.split(image_path)
+    stem = os.path.splitext(filename)[0]
+    thumb_dir = os.path.join(directory, THUMBNAIL_DIR_NAME)
+    if not os.path.isdir(thumb_dir):
+        return
+
+    for entry in os.scandir(thumb_dir):
+        name = os.path.splitext(entry.name)[0]
+        if name.rsplit("_", 2)[0] == stem and entry.path != keep:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
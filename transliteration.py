@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Gurmukhi to Roman Transliteration
+Table-driven, single pass over each word: consonants take their sounds from
+GURMUKHI_AKHARI, vowel signs replace the inherent "a", addak doubles the next
+consonant, tippi/bindi nasalize, and a virama joins a subjoined letter.
+Words are cached, so repeated words in a batch cost a dictionary lookup.
+
+Usage:
+    python transliteration.py "ਬੱਚਾ ਸਕੂਲ ਜਾਂਦਾ ਸੀ।"
+    python transliteration.py --benchmark
+"""
+
+import argparse
+import re
+import time
+from functools import lru_cache
+from typing import Iterable, List
+
+from gurmukhi_letters import GURMUKHI_AKHARI, NUKTA_LETTERS, VIRAMA
+
+# Character classes for the state machine
+CONSONANT, CARRIER, VOWEL, MATRA, SIGN, ADDAK, NASAL, NUKTA = range(8)
+
+# The three vowel carriers are written like consonants but have no sound of their own
+CARRIER_VOWELS = {"ੳ": "u", "ਅ": "a", "ੲ": "i"}
+
+MATRAS = {
+    "ਾ": "aa", "ਿ": "i", "ੀ": "ee", "ੁ": "u", "ੂ": "oo",
+    "ੇ": "e", "ੈ": "ai", "ੋ": "o", "ੌ": "au",
+}
+INDEPENDENT_VOWEL_SOUNDS = {
+    "ਆ": "aa", "ਇ": "i", "ਈ": "ee", "ਉ": "u", "ਊ": "oo",
+    "ਏ": "e", "ਐ": "ai", "ਓ": "o", "ਔ": "au",
+}
+# Sounds the nukta gives to the letters it is written under
+NUKTA_SOUNDS = {"ਸ": "sh", "ਖ": "kh", "ਗ": "g", "ਜ": "z", "ਫ": "f", "ਲ": "l"}
+# Before these sounds tippi/bindi is pronounced "m" (ਅੰਬ -> amb)
+LABIAL_SOUNDS = ("p", "b", "m")
+
+OTHER_SIGNS = {
+    "ਃ": "h",      # visarga
+    "ੵ": "y",      # yakash
+    "ੑ": "",       # udaat
+    "ੴ": "ik onkaar",
+}
+OTHER_SIGNS.update({chr(0x0A66 + d): str(d) for d in range(10)})
+
+ADDAK = "ੱ"
+NASALS = frozenset(["ੰ", "ਂ", "ਁ"])
+NUKTA_SIGN = "਼"
+
+# Bumped whenever output changes, so stored romanizations are rebuilt (see content_db)
+TRANSLITERATION_VERSION = 2
+
+# Danda and double danda end sentences; they stay outside words so word-final
+# schwa deletion sees the real end of the word
+DANDAS = {"\u0964": ".", "\u0965": "."}
+
+WORD_CACHE_SIZE = 50000
+
+_TOKEN_PATTERN = re.compile(r"([\u0A00-\u0A7F]+)|([\u0964\u0965]+)")
+
+
+def _build_tables():
+    kinds = {}
+    sounds = {}
+    for letter, info in GURMUKHI_AKHARI.items():
+        if letter in CARRIER_VOWELS:
+            kinds[letter] = CARRIER
+            sounds[letter] = CARRIER_VOWELS[letter]
+        else:
+            kinds[letter] = CONSONANT
+            sounds[letter] = info["sound"]
+    # Consonants outside the 35 Akhari; precomposed nukta letters
+    for letter, sound in (("ਯ", "y"),):
+        kinds.setdefault(letter, CONSONANT)
+        sounds.setdefault(letter, sound)
+    for letter, (base, _) in NUKTA_LETTERS.items():
+        kinds[letter] = CONSONANT
+        sounds[letter] = NUKTA_SOUNDS[base]
+    for vowel, sound in INDEPENDENT_VOWEL_SOUNDS.items():
+        kinds[vowel] = VOWEL
+        sounds[vowel] = sound
+    for matra, sound in MATRAS.items():
+        kinds[matra] = MATRA
+        sounds[matra] = sound
+    for sign, sound in OTHER_SIGNS.items():
+        kinds[sign] = SIGN
+        sounds[sign] = sound
+    kinds[ADDAK] = ADDAK
+    for nasal in NASALS:
+        kinds[nasal] = NASAL
+    kinds[NUKTA_SIGN] = NUKTA
+    return kinds, sounds
+
+
+CHAR_KINDS, CHAR_SOUNDS = _build_tables()
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def transliterate_word(word: str) -> str:
+    """Romanize one Gurmukhi word"""
+    # One pass over the characters builds syllables: [consonant sound, vowel, vowel is inherent]
+    syllables: List[list] = []
+    pending = None        # consonant (or cluster) still waiting for its vowel
+    pending_base = None   # the letter itself, for nukta lookups
+    inherent = "a"        # vowel the pending letter gets if no vowel sign follows
+    subjoin = False       # virama seen: the next letter joins the pending cluster
+    geminate = False      # addak seen: double the next consonant
+    nasal = False         # tippi/bindi seen: nasal before the next consonant
+
+    def flush(vowel, is_inherent):
+        nonlocal pending, pending_base
+        if pending is not None:
+            syllables.append([pending, vowel, is_inherent and pending != ""])
+            pending = pending_base = None
+
+    def emit(text):
+        syllables.append([text, "", False])
+
+    for char in word:
+        kind = CHAR_KINDS.get(char)
+        if kind == CONSONANT and subjoin and pending is not None:
+            pending += CHAR_SOUNDS[char]
+            pending_base = char
+            subjoin = False
+        elif kind == CONSONANT or kind == CARRIER:
+            flush(inherent, True)
+            subjoin = False
+            sound = CHAR_SOUNDS[char] if kind == CONSONANT else ""
+            if nasal:
+                emit("m" if sound.startswith(LABIAL_SOUNDS) else "n")
+                nasal = False
+            if geminate and sound:
+                sound = sound[0] + sound
+                geminate = False
+            pending, pending_base = sound, char
+            inherent = "a" if kind == CONSONANT else CHAR_SOUNDS[char]
+        elif kind == MATRA:
+            if pending is None:
+                emit(CHAR_SOUNDS[char])
+            else:
+                flush(CHAR_SOUNDS[char], False)
+        elif char == VIRAMA:
+            subjoin = pending is not None
+        elif kind == NUKTA:
+            if pending_base in NUKTA_SOUNDS and pending is not None:
+                pending = pending[:-len(CHAR_SOUNDS[pending_base])] + NUKTA_SOUNDS[pending_base]
+        else:
+            flush(inherent, True)
+            if kind == VOWEL or kind == SIGN:
+                emit(CHAR_SOUNDS[char])
+            elif kind == ADDAK:
+                geminate = True
+            elif kind == NASAL:
+                nasal = True
+            else:
+                emit(char)
+    flush(inherent, True)
+    if nasal:
+        emit("n")
+
+    # Schwa deletion: an inherent "a" between a vowel and a consonant that has
+    # its own vowel is not pronounced (ਤਿਤਲੀ -> titlee), nor is a word-final one
+    if len(syllables) > 1 and syllables[-1][2]:
+        syllables[-1][1] = ""
+    for i in range(1, len(syllables) - 1):
+        if syllables[i][2] and syllables[i - 1][1] and syllables[i + 1][1]:
+            syllables[i][1] = ""
+    return "".join(sound + vowel for sound, vowel, _ in syllables)
+
+
+def transliterate(text: str) -> str:
+    """Romanize every Gurmukhi word in text, leaving everything else as is"""
+    if not text:
+        return ""
+    return _TOKEN_PATTERN.sub(_transliterate_token, text)
+
+
+def _transliterate_token(match) -> str:
+    word, dandas = match.groups()
+    if word is not None:
+        return transliterate_word(word)
+    return "".join(DANDAS[char] for char in dandas)
+
+
+def transliterate_batch(texts: Iterable[str]) -> List[str]:
+    """Romanize many texts; repeated words across the batch are computed once"""
+    return [transliterate(text) for text in texts]
+
+
+def cache_info():
+    return transliterate_word.cache_info()
+
+
+def run_benchmark(articles: int = 15, article_chars: int = 2000):
+    """Time one ingestion batch (RSS fetch keeps 5 articles x 3 sources, 2000 chars each)"""
+    from story_library import SAMPLE_STORIES
+    from word_index import starter_vocabulary
+
+    words = [w for w, _ in starter_vocabulary()] + [
+        w for story in SAMPLE_STORIES for w in story["content_punjabi"].split()
+    ]
+    batch = []
+    for i in range(articles):
+        text = []
+        j = i
+        while sum(len(t) + 1 for t in text) < article_chars:
+            text.append(words[j % len(words)])
+            j += 7
+        batch.append(" ".join(text))
+
+    transliterate_word.cache_clear()
+    start = time.perf_counter()
+    transliterate_batch(batch)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    transliterate_batch(batch)
+    warm = time.perf_counter() - start
+
+    total_chars = sum(len(t) for t in batch)
+    print(f"{articles} articles, {total_chars} chars")
+    print(f"cold cache: {cold * 1000:.2f} ms, warm cache: {warm * 1000:.2f} ms")
+    print(cache_info())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gurmukhi to Roman transliteration")
+    parser.add_argument("text", nargs="?", help="Gurmukhi text to romanize")
+    parser.add_argument("--benchmark", action="store_true", help="time an ingestion-sized batch")
+    args = parser.parse_args()
+    if args.benchmark:
+        run_benchmark()
+    elif args.text:
+        print(transliterate(args.text))
+    else:
+        parser.print_help()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Self-hosted Web Font and CSS Bundle
+Subsets the vendored Gurmukhi font (fonts/) to the Gurmukhi block plus the
+Latin glyphs the app shows, writes it as WOFF2, and minifies the app's
+stylesheet. Every output file carries a content hash in its name, so the
+browser can cache it indefinitely; static/assets.json maps logical names to
+the current files.
+
+The bundle is built once per deploy, before the app starts; the app only
+reads assets.json and never writes to static/.
+
+Usage:
+    python web_assets.py    # build static/fonts/*.woff2, static/css/app.*.css, static/assets.json
+"""
+
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from typing import Dict
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # the build then fails; the app falls back to Google Fonts
+    font_subset = None
+
+# Served by Streamlit static file serving (see .streamlit/config.toml)
+STATIC_DIR = "static"
+MANIFEST_PATH = os.path.join(STATIC_DIR, "assets.json")
+STATIC_URL_PREFIX = "app/static/"
+
+FONT_FAMILY = "Noto Sans Gurmukhi"
+# Font files per weight, first existing one wins (handwriting.py renders templates
+# from the same files). Only Noto Serif Gurmukhi Regular is vendored; the browser
+# synthesizes bold from it when no bold file is there.
+FONT_SOURCES = {
+    400: ("fonts/NotoSansGurmukhi-Regular.ttf", "fonts/NotoSerifGurmukhi-Regular.otf"),
+    700: ("fonts/NotoSansGurmukhi-Bold.ttf",),
+}
+# Used when the bundle was not built, so devices without the font still get it
+REMOTE_FONT_CSS_URL = "https://fonts.googleapis.com/css2?family=Noto+Sans+Gurmukhi:wght@400;700&display=swap"
+
+# Gurmukhi block, dandas, joiners, the dotted circle for lone vowel signs,
+# printable ASCII and the typographic punctuation used in the UI
+SUBSET_UNICODES = (
+    list(range(0x0A00, 0x0A80)) + [0x0964, 0x0965, 0x200C, 0x200D, 0x25CC]
+    + list(range(0x20, 0x7F)) + [0xA0, 0x2013, 0x2014, 0x2018, 0x2019, 0x201C, 0x201D, 0x2022, 0x2026]
+)
+
+# Relative font URLs inside the CSS file; rewritten when the CSS is inlined
+FONT_URL_PLACEHOLDER = "__FONT_URL__/"
+
+APP_CSS = """
+.gurmukhi-text {
+    font-family: 'Noto Sans Gurmukhi', sans-serif;
+    font-size: 3rem;
+    font-weight: bold;
+    text-align: center;
+    color: #FF6B35;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+}
+
+.letter-card {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    padding: 2rem;
+    border-radius: 20px;
+    text-align: center;
+    margin: 1rem;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+    transition: transform 0.3s ease;
+}
+
+.letter-card:hover {
+    transform: translateY(-10px);
+}
+
+.app-header {
+    background: linear-gradient(135deg, #FF6B35, #F7931E);
+    padding: 2rem;
+    border-radius: 15px;
+    text-align: center;
+    margin-bottom: 2rem;
+}
+
+.progress-bar {
+    background: #e0e0e0;
+    border-radius: 10px;
+    height: 20px;
+    overflow: hidden;
+}
+
+.progress-fill {
+    background: linear-gradient(90deg, #4CAF50, #45a049);
+    height: 100%;
+    transition: width 0.5s ease;
+}
+"""
+
+_style_cache = {"mtime_ns": None, "tag": None}
+_style_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def _hashed_name(stem: str, data: bytes, suffix: str) -> str:
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}"
+
+
+def _write_hashed(subdir: str, stem: str, data: bytes, suffix: str) -> str:
+    """Write data under its content-hashed name, removing older builds of the same file"""
+    directory = os.path.join(STATIC_DIR, subdir)
+    os.makedirs(directory, exist_ok=True)
+    name = _hashed_name(stem, data, suffix)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    for old in glob.glob(os.path.join(directory, f"{stem}.*{suffix}")):
+        if os.path.basename(old) != name:
+            os.remove(old)
+    return f"{subdir}/{name}"
+
+
+def subset_font(source: str) -> bytes:
+    """WOFF2 subset of a font, keeping the shaping features Gurmukhi needs"""
+    options = font_subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.hinting = False
+    font = font_subset.load_font(source, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=SUBSET_UNICODES)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font_subset.save_font(font, out, options)
+    return out.getvalue()
+
+
+def _font_face_css(weight: int, font_path: str) -> str:
+    """An installed Noto Sans Gurmukhi is preferred; the self-hosted subset covers everyone else"""
+    src = (f"local('{FONT_FAMILY}'), local('NotoSansGurmukhi-{'Bold' if weight >= 700 else 'Regular'}'), "
+           f"url('{FONT_URL_PLACEHOLDER}{os.path.basename(font_path)}') format('woff2')")
+    return (f"@font-face {{ font-family: '{FONT_FAMILY}'; font-style: normal; font-weight: {weight}; "
+            f"font-display: swap; src: {src}; }}")
+
+
+def fallback_css() -> str:
+    """Minified CSS loading the font from Google Fonts, for a deploy that skipped the build"""
+    return minify_css(f"@import url('{REMOTE_FONT_CSS_URL}');" + APP_CSS)
+
+
+def find_font_sources() -> Dict[int, str]:
+    """weight -> font file to subset, for the weights that have one"""
+    sources = {}
+    for weight, candidates in FONT_SOURCES.items():
+        found = next((path for path in candidates if os.path.exists(path)), None)
+        if found:
+            sources[weight] = found
+    return sources
+
+
+def build_assets(verbose: bool = True) -> Dict:
+    """Subset the vendored fonts to WOFF2 and build the CSS bundle"""
+    if font_subset is None:
+        raise RuntimeError("fontTools is not installed; pip install 'fonttools[woff]'")
+    sources = find_font_sources()
+    if 400 not in sources:
+        raise RuntimeError(f"No regular font found ({', '.join(FONT_SOURCES[400])}); see fonts/README.md")
+
+    fonts = {}
+    faces = []
+    for weight, source in sources.items():
+        data = subset_font(source)
+        font_path = _write_hashed("fonts", os.path.splitext(os.path.basename(source))[0], data, ".woff2")
+        fonts[str(weight)] = font_path
+        faces.append(_font_face_css(weight, font_path))
+        if verbose:
+            print(f"{source}: {os.path.getsize(source) / 1024:.1f} KB -> {font_path} ({len(data) / 1024:.1f} KB)")
+
+    css = minify_css("\n".join(faces) + APP_CSS)
+    # In the file, fonts are siblings of css/
+    css_path = _write_hashed("css", "app", css.replace(FONT_URL_PLACEHOLDER, "../fonts/").encode("utf-8"), ".css")
+    manifest = {"css": css_path, "fonts": fonts}
+
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+    if verbose:
+        print(f"{css_path} ({len(css)} bytes)")
+    return manifest
+
+
+def style_tag() -> str:
+    """The per-rerun stylesheet markup, cached until assets.json changes
+
+    Streamlit's static serving sends .css as text/plain, which browsers refuse
+    as a stylesheet, so by default the minified bundle is inlined and only the
+    fonts are fetched (and cached) from /app/static. Set STATIC_CSS_LINK=1
+    when a proxy serves /app/static with real content types to emit a
+    <link> to the hashed CSS file instead. Without a build the CSS is inlined
+    and the font comes from Google Fonts.
+    """
+    with _style_lock:
+        try:
+            mtime_ns = os.stat(MANIFEST_PATH).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if _style_cache["tag"] is not None and _style_cache["mtime_ns"] == mtime_ns:
+            return _style_cache["tag"]
+
+        if mtime_ns is None:
+            logger.warning("%s not found; run python web_assets.py when deploying", MANIFEST_PATH)
+            tag = f"<style>{fallback_css()}</style>"
+            _style_cache.update(mtime_ns=None, tag=tag)
+            return tag
+
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if os.environ.get("STATIC_CSS_LINK") == "1":
+            tag = f'<link rel="stylesheet" href="{STATIC_URL_PREFIX}{manifest["css"]}">'
+        else:
+            with open(os.path.join(STATIC_DIR, manifest["css"]), encoding="utf-8") as f:
+                css = f.read()
+            tag = f"<style>{css.replace('../fonts/', STATIC_URL_PREFIX + 'fonts/')}</style>"
+        _style_cache.update(mtime_ns=mtime_ns, tag=tag)
+        return tag
+
+
+if __name__ == "__main__":
+    try:
+        build_assets()
+    except RuntimeError as e:
+        sys.exit(f"Error: {e}")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Positional Word Index for Letter Puzzles
+Splits vocabulary words into letter slots and indexes every
+(position, letter) pair and every one-letter-missing pattern, so puzzles can
+be drawn in constant time with distractors that never spell a real word
+"""
+
+import os
+import random
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from content_codec import get_codec
+from gurmukhi_letters import GURMUKHI_AKHARI, COMBINING_MARKS, INDEPENDENT_VOWELS, NUKTA_LETTERS, VIRAMA
+from letter_model import LETTER_MODEL
+
+# A small starter vocabulary of everyday words children know
+STARTER_WORDS = (
+    ("ਸੇਬ", "Apple"), ("ਗਾਂ", "Cow"), ("ਚੰਦ", "Moon"), ("ਘਰ", "House"), ("ਜਲ", "Water"),
+    ("ਫਲ", "Fruit"), ("ਕਲ", "Tomorrow"), ("ਹਲ", "Plough"), ("ਨਲ", "Tap"), ("ਪਲ", "Moment"),
+    ("ਗਲ", "Neck"), ("ਮਨ", "Mind"), ("ਬਸ", "Bus"), ("ਰਥ", "Chariot"), ("ਸਰ", "Lake"),
+    ("ਵਣ", "Forest"), ("ਮਗਰ", "Crocodile"), ("ਬਤਖ", "Duck"), ("ਸੜਕ", "Road"), ("ਅਨਾਰ", "Pomegranate"),
+    ("ਕਲਮ", "Pen"), ("ਨਮਕ", "Salt"), ("ਪਤੰਗ", "Kite"), ("ਕਿਤਾਬ", "Book"), ("ਪਾਣੀ", "Water"),
+    ("ਦੁੱਧ", "Milk"), ("ਸੂਰਜ", "Sun"), ("ਤਿਤਲੀ", "Butterfly"), ("ਬੱਚਾ", "Child"), ("ਮੋਰ", "Peacock"),
+    ("ਸ਼ੇਰ", "Lion"), ("ਬੱਕਰੀ", "Goat"), ("ਕੁੱਤਾ", "Dog"), ("ਚਿੜੀ", "Sparrow"), ("ਗੇਂਦ", "Ball"),
+    ("ਹੱਥ", "Hand"), ("ਅੱਖ", "Eye"), ("ਨੱਕ", "Nose"), ("ਕੰਨ", "Ear"), ("ਪੈਰ", "Foot"),
+    ("ਦਰ", "Door"), ("ਜੱਗ", "Jug"), ("ਰੰਗ", "Colour"), ("ਬੱਦਲ", "Cloud"), ("ਮਾਂ", "Mother"),
+)
+
+# Learned-letter filters cached per (mask, difficulty)
+FILTER_CACHE_ENTRIES = 128
+
+_WORD_PATTERN = re.compile(r"[਀-੿]+")
+
+
+def split_slots(word: str) -> Tuple[Tuple[str, str], ...]:
+    """Split a word into (base letter, trailing marks) slots"""
+    slots: List[List[str]] = []
+    chars = list(word)
+    i = 0
+    while i < len(chars):
+        char = chars[i]
+        if char in COMBINING_MARKS:
+            if slots:
+                slots[-1][1] += char
+                # A virama joins the next letter as a subjoined (pairin) form
+                if char == VIRAMA and i + 1 < len(chars):
+                    slots[-1][1] += chars[i + 1]
+                    i += 1
+        elif char in INDEPENDENT_VOWELS:
+            base, sign = INDEPENDENT_VOWELS[char]
+            slots.append([base, sign])
+        elif char in NUKTA_LETTERS:
+            base, nukta = NUKTA_LETTERS[char]
+            slots.append([base, nukta])
+        else:
+            slots.append([char, ""])
+        i += 1
+    return tuple((base, marks) for base, marks in slots)
+
+
+def difficulty_for(slot_count: int) -> int:
+    """1 = two letters, 2 = three letters, 3 = four or more"""
+    return 1 if slot_count <= 2 else 2 if slot_count == 3 else 3
+
+
+class WordIndex:
+    def __init__(self, words: Iterable[Tuple[str, Optional[str]]]):
+        self.words: List[Dict] = []
+        self.position_index: Dict[Tuple[int, str], List[int]] = {}
+        # One-letter-missing pattern -> letters that complete it into a real word
+        self.completions: Dict[Tuple, FrozenSet[str]] = {}
+        # (word_id, position, required letter mask) per difficulty
+        self.puzzles: Dict[int, List[Tuple[int, int, int]]] = {1: [], 2: [], 3: []}
+        self._filter_cache: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
+        self._lock = threading.Lock()
+
+        seen = set()
+        for word, meaning in words:
+            slots = split_slots(word)
+            if len(slots) < 2 or word in seen:
+                continue
+            if not all(base in LETTER_MODEL.index for base, _ in slots):
+                continue
+            seen.add(word)
+            self.words.append({"word": word, "meaning": meaning, "slots": slots})
+
+        completions: Dict[Tuple, Set[str]] = {}
+        for word_id, entry in enumerate(self.words):
+            slots = entry["slots"]
+            for position, (base, _) in enumerate(slots):
+                self.position_index.setdefault((position, base), []).append(word_id)
+                completions.setdefault(self._pattern(slots, position), set()).add(base)
+        self.completions = {pattern: frozenset(letters) for pattern, letters in completions.items()}
+
+        for word_id, entry in enumerate(self.words):
+            slots = entry["slots"]
+            mask = 0
+            for base, _ in slots:
+                mask |= 1 << LETTER_MODEL.index[base]
+            for position in range(len(slots)):
+                # Need at least three letters that do not complete the pattern
+                if len(LETTER_MODEL.letters) - len(self.completions[self._pattern(slots, position)]) < 3:
+                    continue
+                self.puzzles[difficulty_for(len(slots))].append((word_id, position, mask))
+
+    @staticmethod
+    def _pattern(slots, position):
+        return (len(slots), position) + tuple(
+            marks if i == position else base + marks for i, (base, marks) in enumerate(slots)
+        )
+
+    def puzzle_count(self) -> int:
+        return sum(len(p) for p in self.puzzles.values())
+
+    def words_with(self, position: int, letter: str) -> List[str]:
+        """Words having a letter at a given slot position"""
+        return [self.words[i]["word"] for i in self.position_index.get((position, letter), [])]
+
+    def _candidates(self, learned_mask: int, difficulty: int) -> List[Tuple[int, int, int]]:
+        """Puzzles whose letters are all learned, computed once per (mask, difficulty)"""
+        key = (learned_mask, difficulty)
+        with self._lock:
+            cached = self._filter_cache.get(key)
+            if cached is not None:
+                return cached
+
+        candidates = [p for p in self.puzzles[difficulty] if p[2] & ~learned_mask == 0]
+        if not candidates:
+            # Fall back to puzzles whose missing letter has at least been learned
+            candidates = [
+                p for p in self.puzzles[difficulty]
+                if learned_mask >> LETTER_MODEL.index[self.words[p[0]]["slots"][p[1]][0]] & 1
+            ]
+        if not candidates:
+            candidates = self.puzzles[difficulty]
+
+        with self._lock:
+            if len(self._filter_cache) >= FILTER_CACHE_ENTRIES:
+                self._filter_cache.pop(next(iter(self._filter_cache)))
+            self._filter_cache[key] = candidates
+        return candidates
+
+    def generate(self, learned_letters: Sequence[str] = (), difficulty: int = 1, rng=random) -> Optional[Dict]:
+        """A random puzzle at the given difficulty using only learned letters where possible"""
+        learned_mask = 0
+        for letter in learned_letters:
+            if letter in LETTER_MODEL.index:
+                learned_mask |= 1 << LETTER_MODEL.index[letter]
+        if not learned_letters:
+            learned_mask = (1 << len(LETTER_MODEL.letters)) - 1
+
+        candidates = self._candidates(learned_mask, difficulty)
+        if not candidates:
+            return None
+        word_id, position, _ = candidates[int(rng.random() * len(candidates))]
+
+        entry = self.words[word_id]
+        slots = entry["slots"]
+        missing, marks = slots[position]
+        valid = self.completions[self._pattern(slots, position)]
+        options = LETTER_MODEL.options(missing, 3, attr="letter", rng=rng, exclude=valid)
+
+        display = "".join(
+            ("◌" + m if i == position else b + m) for i, (b, m) in enumerate(slots)
+        )
+        return {
+            "word": entry["word"],
+            "meaning": entry["meaning"],
+            "position": position,
+            "missing": missing,
+            "display": display,
+            "options": options,
+            "difficulty": difficulty,
+        }
+
+
+def starter_vocabulary() -> List[Tuple[str, Optional[str]]]:
+    """Built-in words plus the example word of every letter"""
+    words = list(STARTER_WORDS)
+    for info in GURMUKHI_AKHARI.values():
+        match = re.match(r"\s*(\S+)\s*\(([^)]*)\)", info["example"])
+        if match:
+            meaning = match.group(2).split(" - ")[-1].strip()
+            words.append((match.group(1), meaning))
+    return words
+
+
+def content_vocabulary(db_path: str = "gurmukhi_content.db", min_count: int = 2) -> List[Tuple[str, Optional[str]]]:
+    """Vocabulary table entries and frequent words from stored articles"""
+    if not os.path.exists(db_path):
+        return []
+
+    words: List[Tuple[str, Optional[str]]] = []
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT word_punjabi, word_english FROM vocabulary')
+        words.extend((w, m) for w, m in cursor.fetchall() if w)
+
+        counts = Counter()
+        codec = get_codec(conn, db_path)
+        cursor.execute('SELECT content_punjabi FROM punjabi_articles')
+        for (stored,) in cursor.fetchall():
+            content = codec.decompress(stored)
+            if content:
+                counts.update(_WORD_PATTERN.findall(content))
+        words.extend((w, None) for w, n in counts.items() if n >= min_count and 2 <= len(split_slots(w)) <= 5)
+    except sqlite3.Error as e:
+        print(f"Error reading vocabulary from {db_path}: {e}")
+    finally:
+        conn.close()
+    return words
+
+
+_word_index: Optional[WordIndex] = None
+_word_index_lock = threading.Lock()
+
+
+def get_word_index() -> WordIndex:
+    """Process-wide word index, built once from the starter and content vocabularies"""
+    global _word_index
+    with _word_index_lock:
+        if _word_index is None:
+            _word_index = WordIndex(starter_vocabulary() + content_vocabulary())
+        return _word_index
+
+
+if __name__ == "__main__":
+    index = get_word_index()
+    print(f"{len(index.words)} words, {index.puzzle_count()} puzzle variants")
+    for level in (1, 2, 3):
+        print(index.generate(difficulty=level))